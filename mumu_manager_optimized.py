@@ -1,67 +1,174 @@
-import sys, os, subprocess, json, random, time, re, shlex
+import sys, os, subprocess, json, random, time, re, shlex, threading, asyncio, codecs, heapq, queue, itertools
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, Future, InvalidStateError, ThreadPoolExecutor, wait
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QPushButton,
     QTableWidget, QTableWidgetItem, QHeaderView, QLineEdit, QProgressBar,
     QStatusBar, QDialog, QFormLayout, QSpinBox, QDoubleSpinBox, QMessageBox,
-    QFileDialog, QCheckBox, QLabel, QDialogButtonBox, QTextEdit, QMenu,
+    QFileDialog, QCheckBox, QLabel, QDialogButtonBox, QMenu,
     QComboBox, QSplitter, QSizePolicy, QFrame, QInputDialog,
     QStyledItemDelegate, QStyleOptionViewItem, QTabWidget, QGroupBox, QToolButton,
-    QGraphicsDropShadowEffect
+    QGraphicsScene, QGraphicsBlurEffect, QTableView, QListView, qDrawBorderPixmap
 )
-from PyQt6.QtCore import Qt, QThread, pyqtSignal, QSize, QTimer, QSettings, QPropertyAnimation, QEasingCurve
-from PyQt6.QtGui import QIcon, QColor, QTextCursor, QPalette, QAction, QPainter, QLinearGradient, QPen
+from PyQt6.QtCore import (
+    Qt, QThread, pyqtSignal, QSize, QTimer, QSettings, QPropertyAnimation, QEasingCurve,
+    QAbstractTableModel, QAbstractListModel, QAbstractProxyModel, QModelIndex,
+    QEvent, QMargins, QRectF
+)
+from PyQt6.QtGui import (
+    QIcon, QColor, QTextCursor, QPalette, QAction, QPainter, QLinearGradient, QPen,
+    QImage, QPixmap, QPainterPath, QRegion
+)
+try:
+    import numpy as np
+except ImportError:  # NumPy only accelerates InstanceStore filters
+    np = None
+try:
+    import psutil
+except ImportError:  # Host load is read from /proc; psutil covers Windows and macOS
+    psutil = None
+
+# ---------- Shadow helper (pre-rendered 9-slice pixmaps) ----------
+class ShadowRenderer:
+    """
+    Drop shadows painted from a cached, pre-blurred 9-slice pixmap.
+
+    QGraphicsDropShadowEffect re-renders its widget offscreen and blurs it on every
+    repaint. Here the blur runs once per (radius, alpha, theme, DPR); each card then
+    only draws nine pixmap slices through a ShadowUnderlay stacked behind it.
+    The offset just moves the target rect, so it does not need its own pixmap.
+    """
+    CORNER = 16  # .neo-card border-radius
+    _pixmaps = {}
+    stats = {'blurs': 0, 'paints': 0}
+
+    @staticmethod
+    def resolve_alpha(alpha, theme=None):
+        """Lighter shadows for the dark theme, as the old effect-based helper did"""
+        if theme is None:
+            app = QApplication.instance()
+            theme = app.property("currentTheme") if app else None
+        return min(alpha, 60) if theme == "dark" else alpha
 
-# ---------- Shadow helper với cache ----------
-class ShadowCache:
-    """Cache for shadow effects to improve performance"""
-    _shadow_cache = {}
-    
     @staticmethod
-    def get_shadow(radius=16, dx=6, dy=6, alpha=80):
-        """Get a cached shadow effect or create a new one"""
-        key = f"{radius}_{dx}_{dy}_{alpha}"
-        if key not in ShadowCache._shadow_cache:
-            effect = QGraphicsDropShadowEffect()
-            effect.setBlurRadius(radius)
-            effect.setOffset(dx, dy)
-            effect.setColor(QColor(0, 0, 0, alpha))
-            ShadowCache._shadow_cache[key] = effect
-        return ShadowCache._shadow_cache[key]
+    def border(radius):
+        """Width of the fixed 9-slice border: blur outside + corner + blur inside"""
+        return 2 * radius + ShadowRenderer.CORNER
+
+    @classmethod
+    def pixmap(cls, radius, alpha, theme=None, dpr=1.0):
+        """Blurred rounded-rect shadow whose centre pixel can be stretched to any card size"""
+        key = (radius, alpha, theme, dpr)
+        pixmap = cls._pixmaps.get(key)
+        if pixmap is None:
+            pixmap = cls._pixmaps[key] = cls._blur(radius, alpha, dpr)
+            cls.stats['blurs'] += 1
+        return pixmap
+
+    @classmethod
+    def _blur(cls, radius, alpha, dpr):
+        size = 2 * cls.border(radius) + 1
+        pixels = max(1, round(size * dpr))
+        image = QImage(pixels, pixels, QImage.Format.Format_ARGB32_Premultiplied)
+        image.fill(Qt.GlobalColor.transparent)
+        # Same qt_blurImage pass the drop-shadow effect uses, run once on a plain shape
+        scene = QGraphicsScene(0, 0, size, size)
+        path = QPainterPath()
+        path.addRoundedRect(QRectF(radius, radius, size - 2 * radius, size - 2 * radius), cls.CORNER, cls.CORNER)
+        item = scene.addPath(path, QPen(Qt.PenStyle.NoPen), QColor(0, 0, 0, alpha))
+        effect = QGraphicsBlurEffect()
+        effect.setBlurRadius(radius)
+        effect.setBlurHints(QGraphicsBlurEffect.BlurHint.QualityHint)
+        item.setGraphicsEffect(effect)
+        painter = QPainter(image)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        scene.render(painter, QRectF(0, 0, pixels, pixels), QRectF(0, 0, size, size))
+        painter.end()
+        pixmap = QPixmap.fromImage(image)
+        pixmap.setDevicePixelRatio(dpr)
+        return pixmap
+
+    @classmethod
+    def paint(cls, painter, rect, radius=16, alpha=80, theme=None, dpr=1.0):
+        """Draw the shadow of a card occupying rect (already offset) with the painter"""
+        border = min(cls.border(radius), rect.width() // 2, rect.height() // 2)
+        if border <= 0:
+            return
+        margins = QMargins(border, border, border, border)
+        qDrawBorderPixmap(painter, rect, margins, cls.pixmap(radius, alpha, theme, dpr))
+        cls.stats['paints'] += 1
+
+    @classmethod
+    def clear(cls):
+        cls._pixmaps.clear()
+
+class ShadowUnderlay(QWidget):
+    """
+    Transparent sibling stacked right under a card that paints the card's cached shadow.
+    It follows the card's geometry, visibility, z-order and parent through an event filter.
+    """
+    MIN_SIZE = 20  # Cards smaller than this get no shadow
+
+    def __init__(self, card, radius=16, dx=6, dy=6, alpha=80):
+        super().__init__(card.parentWidget())
+        self.card = card
+        self.radius, self.dx, self.dy, self.alpha = radius, dx, dy, alpha
+        self.setAttribute(Qt.WidgetAttribute.WA_TransparentForMouseEvents)
+        self.setAttribute(Qt.WidgetAttribute.WA_NoSystemBackground)
+        self.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+        card.installEventFilter(self)
+        card.destroyed.connect(self.deleteLater)
+        self.sync()
+
+    def sync(self):
+        """Match the card's offset geometry; hidden while the card has no parent"""
+        card, parent = self.card, self.card.parentWidget()
+        if parent is None:
+            self.hide()
+            return
+        if self.parentWidget() is not parent:
+            self.setParent(parent)
+        self.setGeometry(card.geometry().translated(self.dx, self.dy).adjusted(
+            -self.radius, -self.radius, self.radius, self.radius))
+        self.stackUnder(card)
+        self.setVisible(card.isVisibleTo(parent))
+
+    def eventFilter(self, obj, event):
+        if obj is self.card and event.type() in (QEvent.Type.Move, QEvent.Type.Resize, QEvent.Type.Show,
+                                                 QEvent.Type.Hide, QEvent.Type.ParentChange,
+                                                 QEvent.Type.ZOrderChange):
+            self.sync()
+        return False
+
+    def paintEvent(self, event):
+        if self.card.width() < self.MIN_SIZE or self.card.height() < self.MIN_SIZE:
+            return
+        app = QApplication.instance()
+        theme = app.property("currentTheme") if app else None
+        painter = QPainter(self)
+        # Never darken the card itself, in case its stylesheet background is translucent
+        card_rect = self.card.geometry().translated(-self.x(), -self.y())
+        painter.setClipRegion(QRegion(self.rect()).subtracted(QRegion(card_rect)))
+        ShadowRenderer.paint(painter, self.rect(), self.radius, ShadowRenderer.resolve_alpha(self.alpha, theme),
+                             theme, self.devicePixelRatioF())
+        painter.end()
 
 def apply_shadow(widget, radius=16, dx=6, dy=6, alpha=80):
-    """Apply shadow with performance optimization for large datasets"""
+    """Give a card a pre-rendered shadow; skipped entirely on very large dashboards"""
     # Skip shadows entirely if there are too many widgets (10k+ instances)
     app = QApplication.instance()
     if app and hasattr(app, '_widget_count'):
         if app._widget_count > 1000:
             return  # Skip shadows for performance
-    
-    # Only apply shadow to visible widgets
-    if not widget.isVisible():
-        return
-    
-    # Skip very small widgets (less than 20x20)
-    if widget.width() < 20 or widget.height() < 20:
+    if getattr(widget, '_shadow_underlay', None) is not None:
         return
-    
-    # Use lighter shadows for dark theme to enhance visibility
-    theme = QApplication.instance().property("currentTheme")
-    if theme == "dark" and alpha > 50:
-        alpha = min(alpha, 60)  # Reduce opacity for dark theme
-    
-    try:
-        effect = QGraphicsDropShadowEffect(widget)
-        effect.setBlurRadius(radius)
-        effect.setOffset(dx, dy)
-        effect.setColor(QColor(0, 0, 0, alpha))
-        widget.setGraphicsEffect(effect)
-        
-        # Track widget count for performance optimization
-        if not hasattr(QApplication.instance(), '_widget_count'):
-            QApplication.instance()._widget_count = 0
-        QApplication.instance()._widget_count += 1
-    except Exception:
-        pass
+    widget._shadow_underlay = ShadowUnderlay(widget, radius, dx, dy, alpha)
+
+    # Track widget count for performance optimization
+    if app is not None:
+        app._widget_count = getattr(app, '_widget_count', 0) + 1
 
 # =========================
 # Neumorphic Theme (light/dark) với CSS variables
@@ -621,7 +728,9 @@ class PerformanceConfig:
                 'instance_delay': 1.0,
                 'batch_delay': 5.0,
                 'max_concurrent': 5,
-                'chunk_size': 20
+                'chunk_size': 20,
+                'max_launch_window': 4,
+                'max_launch_rate': 2.0
             }
         elif instance_count <= 1000:
             return {
@@ -629,7 +738,9 @@ class PerformanceConfig:
                 'instance_delay': 0.5,
                 'batch_delay': 3.0,
                 'max_concurrent': 8,
-                'chunk_size': 50
+                'chunk_size': 50,
+                'max_launch_window': 8,
+                'max_launch_rate': 4.0
             }
         elif instance_count <= 5000:
             return {
@@ -637,7 +748,9 @@ class PerformanceConfig:
                 'instance_delay': 0.3,
                 'batch_delay': 2.0,
                 'max_concurrent': 12,
-                'chunk_size': 100
+                'chunk_size': 100,
+                'max_launch_window': 16,
+                'max_launch_rate': 8.0
             }
         else:  # 10k+
             return {
@@ -645,283 +758,3220 @@ class PerformanceConfig:
                 'instance_delay': 0.1,
                 'batch_delay': 1.0,
                 'max_concurrent': 20,
-                'chunk_size': 200
+                'chunk_size': 200,
+                'max_launch_window': 32,
+                'max_launch_rate': 12.0
             }
     
     @staticmethod
     def apply_shadow_optimization(widget_count):
         """Disable shadows for UI performance with many widgets"""
         return widget_count < 500  # Only apply shadows if less than 500 widgets
-class MumuManager:
-    def __init__(self, executable_path):
+
+# =========================
+# Host load sampling & adaptive launch rate
+# =========================
+class HostLoadSample:
+    """CPU, memory and I/O pressure of the host as fractions in [0, 1]"""
+    __slots__ = ('cpu', 'memory', 'io', 'source')
+
+    def __init__(self, cpu=0.0, memory=0.0, io=0.0, source='none'):
+        self.cpu, self.memory, self.io, self.source = cpu, memory, io, source
+
+    @property
+    def load(self):
+        """The most saturated resource decides"""
+        return max(self.cpu, self.memory, self.io)
+
+    def __repr__(self):
+        return f"HostLoadSample(cpu={self.cpu:.2f}, memory={self.memory:.2f}, io={self.io:.2f}, source={self.source!r})"
+
+class HostLoadSampler:
+    """
+    Reads host load from /proc (stat, meminfo, pressure/*, diskstats); falls back to
+    psutil where /proc is unavailable, and to neutral zero samples without either.
+    CPU and disk figures are measured between consecutive sample() calls.
+    """
+    def __init__(self, proc_root='/proc'):
+        self.proc_root = proc_root
+        if os.path.exists(os.path.join(proc_root, 'stat')):
+            self.source = 'proc'
+        else:
+            self.source = 'psutil' if psutil is not None else 'none'
+        self._last_cpu = None   # (busy, total) jiffies
+        self._last_disk = None  # (io_ticks ms per device, monotonic time)
+        self.sample()  # Prime the counters so the first real sample is a delta
+
+    @property
+    def available(self):
+        """False when neither /proc nor psutil exists and every sample would read as idle"""
+        return self.source != 'none'
+
+    def _read(self, name):
+        try:
+            with open(os.path.join(self.proc_root, name), encoding='ascii') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _pressure(self, resource):
+        """`some avg10` from /proc/pressure/<resource> as a fraction, or None"""
+        text = self._read(os.path.join('pressure', resource))
+        if not text:
+            return None
+        for line in text.splitlines():
+            if line.startswith('some'):
+                fields = dict(part.split('=') for part in line.split()[1:])
+                return float(fields.get('avg10', 0.0)) / 100.0
+        return None
+
+    def _cpu(self):
+        text = self._read('stat')
+        if not text:
+            return 0.0
+        values = [int(v) for v in text.splitlines()[0].split()[1:]]
+        idle = values[3] + (values[4] if len(values) > 4 else 0)  # idle + iowait
+        total = sum(values[:8])  # guest time is already counted in user/nice
+        last, self._last_cpu = self._last_cpu, (total - idle, total)
+        if last is None or total <= last[1]:
+            return 0.0
+        return min(1.0, (total - idle - last[0]) / (total - last[1]))
+
+    def _memory(self):
+        text = self._read('meminfo')
+        used = 0.0
+        if text:
+            fields = {}
+            for line in text.splitlines():
+                key, _, rest = line.partition(':')
+                fields[key] = int(rest.split()[0]) if rest.split() else 0
+            if fields.get('MemTotal') and 'MemAvailable' in fields:
+                used = 1.0 - fields['MemAvailable'] / fields['MemTotal']
+        stall = self._pressure('memory')
+        return max(used, stall or 0.0)
+
+    def _io(self):
+        stall = self._pressure('io')
+        if stall is not None:
+            return stall
+        text = self._read('diskstats')
+        if not text:
+            return 0.0
+        ticks = {}
+        for line in text.splitlines():
+            parts = line.split()
+            if len(parts) >= 13 and not parts[2].startswith(('loop', 'ram')):
+                ticks[parts[2]] = int(parts[12])  # ms spent doing I/O
+        now = time.monotonic()
+        last, self._last_disk = self._last_disk, (ticks, now)
+        if last is None or now <= last[1]:
+            return 0.0
+        window_ms = (now - last[1]) * 1000.0
+        busiest = max((ms - last[0].get(dev, ms) for dev, ms in ticks.items()), default=0)
+        return min(1.0, max(0.0, busiest / window_ms))
+
+    def sample(self):
+        if self.source == 'proc':
+            return HostLoadSample(self._cpu(), self._memory(), self._io(), 'proc')
+        if self.source == 'psutil':
+            return HostLoadSample(psutil.cpu_percent(interval=None) / 100.0,
+                                  psutil.virtual_memory().percent / 100.0, 0.0, 'psutil')
+        return HostLoadSample()
+
+class AdaptiveRateController:
+    """
+    AIMD launch controller: the launch window (VMs started per step) grows by `increase`
+    while host load stays under `target` and is multiplied by `decrease` once it crosses
+    `high`. The window never exceeds max_window and launches never exceed max_rate per second.
+    """
+    def __init__(self, max_window=8, max_rate=4.0, min_window=1, target=0.70, high=0.85,
+                 increase=1.0, decrease=0.5, interval=1.0):
+        self.max_window = max(1, int(max_window))
+        self.min_window = max(1, min(int(min_window), self.max_window))
+        self.max_rate = max_rate
+        self.target, self.high = target, high
+        self.increase, self.decrease = increase, decrease
+        self.interval = interval
+        self.window = float(self.min_window)
+        self.last_sample = None
+        self.stats = {'steps': 0, 'increases': 0, 'decreases': 0}
+
+    @classmethod
+    def for_instances(cls, instance_count, **overrides):
+        """Controller with ceilings from the PerformanceConfig preset for instance_count"""
+        config = PerformanceConfig.get_config(instance_count)
+        kwargs = {'max_window': config['max_launch_window'], 'max_rate': config['max_launch_rate']}
+        kwargs.update((k, v) for k, v in overrides.items() if v is not None)
+        return cls(**kwargs)
+
+    @property
+    def limit(self):
+        return int(self.window)
+
+    def update(self, sample):
+        """Fold in one HostLoadSample and return the launch window for the next step"""
+        self.last_sample = sample
+        self.stats['steps'] += 1
+        load = sample.load
+        if load >= self.high:
+            if self.window > self.min_window:
+                self.stats['decreases'] += 1
+            self.window = max(self.min_window, self.window * self.decrease)
+        elif load < self.target and self.window < self.max_window:
+            self.stats['increases'] += 1
+            self.window = min(self.max_window, self.window + self.increase)
+        return self.limit
+
+    def pause_for(self, launched):
+        """Seconds to wait after launching `launched` VMs so the rate ceiling holds"""
+        return max(self.interval, launched / self.max_rate if self.max_rate else 0.0)
+
+# =========================
+# `info` output decoding
+# =========================
+class InfoStreamDecoder:
+    """
+    Incremental decoder for `info -v ...` output. Accepts a JSON array of records,
+    a single {index: record} mapping, or one record per line, and returns
+    (index, record) pairs as soon as each record is complete.
+    """
+    _WS = " \t\r\n"
+
+    def __init__(self):
+        self._decoder = json.JSONDecoder()
+        self._buf = ""
+        self._pos = 0
+        self._mode = None  # None, 'array', 'mapping' or 'objects'
+        self._seq = 0  # Position of the next array element without an "index" field
+
+    def feed(self, text):
+        """Add a chunk of output and return the records it completed"""
+        self._buf = self._buf[self._pos:] + text
+        self._pos = 0
+        return self._drain(final=False)
+
+    def close(self):
+        """Return the remaining records; raises ValueError if the output was truncated or malformed"""
+        records = self._drain(final=True)
+        if self._mode in ('array', 'mapping'):
+            raise ValueError("Dữ liệu JSON bị cắt ngang")
+        return records
+
+    def _skip(self, pos, extra=""):
+        buf, ws = self._buf, self._WS + extra
+        while pos < len(buf) and buf[pos] in ws:
+            pos += 1
+        return pos
+
+    def _decode(self, pos, final):
+        """raw_decode one value at pos; returns (None, pos) when more data is needed"""
+        try:
+            return self._decoder.raw_decode(self._buf, pos)
+        except json.JSONDecodeError as e:
+            if final:
+                raise ValueError(f"Lỗi phân tích JSON: {e}") from None
+            return None, pos
+
+    def _member(self, pos, final):
+        """Decode a `"key": value` pair at pos; returns (key, value, end) or None if incomplete"""
+        key, end = self._decode(pos, final)
+        if end == pos:
+            return None
+        end = self._skip(end)
+        if end >= len(self._buf):
+            if final:
+                raise ValueError("Dữ liệu JSON bị cắt ngang")
+            return None
+        if self._buf[end] != ':':
+            raise ValueError(f"Lỗi phân tích JSON: thiếu ':' tại vị trí {end}")
+        start = self._skip(end + 1)
+        value, end = self._decode(start, final)
+        if end == start:
+            return None
+        return key, value, end
+
+    def _drain(self, final):
+        records = []
+        buf = self._buf
+        while True:
+            pos = self._skip(self._pos, "," if self._mode in ('array', 'mapping') else "")
+            self._pos = pos
+            if pos >= len(buf):
+                return records
+            ch = buf[pos]
+            if self._mode is None:
+                if ch == '[':
+                    self._mode, self._pos, self._seq = 'array', pos + 1, 0
+                    continue
+                if ch == '{' and self._skip(pos + 1) >= len(buf) and not final:
+                    return records
+                if ch == '{' and buf[self._skip(pos + 1)] != '}':
+                    # A mapping of records has a dict as its first value; a bare record does not
+                    member = self._member(self._skip(pos + 1), final)
+                    if member is None:
+                        return records
+                    if isinstance(member[1], dict):
+                        self._mode, self._pos = 'mapping', pos + 1
+                        continue
+                self._mode = 'objects'
+            if self._mode == 'array' and ch == ']' or self._mode == 'mapping' and ch == '}':
+                self._mode, self._pos = None, pos + 1
+                continue
+            if self._mode == 'mapping':
+                member = self._member(pos, final)
+                if member is None:
+                    return records
+                key, value, self._pos = member
+                records.append((str(key), value))
+                continue
+            obj, end = self._decode(pos, final)
+            if end == pos:
+                return records
+            self._pos = end
+            if self._mode == 'objects':
+                self._mode = None
+            records.extend(self._records(obj))
+
+    def _records(self, obj):
+        if not isinstance(obj, dict):
+            raise ValueError(f"Lỗi phân tích JSON: bản ghi không hợp lệ {obj!r}")
+        seq = self._seq
+        self._seq += 1
+        if "index" in obj:
+            return [(str(obj["index"]), obj)]
+        if self._mode == 'array':
+            return [(str(seq), obj)]
+        # A lone object without "index" is itself a mapping of records
+        return [(str(k), v) for k, v in obj.items()]
+
+# =========================
+# Snapshot diffing
+# =========================
+def instance_status(info):
+    """Map a raw info record to the "Running" / "Stopped" values used by the UI"""
+    if not isinstance(info, dict):
+        return "Stopped"
+    if info.get("is_android_started") or info.get("is_process_started"):
+        return "Running"
+    state = str(info.get("status", info.get("player_state", ""))).lower()
+    return "Running" if state in ("running", "start_finished", "started") else "Stopped"
+
+def instance_ready(info):
+    """True once Android inside the instance has finished booting"""
+    if not isinstance(info, dict):
+        return False
+    return bool(info.get("is_android_started")) or str(info.get("player_state", "")).lower() == "start_finished"
+
+class InstanceDelta:
+    """Changes between two `info` snapshots, keyed by instance index"""
+    def __init__(self, added=None, removed=None, changed=None):
+        self.added = added or {}      # index -> info
+        self.removed = removed or {}  # index -> last known info
+        self.changed = changed or {}  # index -> (info, {field: (old, new)})
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.changed)
+
+    def summary(self):
+        return f"+{len(self.added)} / -{len(self.removed)} / ~{len(self.changed)}"
+
+    def merge(self, later):
+        """Fold a later delta into this one, as if both polls had been diffed at once"""
+        for key, info in later.removed.items():
+            self.changed.pop(key, None)
+            if self.added.pop(key, None) is None:
+                self.removed.setdefault(key, info)
+        for key, info in later.added.items():
+            self.added[key] = info  # A VM removed and re-added stays in both; consumers remove then add
+        for key, (info, fields) in later.changed.items():
+            if key in self.added:
+                self.added[key] = info
+            elif key in self.changed:
+                merged = dict(self.changed[key][1])
+                for field, (old, new) in fields.items():
+                    merged[field] = (merged[field][0] if field in merged else old, new)
+                self.changed[key] = (info, {f: v for f, v in merged.items() if v[0] != v[1]})
+            else:
+                self.changed[key] = (info, fields)
+        return self
+
+class SnapshotDiffer:
+    """Keeps the previous `info` snapshot and reports added, removed and changed instances"""
+    def __init__(self):
+        self._snapshot = {}
+        self.status_counts = {"Running": 0, "Stopped": 0}
+
+    def reset(self):
+        self._snapshot = {}
+        self.status_counts = {"Running": 0, "Stopped": 0}
+
+    @property
+    def snapshot(self):
+        """The last adopted snapshot, {index: info} for every instance; treat as read-only"""
+        return self._snapshot
+
+    @staticmethod
+    def _field_changes(old, new):
+        return {f: (old.get(f), new.get(f)) for f in old.keys() | new.keys() if old.get(f) != new.get(f)}
+
+    def diff(self, snapshot):
+        """Compare snapshot with the previous one, adopt it, and return an InstanceDelta"""
+        previous = self._snapshot
+        delta = InstanceDelta()
+        for key, info in snapshot.items():
+            old = previous.get(key)
+            if old is None:
+                delta.added[key] = info
+            elif old != info:
+                delta.changed[key] = (info, self._field_changes(old, info))
+        for key in previous.keys() - snapshot.keys():
+            delta.removed[key] = previous[key]
+        self._apply_counts(delta, previous)
+        self._snapshot = snapshot
+        return delta
+
+    def _apply_counts(self, delta, previous):
+        counts = self.status_counts
+        for info in delta.added.values():
+            counts[instance_status(info)] += 1
+        for info in delta.removed.values():
+            counts[instance_status(info)] -= 1
+        for key, (info, _) in delta.changed.items():
+            old_status, new_status = instance_status(previous[key]), instance_status(info)
+            if old_status != new_status:
+                counts[old_status] -= 1
+                counts[new_status] += 1
+
+# =========================
+# Columnar instance store
+# =========================
+class InstanceStore:
+    """
+    Compact columnar store of instance state for 10k+ VMs, kept sorted by VM index.
+    Columns are typed stdlib arrays (zero-copy NumPy views when NumPy is installed)
+    and names are interned, so counts, ranges and filters never touch per-VM dicts.
+    """
+    STATUS_NAMES = ("Stopped", "Running")
+    STATUS_CODES = {name: code for code, name in enumerate(STATUS_NAMES)}
+    MISSING = -1  # Stored for absent pid / adb_port
+
+    def __init__(self):
+        self.index = array('q')
+        self.status = bytearray()
+        self.pid = array('q')
+        self.adb_port = array('q')
+        self.disk_size = array('q')
+        self.names = []
+        self._rows = {}  # VM index -> row
+
+    def __len__(self):
+        return len(self.index)
+
+    @staticmethod
+    def _int(value, default):
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return default
+
+    def _extract(self, key, info):
+        return (self._int(info.get("index", key), self.MISSING),
+                self.STATUS_CODES[instance_status(info)],
+                self._int(info.get("pid"), self.MISSING),
+                self._int(info.get("adb_port"), self.MISSING),
+                self._int(info.get("disk_size_bytes"), 0),
+                sys.intern(str(info.get("name", ""))))
+
+    def _rebuild(self, rows):
+        rows.sort(key=lambda r: r[0])
+        self.index = array('q', (r[0] for r in rows))
+        self.status = bytearray(r[1] for r in rows)
+        self.pid = array('q', (r[2] for r in rows))
+        self.adb_port = array('q', (r[3] for r in rows))
+        self.disk_size = array('q', (r[4] for r in rows))
+        self.names = [r[5] for r in rows]
+        self._rows = {idx: row for row, idx in enumerate(self.index)}
+
+    def _row_tuple(self, row):
+        return (self.index[row], self.status[row], self.pid[row],
+                self.adb_port[row], self.disk_size[row], self.names[row])
+
+    def load(self, snapshot):
+        """Replace the contents with a full {index: info} snapshot"""
+        self._rebuild([self._extract(key, info) for key, info in snapshot.items()])
+
+    def apply_delta(self, delta):
+        """
+        Apply an InstanceDelta. Returns (structural, rows): structural is True when rows
+        were inserted or removed, otherwise rows lists the rows updated in place.
+        """
+        if delta.added or delta.removed:
+            removed = {self._int(key, self.MISSING) for key in delta.removed}
+            updates = {self._int(key, self.MISSING): (key, info) for key, (info, _) in delta.changed.items()}
+            rows = [self._extract(*updates[idx]) if idx in updates else self._row_tuple(row)
+                    for idx, row in self._rows.items() if idx not in removed]
+            rows.extend(self._extract(key, info) for key, info in delta.added.items())
+            self._rebuild(rows)
+            return True, []
+        changed_rows = []
+        for key, (info, _) in delta.changed.items():
+            row = self._rows.get(self._int(key, self.MISSING))
+            if row is None:
+                continue
+            _, self.status[row], self.pid[row], self.adb_port[row], self.disk_size[row], self.names[row] = \
+                self._extract(key, info)
+            changed_rows.append(row)
+        return False, sorted(changed_rows)
+
+    def row_of(self, index):
+        return self._rows.get(int(index))
+
+    def row_dict(self, row):
+        """Materialise one row as a dict for display code that wants one"""
+        pid, port = self.pid[row], self.adb_port[row]
+        return {"index": self.index[row], "name": self.names[row], "status": self.STATUS_NAMES[self.status[row]],
+                "pid": None if pid == self.MISSING else pid, "adb_port": None if port == self.MISSING else port,
+                "disk_size_bytes": self.disk_size[row]}
+
+    def get(self, index):
+        row = self._rows.get(self._int(index, self.MISSING))
+        return None if row is None else self.row_dict(row)
+
+    def status_counts(self):
+        """Running/Stopped counts straight from the status column"""
+        return {name: self.status.count(code) for code, name in enumerate(self.STATUS_NAMES)}
+
+    def rows_in_range(self, lo, hi):
+        """Rows whose VM index lies in [lo, hi]"""
+        return range(bisect_left(self.index, lo), bisect_right(self.index, hi))
+
+    def rows_with_status(self, status):
+        """Rows whose status equals status, as an ascending list"""
+        code = self.STATUS_CODES[status]
+        if np is not None and self.status:
+            return np.flatnonzero(np.frombuffer(self.status, dtype=np.uint8) == code).tolist()
+        rows, find, needle, pos = [], self.status.find, bytes((code,)), 0
+        while True:
+            pos = find(needle, pos)
+            if pos < 0:
+                return rows
+            rows.append(pos)
+            pos += 1
+
+    def filter_rows(self, status=None, lo=None, hi=None):
+        """Rows matching an optional status and VM index range"""
+        span = self.rows_in_range(-sys.maxsize if lo is None else lo, sys.maxsize if hi is None else hi)
+        if status is None:
+            return list(span)
+        rows = self.rows_with_status(status)
+        return rows[bisect_left(rows, span.start):bisect_left(rows, span.stop)]
+
+    def columns(self):
+        """NumPy views over the numeric columns (requires NumPy)"""
+        return {"index": np.frombuffer(self.index, dtype=np.int64),
+                "status": np.frombuffer(self.status, dtype=np.uint8),
+                "pid": np.frombuffer(self.pid, dtype=np.int64),
+                "adb_port": np.frombuffer(self.adb_port, dtype=np.int64),
+                "disk_size": np.frombuffer(self.disk_size, dtype=np.int64)}
+
+    def memory_bytes(self):
+        """Approximate footprint of the columns (interned names counted once)"""
+        arrays = (self.index, self.pid, self.adb_port, self.disk_size)
+        return (sum(a.buffer_info()[1] * a.itemsize for a in arrays) + len(self.status)
+                + sys.getsizeof(self.names) + sum(sys.getsizeof(n) for n in set(self.names))
+                + sys.getsizeof(self._rows))
+
+# =========================
+# Instance search index
+# =========================
+class InstanceSearchIndex:
+    """
+    In-memory search over instances for the search box. Result sets are Python int
+    bitmaps (bit i = VM index i), so combining name, ID and status terms is a few
+    big-int ANDs regardless of fleet size.
+    Query terms are ANDed: "100-250" is an ID range, digits match an ID prefix or
+    a name substring, status words filter by status, anything else matches names.
+    """
+    STATUS_WORDS = {
+        "running": "Running", "đang chạy": "Running", "chạy": "Running", "online": "Running",
+        "stopped": "Stopped", "đã tắt": "Stopped", "tắt": "Stopped", "offline": "Stopped",
+    }
+    _RANGE = re.compile(r"(\d+)\s*-\s*(\d+)")
+
+    def __init__(self):
+        self.all = 0
+        self.status_bitmaps = {"Running": 0, "Stopped": 0}
+        self._trigrams = {}   # trigram -> bitmap
+        self._entries = {}    # VM index -> (lowercase name, status)
+        self._id_strings = [] # sorted str(VM index), for ID prefix queries
+
+    @staticmethod
+    def _grams(name):
+        return {name[i:i + 3] for i in range(len(name) - 2)}
+
+    @staticmethod
+    def ids(bitmap):
+        """Ascending VM indices set in bitmap"""
+        bits = bin(bitmap)[:1:-1]
+        return [i for i, b in enumerate(bits) if b == "1"]
+
+    def build(self, snapshot):
+        """Index a full {index: info} snapshot from scratch"""
+        self.__init__()
+        self._add_many(snapshot)
+        self._id_strings = sorted(map(str, self._entries))
+
+    def _add_many(self, records):
+        postings, statuses = {}, {"Running": [], "Stopped": []}
+        for key, info in records.items():
+            idx = int(info.get("index", key))
+            name, status = str(info.get("name", "")).lower(), instance_status(info)
+            self._entries[idx] = (name, status)
+            statuses[status].append(idx)
+            for gram in self._grams(name):
+                postings.setdefault(gram, []).append(idx)
+        to_bitmap = self._to_bitmap
+        for gram, ids in postings.items():
+            self._trigrams[gram] = self._trigrams.get(gram, 0) | to_bitmap(ids)
+        for status, ids in statuses.items():
+            self.status_bitmaps[status] |= to_bitmap(ids)
+            self.all |= to_bitmap(ids)
+
+    @staticmethod
+    def _to_bitmap(ids):
+        if not ids:
+            return 0
+        bits = bytearray(max(ids) // 8 + 1)
+        for i in ids:
+            bits[i >> 3] |= 1 << (i & 7)
+        return int.from_bytes(bits, "little")
+
+    def _remove(self, idx):
+        entry = self._entries.pop(idx, None)
+        if entry is None:
+            return
+        mask = ~(1 << idx)
+        name, status = entry
+        for gram in self._grams(name):
+            bitmap = self._trigrams[gram] & mask
+            if bitmap: self._trigrams[gram] = bitmap
+            else: del self._trigrams[gram]
+        self.status_bitmaps[status] &= mask
+        self.all &= mask
+
+    def apply_delta(self, delta):
+        """Update the index from an InstanceDelta instead of rebuilding it"""
+        if not delta:
+            return
+        changed = {key: info for key, (info, _) in delta.changed.items()}
+        for key, info in (*delta.removed.items(), *changed.items()):
+            self._remove(int(info.get("index", key)))
+        self._add_many({**delta.added, **changed})
+        if delta.added or delta.removed:
+            self._id_strings = sorted(map(str, self._entries))
+
+    def _name_matches(self, term):
+        if len(term) < 3:
+            return self._to_bitmap([i for i, (name, _) in self._entries.items() if term in name])
+        bitmap = self.all
+        for gram in self._grams(term):
+            bitmap &= self._trigrams.get(gram, 0)
+            if not bitmap:
+                return 0
+        # Trigrams can co-occur without the whole term; confirm the few candidates
+        return self._to_bitmap([i for i in self.ids(bitmap) if term in self._entries[i][0]])
+
+    def _id_prefix(self, digits):
+        lo = bisect_left(self._id_strings, digits)
+        hi = bisect_left(self._id_strings, digits + "\uffff")
+        return self._to_bitmap([int(i) for i in self._id_strings[lo:hi]])
+
+    def search(self, query, status=None):
+        """Return a bitmap of VM indices matching query and, optionally, a status"""
+        bitmap = self.all if status is None else self.status_bitmaps.get(status, 0)
+        query = query.strip().lower()
+        for phrase, phrase_status in self.STATUS_WORDS.items():
+            if " " in phrase and phrase in query:
+                bitmap &= self.status_bitmaps[phrase_status]
+                query = query.replace(phrase, " ")
+        query = self._RANGE.sub(lambda m: f"{m.group(1)}-{m.group(2)}", query)
+        for term in query.split():
+            if not bitmap:
+                break
+            rng = self._RANGE.fullmatch(term)
+            if rng:
+                lo, hi = sorted((int(rng.group(1)), int(rng.group(2))))
+                hi = min(hi, self.all.bit_length())
+                bitmap &= ((1 << (hi + 1)) - 1) ^ ((1 << lo) - 1)
+            elif term in self.STATUS_WORDS:
+                bitmap &= self.status_bitmaps[self.STATUS_WORDS[term]]
+            elif term.isdigit():
+                bitmap &= self._id_prefix(term) | self._name_matches(term)
+            else:
+                bitmap &= self._name_matches(term)
+        return bitmap
+
+    def search_ids(self, query, status=None):
+        return self.ids(self.search(query, status))
+
+# =========================
+# Instance cache
+# =========================
+class InstanceCache:
+    """
+    Thread-safe LRU cache of instance info with O(1) get/put, per-entry TTL,
+    entry and byte bounds, and hit/miss/eviction counters.
+    """
+    def __init__(self, max_entries=1000, max_bytes=32 * 1024 * 1024, ttl=30.0):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl  # Seconds; None keeps entries until evicted
+        self._entries = OrderedDict()  # key -> (value, size, expires_at)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.expirations = self.invalidations = 0
+
+    @staticmethod
+    def _estimate_size(value):
+        """Cheap footprint estimate: the record dict plus its keys and values, one level deep"""
+        size = sys.getsizeof(value)
+        if isinstance(value, dict):
+            for k, v in value.items():
+                size += sys.getsizeof(k) + sys.getsizeof(v)
+        return size
+
+    def _drop(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[2] is not None and entry[2] <= time.monotonic():
+                self._drop(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, ttl=None):
+        self.update({key: value}, ttl)
+
+    def update(self, items, ttl=None):
+        """Insert or refresh many entries, evicting least recently used ones past either bound"""
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            for key, value in items.items():
+                if key in self._entries:
+                    self._drop(key)
+                size = self._estimate_size(value)
+                self._entries[key] = (value, size, expires_at)
+                self._bytes += size
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, keys):
+        """Drop the given keys; returns how many were cached"""
+        with self._lock:
+            dropped = 0
+            for key in keys:
+                if key in self._entries:
+                    self._drop(key)
+                    dropped += 1
+            self.invalidations += dropped
+            return dropped
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def values(self):
+        """Snapshot of unexpired values; does not touch LRU order or hit counters"""
+        now = time.monotonic()
+        with self._lock:
+            return [value for value, _, expires_at in self._entries.values() if expires_at is None or expires_at > now]
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries), 'bytes': self._bytes,
+                'hits': self.hits, 'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions, 'expirations': self.expirations,
+                'invalidations': self.invalidations,
+            }
+
+# =========================
+# Identity generation (IMEI / MAC)
+# =========================
+class IdentityGenerator:
+    """
+    Bulk generator of Luhn-valid IMEIs and MAC addresses. Values are unique within the
+    generator's lifetime and never collide with `taken` values (e.g. those already
+    assigned to instances). Uses NumPy when available and a pure-Python path otherwise;
+    a seed makes the output reproducible.
+    """
+    IMEI_BODY = 10 ** 14  # 14 random digits + Luhn check digit
+    _HEX = b"0123456789abcdef"
+
+    def __init__(self, seed=None, taken_imeis=(), taken_macs=(), use_numpy=None):
+        self.use_numpy = (np is not None) if use_numpy is None else (use_numpy and np is not None)
+        self._rng = np.random.default_rng(seed) if self.use_numpy else random.Random(seed)
+        imeis, macs = self._keys('imei', taken_imeis), self._keys('mac', taken_macs)
+        # IMEI bodies and MAC values handed out or taken: sets, or sorted int64 arrays with NumPy
+        if self.use_numpy:
+            self._seen = {'imei': np.array(sorted(imeis), dtype=np.int64), 'mac': np.array(sorted(macs), dtype=np.int64)}
+        else:
+            self._seen = {'imei': imeis, 'mac': macs}
+
+    @staticmethod
+    def _keys(kind, values):
+        """IMEI bodies or MAC integers of the well-formed values"""
+        if kind == 'imei':
+            return {int(v[:14]) for v in values if v and len(v) == 15 and v.isdigit()}
+        keys = set()
+        for mac in values:
+            try:
+                keys.add(int(mac.replace(':', '').replace('-', ''), 16))
+            except (AttributeError, ValueError):
+                continue
+        return keys
+
+    @staticmethod
+    def luhn_digit(body_digits):
+        """Check digit for 14 IMEI body digits (same rule as MumuManager.generate_imei)"""
+        total = 0
+        for i, d in enumerate(body_digits):
+            if i % 2 == 0: total += d
+            else:
+                x = d * 2; total += (x % 10) + (x // 10)
+        return (10 - (total % 10)) % 10
+
+    @staticmethod
+    def parse_mac_prefix(prefix):
+        """'AA:BB:*' -> (value of fixed octets, number of fixed octets)"""
+        fixed = [p for p in prefix.strip().rstrip('*').split(':') if p]
+        return (int("".join(fixed), 16) if fixed else 0), len(fixed)
+
+    def _unique(self, n, draw, kind):
+        """Draw until n keys not seen before are collected"""
+        seen, out = self._seen[kind], []
+        while len(out) < n:
+            for value in draw(n - len(out)):
+                if value not in seen:
+                    seen.add(value)
+                    out.append(value)
+        return out
+
+    def _unique_np(self, n, draw, kind):
+        """
+        Vectorized _unique: draw(k) returns (keys, rows); returns the rows of n keys that
+        are unique within the draw and absent from everything handed out before.
+        Collisions are rare in these key spaces, so the common path is one sort and one search.
+        """
+        seen = self._seen[kind]
+        picked, count = [], 0
+        while count < n:
+            keys, rows = draw(n - count)
+            reject = np.zeros(len(keys), dtype=bool)
+            if len(seen):
+                pos = np.minimum(np.searchsorted(seen, keys), len(seen) - 1)
+                reject |= seen[pos] == keys
+            ordered = np.sort(keys)
+            if (ordered[1:] == ordered[:-1]).any():
+                _, first = np.unique(keys, return_index=True)
+                repeated = np.ones(len(keys), dtype=bool)
+                repeated[first] = False
+                reject |= repeated
+            keys, rows = keys[~reject], rows[~reject]
+            seen = np.sort(np.concatenate([seen, keys]))
+            picked.append(rows); count += len(keys)
+        self._seen[kind] = seen
+        return np.concatenate(picked)
+
+    def release(self, kind, values):
+        """Return handed-out IMEIs ('imei') or MACs ('mac') that were discarded unused, so they can be drawn again"""
+        keys = self._keys(kind, values)
+        if not keys:
+            return
+        if self.use_numpy:
+            seen = self._seen[kind]
+            self._seen[kind] = seen[~np.isin(seen, np.fromiter(keys, dtype=np.int64, count=len(keys)))]
+        else:
+            self._seen[kind].difference_update(keys)
+
+    def free_macs(self, prefix=None):
+        """How many more MACs macs(n, prefix) can still hand out"""
+        if not prefix:
+            return (1 << 46) - len(self._seen['mac'])
+        value, fixed = self.parse_mac_prefix(prefix)
+        bits = (6 - fixed) * 8
+        seen = self._seen['mac']
+        if self.use_numpy:
+            used = int(np.count_nonzero((seen >> bits) == value))
+        else:
+            used = sum(1 for v in seen if v >> bits == value)
+        return max(0, (1 << bits) - used)
+
+    def imeis(self, n):
+        """n new unique IMEIs as 15-digit strings"""
+        if n <= 0:
+            return []
+        if not self.use_numpy:
+            bodies = self._unique(n, lambda k: [self._rng.randrange(self.IMEI_BODY) for _ in range(k)], 'imei')
+            result = []
+            for body in bodies:
+                digits = f"{body:014d}"
+                result.append(digits + str(self.luhn_digit(map(int, digits))))
+            return result
+        powers = 10 ** np.arange(13, -1, -1, dtype=np.int64)
+        def draw(k):
+            digits = self._rng.integers(0, 10, (k, 14), dtype=np.uint8)
+            return digits @ powers, digits
+        digits = self._unique_np(n, draw, 'imei')
+        doubled = digits[:, 1::2] * 2
+        total = digits[:, 0::2].sum(axis=1) + (doubled % 10 + doubled // 10).sum(axis=1)
+        chars = np.empty((len(digits), 15), dtype=np.uint8)
+        chars[:, :14] = digits + ord('0')
+        chars[:, 14] = (10 - total % 10) % 10 + ord('0')
+        return [value.decode('ascii') for value in chars.view('S15').ravel().tolist()]
+
+    def macs(self, n, prefix=None):
+        """
+        n new unique MAC addresses ('aa:bb:cc:dd:ee:ff'). Without a prefix the first octet
+        is made locally administered and unicast; with a prefix like 'AA:BB:*' only the
+        remaining octets are random. Raises ValueError if the prefix has too few free values.
+        """
+        if n <= 0:
+            return []
+        base, fixed = self.parse_mac_prefix(prefix) if prefix else (0, 0)
+        bits = (6 - fixed) * 8
+        base <<= bits
+        if fixed == 0:
+            # Clear the multicast bit and set the locally-administered bit of the first octet
+            mask, force = ((1 << 48) - 1) & ~(1 << 40), 1 << 41
+        else:
+            mask, force = (1 << 48) - 1, 0
+        available = self.free_macs(prefix)
+        if n > available:
+            raise ValueError(f"Tiền tố MAC '{prefix}' chỉ còn {available} địa chỉ trống, cần {n}")
+        if not self.use_numpy:
+            values = self._unique(n, lambda k: [((base | self._rng.getrandbits(bits)) & mask) | force
+                                                for _ in range(k)], 'mac')
+            return [":".join(f"{(v >> s) & 0xff:02x}" for s in range(40, -8, -8)) for v in values]
+        def draw(k):
+            values = ((self._rng.integers(0, 1 << bits, k, dtype=np.int64) | base) & mask) | force
+            return values, values
+        values = self._unique_np(n, draw, 'mac')
+        octets = values.astype('>u8').view(np.uint8).reshape(-1, 8)[:, 2:]
+        hex_table = np.frombuffer(self._HEX, dtype=np.uint8)
+        chars = np.full((len(values), 17), ord(':'), dtype=np.uint8)
+        chars[:, 0::3] = hex_table[octets >> 4]
+        chars[:, 1::3] = hex_table[octets & 0xf]
+        return [value.decode('ascii') for value in chars.view('S17').ravel().tolist()]
+
+# =========================
+# Command execution
+# =========================
+class CancelToken:
+    """
+    Cancellation flag shared between a worker and the CLI calls it issues.
+    Cancelling runs the registered callbacks, which kill in-flight child processes.
+    """
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks = {}
+        self._next_id = 0
+        self.reason = None
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def cancel(self, reason="stop"):
+        with self._lock:
+            if self._event.is_set():
+                return
+            self.reason = reason
+            self._event.set()
+            callbacks = list(self._callbacks.values())
+            self._callbacks.clear()
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                pass
+
+    def add_callback(self, callback):
+        """Call callback on cancel (now, if already cancelled); returns a function that unregisters it"""
+        with self._lock:
+            if not self._event.is_set():
+                key = self._next_id
+                self._next_id += 1
+                self._callbacks[key] = callback
+                return lambda: self._callbacks.pop(key, None)
+        callback()
+        return lambda: None
+
+    def wait(self, timeout=None):
+        """Block until cancelled or timeout; returns True if cancelled"""
+        return self._event.wait(timeout)
+
+    @classmethod
+    def all_of(cls, tokens):
+        """
+        Token that cancels once every one of tokens has; None if any of them is None
+        (that caller can never cancel). Returns (token, release); call release() when
+        the shared work is over to drop the callbacks registered on the sources.
+        """
+        tokens = list(tokens)
+        if not tokens or any(t is None for t in tokens):
+            return None, lambda: None
+        unique = list({id(t): t for t in tokens}.values())
+        if len(unique) == 1:
+            return unique[0], lambda: None
+        shared, lock, remaining = cls(), threading.Lock(), [len(unique)]
+        def one_cancelled(source):
+            with lock:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last:
+                shared.cancel(source.reason)
+        releases = [t.add_callback(lambda t=t: one_cancelled(t)) for t in unique]
+        return shared, lambda: [release() for release in releases]
+
+class CancelledMessage(str):
+    """Error message of a CLI call that was aborted through its CancelToken"""
+
+def is_cancelled(result):
+    return isinstance(result, tuple) and len(result) == 2 and isinstance(result[1], CancelledMessage)
+
+class ProcessWatchdog:
+    """One daemon thread that kills child processes which run past their deadline"""
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._deadlines = {}  # Popen -> monotonic deadline
+        self._expired = set()
+        self._thread = None
+
+    def watch(self, proc, timeout):
+        if not timeout:
+            return
+        with self._cond:
+            self._deadlines[proc] = time.monotonic() + timeout
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="mumu-watchdog", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def unwatch(self, proc):
+        """Stop watching proc; returns True if the watchdog killed it"""
+        with self._cond:
+            self._deadlines.pop(proc, None)
+            if proc in self._expired:
+                self._expired.discard(proc)
+                return True
+            return False
+
+    def live(self):
+        with self._cond:
+            return list(self._deadlines)
+
+    def _loop(self):
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                for proc, deadline in list(self._deadlines.items()):
+                    if deadline <= now:
+                        del self._deadlines[proc]
+                        self._expired.add(proc)
+                        _kill(proc)
+                next_deadline = min(self._deadlines.values(), default=None)
+                self._cond.wait(None if next_deadline is None else next_deadline - now)
+
+def _kill(proc):
+    try:
+        if proc.poll() is None:
+            proc.kill()
+    except OSError:
+        pass
+
+class CommandResult:
+    """Outcome of one command run through CommandExecutor.map, with caller metadata and timing"""
+    __slots__ = ('position', 'args', 'meta', 'ok', 'output', 'started', 'elapsed')
+
+    def __init__(self, position, args, meta, ok, output, started, elapsed):
+        self.position = position  # Index of the command in the input sequence
+        self.args = args
+        self.meta = meta
+        self.ok = ok
+        self.output = output
+        self.started = started  # time.time() when the CLI call began
+        self.elapsed = elapsed  # Seconds spent in the CLI call
+
+    def __repr__(self):
+        return f"CommandResult(#{self.position} {' '.join(self.args[:1])} ok={self.ok} {self.elapsed:.2f}s)"
+
+class CommandExecutor:
+    """
+    Bounded pool that runs MuMuManager CLI calls and hands back one future per call.
+    Preflight work (executable check, STARTUPINFO) is done once and reused.
+    """
+    PREFLIGHT_TTL = 5.0  # Seconds before the executable path is checked again
+    # Per-verb timeouts in seconds; a hung CLI call is killed by the watchdog after this long
+    DEFAULT_TIMEOUTS = {
+        'info': 60, 'control': 120, 'simulation': 30, 'adb': 120, 'rename': 30, 'sort': 30,
+        'create': 600, 'clone': 900, 'delete': 600, 'import': 3600, 'export': 3600,
+    }
+    FALLBACK_TIMEOUT = 300
+
+    def __init__(self, executable_path, max_workers=8, max_pending=None, timeouts=None):
         self.executable_path = executable_path
-        # Memory optimization for 10k instances
-        self._instance_cache = {}
-        self._cache_max_size = 1000  # Limit cache size
-        self._cache_access_order = []  # Track access for LRU eviction
-
-    def _run_command(self, args, return_output=False):
-        if not os.path.exists(self.executable_path):
-            return False, f"Lỗi: Không tìm thấy '{os.path.basename(self.executable_path)}' tại đường dẫn đã chỉ định."
-        command = [self.executable_path] + args
+        self.timeouts = {**self.DEFAULT_TIMEOUTS, **(timeouts or {})}
+        self.watchdog = ProcessWatchdog()
+        self.max_workers = max(1, int(max_workers))
+        # submit() blocks once this many calls are queued or running
+        self.max_pending = max(self.max_workers, int(max_pending or self.max_workers * 4))
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="mumu-cli")
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._startupinfo = self._make_startupinfo()
+        self._preflight_lock = threading.Lock()
+        self._preflight_checked_at = None
+        self._preflight_error = None
+        self._stats_lock = threading.Lock()
+        self.stats = {'submitted': 0, 'completed': 0, 'failed': 0}
+
+    @staticmethod
+    def _make_startupinfo():
+        """STARTUPINFO only exists on Windows; other platforms run the CLI as-is"""
+        if not hasattr(subprocess, 'STARTUPINFO'):
+            return None
+        startupinfo = subprocess.STARTUPINFO()
+        startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+        return startupinfo
+
+    def _preflight(self):
+        """Return an error message if the executable is missing, reusing recent checks"""
+        now = time.monotonic()
+        with self._preflight_lock:
+            if self._preflight_checked_at is None or now - self._preflight_checked_at > self.PREFLIGHT_TTL:
+                if os.path.exists(self.executable_path):
+                    self._preflight_error = None
+                else:
+                    self._preflight_error = f"Lỗi: Không tìm thấy '{os.path.basename(self.executable_path)}' tại đường dẫn đã chỉ định."
+                self._preflight_checked_at = now
+            return self._preflight_error
+
+    def _invalidate_preflight(self):
+        with self._preflight_lock:
+            self._preflight_checked_at = None
+
+    def timeout_for(self, args):
+        return self.timeouts.get(args[0] if args else '', self.FALLBACK_TIMEOUT)
+
+    def _spawn(self, args, token, timeout, text):
+        """Start the child, register it with the watchdog and token; returns (proc, unregister)"""
+        command = [self.executable_path] + list(args)
+        kwargs = {'text': True, 'encoding': 'utf-8'} if text else {}
         try:
-            startupinfo = subprocess.STARTUPINFO()
-            startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-            result = subprocess.run(
-                command, check=True, capture_output=True, text=True, encoding='utf-8', startupinfo=startupinfo
-            )
-            output = result.stdout.strip()
-            return (True, output) if return_output else (True, f"Lệnh '{' '.join(args)}' thực thi thành công.")
+            proc = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                    startupinfo=self._startupinfo, **kwargs)
         except Exception as e:
-            error_msg = f"Lỗi khi chạy lệnh {' '.join(command)}:\n{e}"
-            if hasattr(e, 'stderr') and e.stderr:
-                error_msg += f"\nStderr: {e.stderr.strip()}"
-            if hasattr(e, 'stdout') and e.stdout:
-                error_msg += f"\nStdout: {e.stdout.strip()}"
+            if isinstance(e, FileNotFoundError):
+                self._invalidate_preflight()
+            raise RuntimeError(f"Lỗi khi chạy lệnh {' '.join(command)}:\n{e}") from e
+        self.watchdog.watch(proc, self.timeout_for(args) if timeout is None else timeout)
+        unregister = token.add_callback(lambda: _kill(proc)) if token is not None else (lambda: None)
+        return proc, unregister
+
+    def _aborted(self, args, proc, token, timeout):
+        """Error message if the child was killed by the watchdog or its token, else None"""
+        timed_out = self.watchdog.unwatch(proc)
+        if token is not None and token.cancelled and proc.returncode != 0:
+            return CancelledMessage(f"🛑 Đã hủy lệnh '{' '.join(args)}'")
+        if timed_out:
+            limit = self.timeout_for(args) if timeout is None else timeout
+            return f"Lỗi: Lệnh '{' '.join(args)}' quá thời gian {limit}s và đã bị dừng."
+        return None
+
+    def capture(self, args, token=None, timeout=None):
+        """
+        Run one CLI call in the calling thread and return (exit_code, stdout, stderr, error).
+        error is a message and exit_code None when the call could not start, exceeded its
+        per-verb timeout (or `timeout`), or was cancelled through `token`.
+        """
+        args = list(args)
+        if token is not None and token.cancelled:
+            return None, "", "", CancelledMessage(f"🛑 Đã hủy lệnh '{' '.join(args)}'")
+        error = self._preflight()
+        if error:
+            return None, "", "", error
+        try:
+            proc, unregister = self._spawn(args, token, timeout, text=True)
+        except RuntimeError as e:
+            return None, "", "", str(e)
+        try:
+            stdout, stderr = proc.communicate()
+        finally:
+            unregister()
+        aborted = self._aborted(args, proc, token, timeout)
+        if aborted:
+            return None, stdout or "", stderr or "", aborted
+        return proc.returncode, stdout or "", stderr or "", None
+
+    def _outcome(self, args, captured, return_output):
+        """(ok, output) of a captured call, with the usual error message on failure"""
+        exit_code, stdout, stderr, error = captured
+        if error:
+            return False, error
+        if exit_code != 0:
+            command = [self.executable_path] + args
+            error_msg = f"Lỗi khi chạy lệnh {' '.join(command)}:\n{subprocess.CalledProcessError(exit_code, command)}"
+            if stderr.strip():
+                error_msg += f"\nStderr: {stderr.strip()}"
+            if stdout.strip():
+                error_msg += f"\nStdout: {stdout.strip()}"
             return False, error_msg
+        return (True, stdout.strip()) if return_output else (True, f"Lệnh '{' '.join(args)}' thực thi thành công.")
 
-    def get_all_info(self):
-        ok, output = self._run_command(['info', '-v', 'all'], return_output=True)
-        if ok and output:
-            try:
-                data = json.loads(output)
-                if isinstance(data, list):
-                    result = {str(o.get("index", i)): o for i, o in enumerate(data)}
-                    # Update cache with LRU eviction for memory optimization
-                    self._update_cache(result)
-                    return result
-                if isinstance(data, dict):
-                    single_result = {str(data["index"]): data} if "index" in data else data
-                    self._update_cache(single_result)
-                    return single_result
-            except json.JSONDecodeError:
-                try:
-                    json_objects = [json.loads(line) for line in output.strip().split('\n') if line.strip()]
-                    result = {str(obj['index']): obj for obj in json_objects}
-                    self._update_cache(result)
-                    return result
-                except Exception:
-                    return f"Lỗi phân tích JSON. Dữ liệu thô:\n---\n{output}\n---"
-        elif not ok:
-            return output
-        return "Không nhận được dữ liệu từ Manager. Vui lòng thử chạy một giả lập."
-    
-    def _update_cache(self, new_data):
-        """Update instance cache with LRU eviction for memory optimization"""
-        for key, value in new_data.items():
-            if key in self._instance_cache:
-                # Move to end (most recently used)
-                self._cache_access_order.remove(key)
-            elif len(self._instance_cache) >= self._cache_max_size:
-                # Remove least recently used
-                lru_key = self._cache_access_order.pop(0)
-                del self._instance_cache[lru_key]
-            
-            self._instance_cache[key] = value
-            self._cache_access_order.append(key)
-    
-    def get_cached_instance_info(self, index):
-        """Get instance info from cache if available"""
-        key = str(index)
-        if key in self._instance_cache:
-            # Move to end (most recently used)
-            self._cache_access_order.remove(key)
-            self._cache_access_order.append(key)
-            return self._instance_cache[key]
+    def run(self, args, return_output=False, token=None, timeout=None):
+        """
+        Run one CLI call in the calling thread. The child is killed when it exceeds its
+        per-verb timeout (or `timeout`) or when `token` is cancelled.
+        """
+        args = list(args)
+        return self._outcome(args, self.capture(args, token, timeout), return_output)
+
+    def stream(self, args, chunk_size=65536, token=None, timeout=None):
+        """
+        Run a CLI call in the calling thread and yield stdout text as it arrives.
+        Raises RuntimeError with the usual error message if the call fails, times out or is cancelled.
+        """
+        args = list(args)
+        if token is not None and token.cancelled:
+            raise RuntimeError(CancelledMessage(f"🛑 Đã hủy lệnh '{' '.join(args)}'"))
+        error = self._preflight()
+        if error:
+            raise RuntimeError(error)
+        proc, unregister = self._spawn(args, token, timeout, text=False)
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        # stderr is drained concurrently: a child filling that pipe while we wait on stdout would block forever
+        stderr_chunks = []
+        drain = threading.Thread(target=lambda: stderr_chunks.extend(iter(proc.stderr.read1, b"")),
+                                 name="mumu-stderr", daemon=True)
+        drain.start()
+        try:
+            while True:
+                data = proc.stdout.read1(chunk_size)
+                if not data:
+                    break
+                text = decoder.decode(data)
+                if text:
+                    yield text
+            tail = decoder.decode(b"", final=True)
+            if tail:
+                yield tail
+            proc.wait()
+            drain.join()
+            stderr = b"".join(stderr_chunks).decode('utf-8', errors='replace').strip()
+            aborted = self._aborted(args, proc, token, timeout)
+            if aborted:
+                raise RuntimeError(aborted)
+            if proc.returncode != 0:
+                error_msg = f"Lỗi khi chạy lệnh {' '.join([self.executable_path] + args)}:\nExit code {proc.returncode}"
+                if stderr:
+                    error_msg += f"\nStderr: {stderr}"
+                raise RuntimeError(error_msg)
+        finally:
+            unregister()
+            if proc.poll() is None:
+                proc.kill()
+                proc.wait()
+            self.watchdog.unwatch(proc)
+            drain.join()
+            proc.stdout.close()
+            proc.stderr.close()
+
+    def submit(self, args, return_output=False, token=None, timeout=None):
+        """Queue a CLI call and return a Future resolving to (ok, output)"""
+        return self.submit_call(self.run, list(args), return_output, token, timeout)
+
+    def submit_call(self, fn, *fn_args):
+        """
+        Queue fn(*fn_args) on the pool under the same slots as CLI calls; fn returns
+        (ok, value) like run(). Blocks while max_pending calls are queued or running.
+        """
+        self._slots.acquire()
+        with self._stats_lock:
+            self.stats['submitted'] += 1
+        try:
+            future = self._pool.submit(fn, *fn_args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(self._on_done)
+        return future
+
+    def _on_done(self, future):
+        self._slots.release()
+        ok = not future.cancelled() and future.exception() is None and future.result()[0]
+        with self._stats_lock:
+            self.stats['completed' if ok else 'failed'] += 1
+
+    def _run_timed(self, position, args, meta, return_output, token):
+        started, t0 = time.time(), time.monotonic()
+        ok, output = self.run(args, return_output, token)
+        return ok, CommandResult(position, args, meta, ok, output, started, time.monotonic() - t0)
+
+    def map(self, commands, ordered=True, return_output=False, window=None, token=None):
+        """
+        Run many commands through the pool and yield a CommandResult for each one,
+        in input order (ordered=True) or as soon as each finishes. Commands are
+        argument sequences or (args, meta) pairs whose args is a list or tuple. At most
+        `window` commands are queued at a time, so the input may be a lazy iterable of any length.
+        """
+        def call(item):
+            position, command = item
+            args, meta = self._split_command(command)
+            return self._run_timed(position, list(args), meta, return_output, token)
+        return self.map_calls(call, enumerate(commands), ordered, window, token)
+
+    def map_calls(self, fn, items, ordered=True, window=None, token=None):
+        """
+        Run fn(item) for each item through the pool (see submit_call) and yield the
+        value of each (ok, value), in input order or as each finishes. At most `window`
+        calls are queued at a time; no new calls start once `token` is cancelled.
+        """
+        window = max(1, window or self.max_workers)
+        pending = deque() if ordered else set()
+        add = pending.append if ordered else pending.add
+        for item in items:
+            if token is not None and token.cancelled:
+                break
+            add(self.submit_call(fn, item))
+            while len(pending) >= window:
+                yield from self._drain_one(pending, ordered)
+        while pending:
+            yield from self._drain_one(pending, ordered)
+
+    @staticmethod
+    def _split_command(command):
+        """(args, meta) of a map() input; a plain tuple of strings is a command, not a pair"""
+        if isinstance(command, tuple) and len(command) == 2 and isinstance(command[0], (list, tuple)):
+            return command
+        return command, None
+
+    @staticmethod
+    def _drain_one(pending, ordered):
+        if ordered:
+            yield pending.popleft().result()[1]
+            return
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            pending.discard(future)
+            yield future.result()[1]
+
+    def kill_all(self):
+        """Kill every child process this executor is currently waiting on"""
+        for proc in self.watchdog.live():
+            _kill(proc)
+
+    def shutdown(self, wait=False, kill=False):
+        """Stop accepting calls; queued calls that have not started are dropped"""
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        if kill:
+            self.kill_all()
+        if wait:
+            self._pool.shutdown(wait=True)
+
+def future_result(future):
+    """(ok, msg) of a finished command future, turning exceptions and cancellation into failures"""
+    try:
+        return future.result()
+    except Exception as e:
+        return False, str(e) or type(e).__name__
+
+class ArgvPacker:
+    """
+    Packs index lists into as few `-v a,b,c` arguments as the command-line limit allows,
+    instead of splitting by a fixed count that ignores how long the indices are.
+    """
+    SAFETY_MARGIN = 2048  # Characters kept free for quoting and environment growth
+    WINDOWS_LIMIT = 32767  # CreateProcess lpCommandLine limit
+    POSIX_ARG_LIMIT = 131072  # Linux MAX_ARG_STRLEN caps any single argument
+
+    def __init__(self, executable_path, limit=None):
+        self.executable_path = executable_path
+        self.limit = limit or self.platform_limit()
+        self.stats = {'invocations': 0, 'saved': 0}
+
+    @classmethod
+    def platform_limit(cls):
+        if os.name == 'nt':
+            return cls.WINDOWS_LIMIT - cls.SAFETY_MARGIN
+        try:
+            arg_max = os.sysconf('SC_ARG_MAX')
+        except (AttributeError, ValueError, OSError):
+            arg_max = cls.POSIX_ARG_LIMIT
+        env_size = sum(len(k) + len(v) + 2 for k, v in os.environ.items())
+        return min(arg_max - env_size, cls.POSIX_ARG_LIMIT) - cls.SAFETY_MARGIN
+
+    @staticmethod
+    def _arg_length(arg):
+        arg = str(arg)
+        return len(arg) + (2 if not arg or ' ' in arg or '\t' in arg else 0) + 1
+
+    def pack(self, indices, fixed_args=(), baseline_chunk=100):
+        """
+        Split indices into chunks whose full command line (executable, fixed_args and the
+        -v list) fits the limit. Records how many calls this saved against baseline_chunk.
+        """
+        indices = list(indices)
+        budget = self.limit - self._arg_length(self.executable_path) - sum(map(self._arg_length, fixed_args)) - 3
+        if budget <= 0:
+            raise ValueError("Command line is too long even without indices")
+        chunks, current, used = [], [], 0
+        for idx in indices:
+            cost = len(str(idx)) + (1 if current else 0)
+            if current and used + cost > budget:
+                chunks.append(current)
+                current, used, cost = [], 0, len(str(idx))
+            current.append(idx)
+            used += cost
+        if current:
+            chunks.append(current)
+        baseline = -(-len(indices) // baseline_chunk) if baseline_chunk else len(chunks)
+        self.stats['invocations'] += len(chunks)
+        self.stats['saved'] += max(0, baseline - len(chunks))
+        return chunks
+
+class BatchOutcome:
+    """Per-index results of a parallel batch: index -> (ok, msg)"""
+    def __init__(self, action):
+        self.action = action
+        self.results = {}
+        self.invocations = 0
+        self.elapsed = 0.0
+
+    @property
+    def ok(self):
+        return all(ok for ok, _ in self.results.values())
+
+    @property
+    def failed(self):
+        return sorted(idx for idx, (ok, _) in self.results.items() if not ok)
+
+    def summary(self):
+        failed = self.failed
+        text = (f"{len(self.results) - len(failed)}/{len(self.results)} instances '{self.action}' OK "
+                f"in {self.invocations} calls, {self.elapsed:.1f}s")
+        if failed:
+            text += f"; failed: {','.join(map(str, failed[:20]))}{'...' if len(failed) > 20 else ''}"
+        return text
+
+class LaunchPipeline:
+    """
+    Readiness-aware launcher: keeps at most `max_booting` VMs booting and launches the
+    next one as soon as a booting VM is confirmed ready, either through `info`
+    (Android started) or `adb getprop sys.boot_completed`. VMs not ready within
+    boot_timeout count as failed. After a cancellation run() continues where it stopped.
+    An optional AdaptiveRateController and sampler lower max_booting under host load.
+    """
+    CHECKS = ('info', 'adb')
+
+    def __init__(self, manager, indices, max_booting=8, check='info', poll_interval=1.0, boot_timeout=180.0,
+                 controller=None, sampler=None, launch_retries=0):
+        if check not in self.CHECKS:
+            raise ValueError(f"Kiểu kiểm tra sẵn sàng không hợp lệ: {check}")
+        self.manager = manager
+        self.max_booting = max(1, int(max_booting))
+        self.check = check
+        self.poll_interval = poll_interval
+        self.boot_timeout = boot_timeout
+        # Retries back off inside parallel_batch_control and would stall the other boots
+        self.launch_retries = launch_retries
+        self.controller = controller
+        self.sampler = sampler or (HostLoadSampler() if controller else None)
+        self.pending = deque(indices)
+        self.booting = {}  # index -> monotonic launch time
+        self.total = len(self.pending)
+        self.outcome = BatchOutcome('launch')
+        self.boot_times = {}
+        self.stats = {'launch_calls': 0, 'polls': 0}
+
+    @property
+    def done(self):
+        return not self.pending and not self.booting
+
+    def limit(self):
+        """Current cap on VMs booting at once"""
+        if self.controller is None:
+            return self.max_booting
+        return min(self.max_booting, self.controller.update(self.sampler.sample()))
+
+    def run(self, token=None, on_result=None):
+        """
+        Launch and poll until every VM is ready or failed, or until token is cancelled.
+        on_result(index, ok, msg) is called as each VM settles. Returns the BatchOutcome.
+        """
+        started = time.monotonic()
+        try:
+            while not self.done and not (token is not None and token.cancelled):
+                self._fill(token, on_result)
+                if not self.booting:
+                    continue
+                if token is not None:
+                    if token.wait(self.poll_interval):
+                        break
+                else:
+                    time.sleep(self.poll_interval)
+                self._poll(token, on_result)
+        finally:
+            self.outcome.elapsed += time.monotonic() - started
+        return self.outcome
+
+    def _finish(self, idx, ok, msg, on_result):
+        self.booting.pop(idx, None)
+        self.outcome.results[idx] = (ok, msg)
+        if on_result:
+            on_result(idx, ok, msg)
+
+    def _fill(self, token, on_result):
+        free = self.limit() - len(self.booting)
+        if free <= 0 or not self.pending:
+            return
+        chunk = [self.pending.popleft() for _ in range(min(free, len(self.pending)))]
+        now = time.monotonic()
+        result = self.manager.parallel_batch_control(chunk, 'launch', max_retries=self.launch_retries, token=token)
+        self.stats['launch_calls'] += result.invocations
+        self.outcome.invocations += result.invocations
+        requeue = []
+        for idx in chunk:
+            ok, msg = result.results.get(idx, (False, None))
+            if ok:
+                self.booting[idx] = now
+            elif msg is None or isinstance(msg, CancelledMessage):
+                requeue.append(idx)
+            else:
+                self._finish(idx, False, msg, on_result)
+        self.pending.extendleft(reversed(requeue))
+
+    def _poll(self, token, on_result):
+        booting = sorted(self.booting)
+        self.stats['polls'] += 1
+        ready = self._ready_info(booting, token) if self.check == 'info' else self._ready_adb(booting, token)
+        now = time.monotonic()
+        for idx in booting:
+            elapsed = now - self.booting[idx]
+            if idx in ready:
+                self.boot_times[idx] = elapsed
+                self._finish(idx, True, f"sẵn sàng sau {elapsed:.1f}s", on_result)
+            elif elapsed > self.boot_timeout:
+                self._finish(idx, False, f"không sẵn sàng sau {self.boot_timeout:g}s", on_result)
+
+    def _ready_info(self, booting, token):
+        ok, output = self.manager._run_command(
+            ['info', '-v', ",".join(map(str, booting))], return_output=True, token=token)
+        self.outcome.invocations += 1
+        info = self.manager._parse_info_output(ok, output)
+        if not isinstance(info, dict):
+            return set()
+        return {idx for idx in booting if instance_ready(info.get(str(idx)))}
+
+    def _ready_adb(self, booting, token):
+        commands = [(['adb', '-v', str(idx), '-c', 'getprop sys.boot_completed'], idx) for idx in booting]
+        results = self.manager.run_commands(commands, return_output=True, token=token)
+        self.outcome.invocations += len(results)
+        return {r.meta for r in results if r.ok and r.output.strip() == '1'}
+
+class ControlCoalescer:
+    """
+    Gathers `control` requests for the same action that arrive within a short window
+    and sends them as one `control -v a,b,c` call (split into chunks when large).
+    Each caller still gets its own (ok, msg); when a merged call fails its callers
+    are split in halves and retried, so one bad VM cannot fail its neighbours.
+    """
+    def __init__(self, manager, window=0.005):
+        self.manager = manager
+        self.window = window
+        self._lock = threading.Lock()
+        self._pending = {}  # action -> [(indices, Future, CancelToken or None)]
+        self.stats = {'requests': 0, 'invocations': 0}
+
+    def submit(self, indices, action, token=None):
+        """
+        Queue a control request; returns a Future of (ok, msg). Cancelling `token`
+        resolves this caller's future at once; the shared call keeps running for the
+        others and its child is killed when the last caller on it cancels.
+        """
+        future = Future()
+        if token is not None:
+            unregister = token.add_callback(lambda: self._settle(
+                future, (False, CancelledMessage(f"🛑 Đã hủy lệnh 'control {action}'"))))
+            future.add_done_callback(lambda _: unregister())
+            if future.done():
+                return future
+        with self._lock:
+            self.stats['requests'] += 1
+            batch = self._pending.get(action)
+            if batch is None:
+                batch = self._pending[action] = []
+                timer = threading.Timer(self.window, self._flush, args=(action,))
+                timer.daemon = True
+                timer.start()
+            batch.append((list(indices), future, token))
+        return future
+
+    def _call(self, indices, action, tokens):
+        """One shared CLI call; its child is killed only once every caller riding on it has cancelled"""
+        with self._lock:
+            self.stats['invocations'] += 1
+        token, release = CancelToken.all_of(tokens)
+        call = self.manager.submit_command(['control', '-v', ",".join(map(str, indices)), action], token=token)
+        call.add_done_callback(lambda _: release())
+        return call
+
+    def _flush(self, action):
+        with self._lock:
+            batch = self._pending.pop(action, [])
+        try:
+            self._run_group(batch, action)
+        except Exception as e:
+            # Runs on a Timer thread: an error here must still settle every caller (e.g. after shutdown)
+            for _, future, _ in batch:
+                self._settle(future, (False, str(e)))
+
+    def _run_group(self, batch, action):
+        batch = [entry for entry in batch if not entry[1].done()]
+        if not batch:
+            return
+        if len(batch) == 1:
+            indices, future, token = batch[0]
+            self._resolve(future, self._call(indices, action, [token]))
+            return
+        merged = list(dict.fromkeys(i for indices, _, _ in batch for i in indices))
+        chunks = self.manager.packer.pack(merged, ['control', '-v', action])
+        chunk_of = {idx: n for n, chunk in enumerate(chunks) for idx in chunk}
+        chunk_tokens = [[] for _ in chunks]
+        for indices, _, token in batch:
+            for n in {chunk_of[i] for i in indices}:
+                chunk_tokens[n].append(token)
+        chunk_futures = [self._call(chunk, action, tokens) for chunk, tokens in zip(chunks, chunk_tokens)]
+        failed = []
+        for indices, future, token in batch:
+            results = [future_result(chunk_futures[n]) for n in sorted({chunk_of[i] for i in indices})]
+            if all(ok for ok, _ in results):
+                self._settle(future, (True, f"Lệnh 'control -v {','.join(map(str, indices))} {action}' thực thi thành công."))
+            elif not future.done():
+                failed.append((indices, future, token))
+        # Bisect the callers of failed chunks until each one sees its own outcome
+        half = (len(failed) + 1) // 2
+        for group in (failed[:half], failed[half:]):
+            if group:
+                self._run_group(group, action)
+
+    def _resolve(self, future, call_future):
+        call_future.add_done_callback(lambda f: self._settle(future, future_result(f)))
+
+    @staticmethod
+    def _settle(future, result):
+        """Set result unless the caller's future was already resolved by cancellation"""
+        try:
+            future.set_result(result)
+        except InvalidStateError:
+            pass
+
+class MumuManager:
+    # control actions that are safe to send again to a VM that already ran them. Bisecting
+    # or retrying a failed multi-VM call re-sends it to its VMs that succeeded
+    IDEMPOTENT_ACTIONS = frozenset({'launch', 'shutdown'})
+    # control actions merged across callers when they arrive together (failures are bisected)
+    COALESCED_ACTIONS = IDEMPOTENT_ACTIONS
+
+    def __init__(self, executable_path, executor=None, coalesce_window=0.005, timeouts=None):
+        self.executable_path = executable_path
+        # All CLI calls go through one bounded executor so callers never oversubscribe the host
+        self.executor = executor or CommandExecutor(
+            executable_path, max_workers=PerformanceConfig.get_config(1000)['max_concurrent'], timeouts=timeouts)
+        # Memory optimization for 10k instances
+        self.cache = InstanceCache(max_entries=1000)
+        self._differ = SnapshotDiffer()
+        # VMs a command changed since the last poll; their snapshot entry is no longer trusted
+        self._stale, self._stale_all = set(), False
+        self.packer = ArgvPacker(executable_path)
+        # Simulation values this manager has written successfully: key -> {index: value}
+        self._assigned = {'imei': {}, 'mac_address': {}}
+        # Bursty launch/shutdown requests share CLI calls; a falsy window disables merging
+        self.coalescer = ControlCoalescer(self, window=coalesce_window) if coalesce_window else None
+
+    # CLI verbs that change instance state; their -v targets are dropped from the cache
+    MUTATING_VERBS = frozenset({'control', 'delete', 'rename', 'simulation'})
+
+    def _invalidate_for(self, args):
+        if not args or args[0] not in self.MUTATING_VERBS or '-v' not in args:
+            return
+        selector = args[args.index('-v') + 1]
+        if selector == 'all':
+            self.cache.clear()
+            self._stale_all = True
+        else:
+            keys = selector.split(',')
+            self.cache.invalidate(keys)
+            self._stale.update(keys)
+
+    def _run_command(self, args, return_output=False, token=None):
+        result = self.executor.submit(args, return_output, token).result()
+        self._invalidate_for(args)
+        return result
+
+    def submit_command(self, args, return_output=False, token=None):
+        """Queue a CLI call without waiting; returns a Future of (ok, output)"""
+        future = self.executor.submit(args, return_output, token)
+        future.add_done_callback(lambda _: self._invalidate_for(args))
+        return future
+
+    def shutdown(self):
+        """Release executor threads and kill running CLI calls when this manager is replaced"""
+        self.executor.shutdown(kill=True)
+
+    def get_all_info(self):
+        """Return {index: info} for every instance, or an error string for the UI"""
+        try:
+            result = dict(self.iter_all_info())
+        except (RuntimeError, ValueError) as e:
+            return str(e)
+        return result or "Không nhận được dữ liệu từ Manager. Vui lòng thử chạy một giả lập."
+
+    def iter_all_info(self, chunk_size=65536, update_cache=True):
+        """
+        Yield (index, info) pairs while `info -v all` is still writing, feeding the cache as they arrive.
+        Raises RuntimeError if the CLI fails and ValueError if its output is not valid JSON.
+        """
+        decoder = InfoStreamDecoder()
+        for text in self.executor.stream(['info', '-v', 'all'], chunk_size):
+            records = decoder.feed(text)
+            if records:
+                # Update cache with LRU eviction for memory optimization
+                if update_cache: self._update_cache(dict(records))
+                yield from records
+        records = decoder.close()
+        if records:
+            if update_cache: self._update_cache(dict(records))
+            yield from records
+
+    def poll_changes(self):
+        """
+        Fetch a fresh snapshot and return an InstanceDelta against the previous poll,
+        or an error string. Only added and changed instances are written to the cache;
+        the unchanged rest is served from the kept snapshot (see get_cached_instance_info).
+        """
+        # Commands finishing from here on may predate or postdate this snapshot: keep them stale
+        stale, stale_all = self._stale, self._stale_all
+        self._stale, self._stale_all = set(), False
+        try:
+            snapshot = dict(self.iter_all_info(update_cache=False))
+        except (RuntimeError, ValueError) as e:
+            self._stale |= stale
+            self._stale_all = self._stale_all or stale_all
+            return str(e)
+        delta = self._differ.diff(snapshot)
+        self._update_cache(delta.added)
+        self._update_cache({key: info for key, (info, _) in delta.changed.items()})
+        self.cache.invalidate(delta.removed)
+        return delta
+
+    def status_counts(self):
+        """Running/Stopped counts as of the last poll_changes()"""
+        return dict(self._differ.status_counts)
+
+    def _parse_info_output(self, ok, output):
+        """Turn buffered `info` output into {index: info}, or an error string for the UI"""
+        if ok and output:
+            decoder = InfoStreamDecoder()
+            try:
+                result = dict(decoder.feed(output))
+                result.update(decoder.close())
+            except ValueError as e:
+                return f"{e}. Dữ liệu thô:\n---\n{output[:2000]}\n---"
+            self._update_cache(result)
+            return result
+        elif not ok:
+            return output
+        return "Không nhận được dữ liệu từ Manager. Vui lòng thử chạy một giả lập."
+    
+    def _update_cache(self, new_data):
+        """Update instance cache with LRU eviction for memory optimization"""
+        self.cache.update(new_data)
+    
+    def get_cached_instance_info(self, index):
+        """
+        Instance info from the cache if available and not expired, else from the last
+        poll's snapshot unless a command has changed that VM since
+        """
+        key = str(index)
+        info = self.cache.get(key)
+        if info is None and not self._stale_all and key not in self._stale:
+            info = self._differ.snapshot.get(key)
+        return info
+    
+    def clear_cache(self):
+        """Clear instance cache to free memory"""
+        self.cache.clear()
+
+    def cache_stats(self):
+        """Hit/miss/eviction counters and current size of the instance cache"""
+        return self.cache.stats()
+
+    def control_instance(self, indices, action, token=None):
+        if self.coalescer and action in self.COALESCED_ACTIONS:
+            return self.coalescer.submit(indices, action, token).result()
+        return self._run_command(['control', '-v', ",".join(map(str, indices)), action], token=token)
+
+    def create_instance(self, count):
+        return self._run_command(['create', '-n', str(count)])
+
+    def clone_instance(self, source_index, count):
+        return self._run_command(['clone', '-v', str(source_index), '-n', str(count)])
+
+    def delete_instance(self, indices):
+        return self._run_command(['delete', '-v', ",".join(map(str, indices))])
+
+    def rename_instance(self, index, new_name):
+        return self._run_command(['rename', '-v', str(index), '-n', new_name])
+
+    def import_instance(self, path, count):
+        return self._run_command(['import', '-p', path, '-n', str(count)])
+
+    def export_instance(self, indices, directory, name, compress):
+        args = ['export', '-v', ",".join(map(str, indices)), '-d', directory, '-n', name]
+        if compress: args.append('--zip')
+        return self._run_command(args)
+
+    def sort_windows(self):
+        return self._run_command(['sort'])
+
+    # IMEI/MAC
+    @staticmethod
+    def generate_imei():
+        rand_part = [random.randint(0, 9) for _ in range(14)]
+        total = 0
+        for i, d in enumerate(rand_part):
+            if i % 2 == 0: total += d
+            else:
+                x = d * 2; total += (x % 10) + (x // 10)
+        checksum = (10 - (total % 10)) % 10
+        return "".join(map(str, rand_part + [checksum]))
+
+    def set_imei(self, indices, imei, token=None):
+        result = self._run_command(['simulation', '-v', ",".join(map(str, indices)), '-sk', 'imei', '-sv', imei], token=token)
+        if result[0]: self._remember('imei', indices, imei)
+        return result
+
+    def set_mac(self, indices, mac, token=None):
+        result = self._run_command(['simulation', '-v', ",".join(map(str, indices)), '-sk', 'mac_address', '-sv', mac], token=token)
+        if result[0]: self._remember('mac_address', indices, mac)
+        return result
+
+    def _remember(self, key, indices, value):
+        assigned = self._assigned.get(key)
+        if assigned is not None:
+            assigned.update((str(idx), value) for idx in indices)
+
+    def known_identities(self):
+        """
+        (IMEIs, MACs) already in use: values written by this manager plus those in the last
+        full snapshot (every VM, not just the few the LRU cache holds) and in cached info
+        """
+        imeis = set(self._assigned['imei'].values())
+        macs = set(self._assigned['mac_address'].values())
+        for info in itertools.chain(self._differ.snapshot.values(), self.cache.values()):
+            if isinstance(info, dict):
+                if info.get('imei'): imeis.add(str(info['imei']))
+                for field in ('mac_address', 'mac'):
+                    if info.get(field): macs.add(str(info[field]).lower())
+        return imeis, macs
+
+    def identity_generator(self, seed=None):
+        """IdentityGenerator that avoids every IMEI/MAC this manager knows to be in use"""
+        imeis, macs = self.known_identities()
+        return IdentityGenerator(seed, taken_imeis=imeis, taken_macs=macs)
+
+    def run_adb_command(self, indices, command_str, token=None):
+        return self._run_command(['adb', '-v', ",".join(map(str, indices)), '-c', command_str], token=token)
+
+    def fanout_adb_command(self, indices, command_str, token=None, on_result=None, **options):
+        """Run command_str on every VM separately; returns the AdbFanout with per-VM results and grouped outputs"""
+        fanout = AdbFanout(self, indices, command_str, **options)
+        fanout.run(token, on_result)
+        return fanout
+
+    # Optimization methods for 10k+ instances
+    def _chunks(self, indices, fixed_args, chunk_size):
+        """Fixed-count chunks when chunk_size is given, otherwise pack to the command-line limit"""
+        indices = list(indices)
+        if chunk_size:
+            return [indices[i:i + chunk_size] for i in range(0, len(indices), chunk_size)]
+        return self.packer.pack(indices, fixed_args)
+
+    def _run_packed(self, indices, build_args, chunk_size=None, token=None):
+        """Run build_args(chunk) for each chunk of indices, stopping at the first failure"""
+        fixed_args = build_args([])
+        chunks = self._chunks(indices, fixed_args, chunk_size)
+        for n, chunk in enumerate(chunks, start=1):
+            ok, msg = self._run_command(build_args(chunk), token=token)
+            if not ok:
+                return False, f"Batch failed at chunk {n}: {msg}"
+        return True, f"Successfully processed {len(indices)} instances in {len(chunks)} chunks"
+
+    def batch_control_instance(self, indices, action, chunk_size=None, parallel=False, max_concurrent=None,
+                               token=None):
+        """
+        Optimized batch control for large number of instances
+        Packs each -v list up to the command line limit; pass chunk_size for fixed-size chunks.
+        parallel=True runs chunks concurrently and isolates failing VMs (see parallel_batch_control).
+        """
+        if parallel:
+            outcome = self.parallel_batch_control(indices, action, chunk_size, max_concurrent, token=token)
+            return outcome.ok, outcome.summary()
+        chunks = self._chunks(indices, ['control', '-v', action], chunk_size)
+        if len(chunks) <= 1:
+            return self.control_instance(list(indices), action, token)
+        
+        results = []
+        for n, chunk in enumerate(chunks, start=1):
+            ok, msg = self.control_instance(chunk, action, token)
+            results.append((ok, msg))
+            if is_cancelled((ok, msg)):
+                return ok, msg
+            if not ok:
+                return False, f"Batch failed at chunk {n}: {msg}"
+        
+        return True, f"Successfully processed {len(indices)} instances in {len(results)} chunks"
+
+    def parallel_batch_control(self, indices, action, chunk_size=None, max_concurrent=None,
+                               max_retries=2, backoff=0.5, token=None):
+        """
+        Run control chunks concurrently (up to max_concurrent in flight). Without chunk_size,
+        packed chunks are split so there are at least max_concurrent of them. A failed chunk is
+        bisected until the bad indices are isolated; single indices are retried with
+        exponential backoff. Both re-send the action to VMs of the chunk that already ran it,
+        so actions outside IDEMPOTENT_ACTIONS (e.g. restart) are never re-sent: every VM of
+        a failed chunk is reported failed instead.
+        Returns a BatchOutcome with one result per index.
+        Cancelling `token` kills the running chunks and leaves unscheduled indices out of the outcome.
+        """
+        limit = max_concurrent or self.executor.max_workers
+        chunks = self._chunks(indices, ['control', '-v', action], chunk_size)
+        if not chunk_size:
+            chunks = self._spread(chunks, limit)
+        isolate = action in self.IDEMPOTENT_ACTIONS
+        return self._run_parallel(
+            [(chunk, action) for chunk in chunks],
+            lambda chunk, action: ['control', '-v', ",".join(map(str, chunk)), action],
+            BatchOutcome(action), max_concurrent, max_retries if isolate else 0, backoff, token, isolate=isolate)
+
+    @staticmethod
+    def _spread(chunks, parts):
+        """Split chunks evenly so there are at least `parts` of them (when there are that many indices)"""
+        total = sum(map(len, chunks))
+        if len(chunks) >= parts or total <= len(chunks):
+            return chunks
+        size = -(-total // min(parts, total))
+        return [chunk[i:i + size] for chunk in chunks for i in range(0, len(chunk), size)]
+
+    def apply_simulation(self, assignments, max_concurrent=None, max_retries=2, backoff=0.5, token=None,
+                         on_result=None):
+        """
+        Write many simulation values concurrently; assignments are (index, key, value) triples.
+        VMs that share a (key, value) pair are packed into one `simulation -v a,b,c` call,
+        distinct values run as single calls through the pool, and failures are bisected and
+        retried as in parallel_batch_control. Returns a BatchOutcome keyed by (index, key).
+        """
+        groups = {}
+        for idx, key, value in assignments:
+            groups.setdefault((key, value), []).append(idx)
+        work = []
+        for (key, value), group in groups.items():
+            for chunk in self._chunks(group, ['simulation', '-v', '-sk', key, '-sv', value], None):
+                work.append((chunk, (key, value)))
+        def build_args(chunk, setting):
+            return ['simulation', '-v', ",".join(map(str, chunk)), '-sk', setting[0], '-sv', setting[1]]
+        outcome = self._run_parallel(work, build_args, BatchOutcome('simulation'), max_concurrent, max_retries,
+                                     backoff, token, on_result, result_key=lambda idx, setting: (idx, setting[0]))
+        for idx, key, value in assignments:
+            if outcome.results.get((idx, key), (False, None))[0]:
+                self._remember(key, [idx], value)
+        return outcome
+
+    def _run_parallel(self, work, build_args, outcome, max_concurrent=None, max_retries=2, backoff=0.5,
+                      token=None, on_result=None, result_key=lambda idx, payload: idx, isolate=True):
+        """
+        Scheduler shared by the parallel batch methods. work is a list of (chunk, payload) and
+        build_args(chunk, payload) returns the CLI args for one call. Each settled chunk is
+        stored in outcome.results under result_key(idx, payload) and reported to
+        on_result(keys, ok, msg) when given. isolate=False settles a failed multi-index
+        chunk as failed instead of bisecting it.
+        """
+        started = time.monotonic()
+        limit = max_concurrent or self.executor.max_workers
+        # Work items: (not_before, seq, chunk, payload, attempt); seq keeps heap ordering stable
+        queue = [(0.0, n, chunk, payload, 0) for n, (chunk, payload) in enumerate(work)]
+        seq = len(queue)
+        in_flight = {}
+        def settle(chunk, payload, ok, msg):
+            keys = [result_key(idx, payload) for idx in chunk]
+            outcome.results.update((key, (ok, msg)) for key in keys)
+            if on_result:
+                on_result(keys, ok, msg)
+        while queue or in_flight:
+            if token is not None and token.cancelled:
+                queue.clear()
+            now = time.monotonic()
+            while queue and len(in_flight) < limit and queue[0][0] <= now:
+                _, _, chunk, payload, attempt = heapq.heappop(queue)
+                future = self.submit_command(build_args(chunk, payload), token=token)
+                in_flight[future] = (chunk, payload, attempt)
+                outcome.invocations += 1
+            timeout = None if not queue or len(in_flight) >= limit else max(0.0, queue[0][0] - now)
+            if not in_flight:
+                if token is not None:
+                    token.wait(timeout)
+                else:
+                    time.sleep(timeout)
+                continue
+            done, _ = wait(in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                chunk, payload, attempt = in_flight.pop(future)
+                ok, msg = future_result(future)
+                if ok or isinstance(msg, CancelledMessage):
+                    settle(chunk, payload, ok, msg)
+                elif len(chunk) > 1 and isolate:
+                    half = len(chunk) // 2
+                    for part in (chunk[:half], chunk[half:]):
+                        heapq.heappush(queue, (0.0, seq, part, payload, attempt))
+                        seq += 1
+                elif attempt < max_retries:
+                    heapq.heappush(queue, (time.monotonic() + backoff * 2 ** attempt, seq, chunk, payload, attempt + 1))
+                    seq += 1
+                else:
+                    settle(chunk, payload, False, msg)
+        outcome.elapsed = time.monotonic() - started
+        return outcome
+
+    def batch_delete_instance(self, indices, chunk_size=None):
+        return self._run_packed(indices, lambda chunk: ['delete', '-v', ",".join(map(str, chunk))], chunk_size)
+
+    def batch_export_instance(self, indices, directory, name, compress, chunk_size=None):
+        def build_args(chunk):
+            args = ['export', '-v', ",".join(map(str, chunk)), '-d', directory, '-n', name]
+            if compress: args.append('--zip')
+            return args
+        return self._run_packed(indices, build_args, chunk_size)
+
+    def batch_set_simulation(self, indices, key, value, chunk_size=None):
+        """Apply one simulation value (e.g. a fixed IMEI or MAC) to many instances"""
+        return self._run_packed(
+            indices, lambda chunk: ['simulation', '-v', ",".join(map(str, chunk)), '-sk', key, '-sv', value], chunk_size)
+
+    def batch_run_adb_command(self, indices, command_str, chunk_size=None):
+        return self._run_packed(indices, lambda chunk: ['adb', '-v', ",".join(map(str, chunk)), '-c', command_str], chunk_size)
+    
+    def bulk_create_instances(self, count, chunk_size=50):
+        """
+        Optimized bulk instance creation for large numbers
+        Creates instances in chunks to manage system resources
+        """
+        if count <= chunk_size:
+            return self.create_instance(count)
+        
+        created = 0
+        for remaining in range(count, 0, -chunk_size):
+            batch_count = min(chunk_size, remaining)
+            ok, msg = self.create_instance(batch_count)
+            if ok:
+                created += batch_count
+            else:
+                return False, f"Bulk creation failed after {created} instances: {msg}"
+        
+        return True, f"Successfully created {created} instances"
+    
+    def iter_command_results(self, commands, ordered=False, return_output=False, max_concurrent=None, token=None):
+        """
+        Stream CommandResult objects for many CLI calls through the bounded executor.
+        Commands are argument lists or (args, meta) pairs; see CommandExecutor.map.
+        """
+        for result in self.executor.map(commands, ordered, return_output, window=max_concurrent, token=token):
+            self._invalidate_for(result.args)
+            yield result
+
+    def run_commands(self, commands, return_output=False, max_concurrent=None, token=None):
+        """Run many CLI calls and return their CommandResults in input order"""
+        return list(self.iter_command_results(commands, True, return_output, max_concurrent, token))
+
+    def optimize_command_execution(self, commands, max_concurrent=10):
+        """
+        Execute multiple commands with limited concurrency to avoid system overload
+        Useful for 10k+ instance operations; uses the shared pool, not one thread per command
+        """
+        commands = list(commands)
+        success_count = sum(1 for r in self.iter_command_results(commands, max_concurrent=max_concurrent) if r.ok)
+        return success_count == len(commands), f"{success_count}/{len(commands)} commands succeeded"
+
+class AsyncMumuManager:
+    """
+    asyncio front-end for orchestration scripts, composed around a MumuManager.
+    Every CLI method is a coroutine; concurrency is bounded by one semaphore
+    sized from PerformanceConfig instead of one OS thread per command. The wrapped
+    `manager` supplies the cache, preflight, timeouts and argv packing, and stays
+    the place for the sync helpers (parallel_batch_control, apply_simulation, ...).
+    """
+    def __init__(self, executable_path=None, instance_count=1000, max_concurrent=None, manager=None):
+        # An owned manager's executor pool starts no threads unless its sync API is used
+        self._owns_manager = manager is None
+        self.manager = manager or MumuManager(executable_path, coalesce_window=None)
+        self.executable_path = self.manager.executable_path
+        self.executor = self.manager.executor
+        self.max_concurrent = max_concurrent or PerformanceConfig.get_config(instance_count)['max_concurrent']
+        self._semaphore = asyncio.Semaphore(self.max_concurrent)
+
+    def shutdown(self):
+        """Shut down the wrapped manager if this object created it"""
+        if self._owns_manager:
+            self.manager.shutdown()
+
+    async def _run_command_async(self, args, return_output=False):
+        try:
+            return await self._exec_async(args, return_output)
+        finally:
+            self.manager._invalidate_for(args)
+
+    async def _exec_async(self, args, return_output):
+        error = self.executor._preflight()
+        if error:
+            return False, error
+        command = [self.executable_path] + list(args)
+        async with self._semaphore:
+            try:
+                kwargs = {'startupinfo': self.executor._startupinfo} if self.executor._startupinfo else {}
+                proc = await asyncio.create_subprocess_exec(
+                    *command, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE, **kwargs)
+            except Exception as e:
+                if isinstance(e, FileNotFoundError):
+                    self.executor._invalidate_preflight()
+                return False, f"Lỗi khi chạy lệnh {' '.join(command)}:\n{e}"
+            timeout = self.executor.timeout_for(args)
+            try:
+                stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout)
+            except asyncio.TimeoutError:
+                _kill(proc)
+                await proc.wait()
+                return False, f"Lỗi: Lệnh '{' '.join(args)}' quá thời gian {timeout}s và đã bị dừng."
+            except asyncio.CancelledError:
+                # Task cancellation must not leave the child running
+                _kill(proc)
+                raise
+            except Exception as e:
+                return False, f"Lỗi khi chạy lệnh {' '.join(command)}:\n{e}"
+        stdout = stdout.decode('utf-8', errors='replace').strip()
+        if proc.returncode != 0:
+            error_msg = f"Lỗi khi chạy lệnh {' '.join(command)}:\nExit code {proc.returncode}"
+            stderr = stderr.decode('utf-8', errors='replace').strip()
+            if stderr:
+                error_msg += f"\nStderr: {stderr}"
+            if stdout:
+                error_msg += f"\nStdout: {stdout}"
+            return False, error_msg
+        return (True, stdout) if return_output else (True, f"Lệnh '{' '.join(args)}' thực thi thành công.")
+
+    async def get_all_info(self):
+        try:
+            result = {key: info async for key, info in self.aiter_all_info()}
+        except (RuntimeError, ValueError) as e:
+            return str(e)
+        return result or "Không nhận được dữ liệu từ Manager. Vui lòng thử chạy một giả lập."
+
+    async def aiter_all_info(self, chunk_size=65536):
+        """Async counterpart of MumuManager.iter_all_info"""
+        error = self.executor._preflight()
+        if error:
+            raise RuntimeError(error)
+        command = [self.executable_path, 'info', '-v', 'all']
+        decoder = InfoStreamDecoder()
+        text_decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        async with self._semaphore:
+            kwargs = {'startupinfo': self.executor._startupinfo} if self.executor._startupinfo else {}
+            try:
+                proc = await asyncio.create_subprocess_exec(
+                    *command, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE, **kwargs)
+            except Exception as e:
+                raise RuntimeError(f"Lỗi khi chạy lệnh {' '.join(command)}:\n{e}") from e
+            # Read stderr alongside stdout so a chatty child cannot block on a full stderr pipe
+            stderr_task = asyncio.ensure_future(proc.stderr.read())
+            try:
+                while True:
+                    data = await proc.stdout.read(chunk_size)
+                    records = decoder.feed(text_decoder.decode(data, final=not data))
+                    if records:
+                        self.manager._update_cache(dict(records))
+                        for record in records:
+                            yield record
+                    if not data:
+                        break
+                stderr = (await stderr_task).decode('utf-8', errors='replace').strip()
+                if await proc.wait() != 0:
+                    error_msg = f"Lỗi khi chạy lệnh {' '.join(command)}:\nExit code {proc.returncode}"
+                    if stderr:
+                        error_msg += f"\nStderr: {stderr}"
+                    raise RuntimeError(error_msg)
+            finally:
+                if proc.returncode is None:
+                    proc.kill()
+                    await proc.wait()
+                if not stderr_task.done():
+                    stderr_task.cancel()
+        records = decoder.close()
+        if records:
+            self.manager._update_cache(dict(records))
+            for record in records:
+                yield record
+
+    async def control_instance(self, indices, action):
+        return await self._run_command_async(['control', '-v', ",".join(map(str, indices)), action])
+
+    async def create_instance(self, count):
+        return await self._run_command_async(['create', '-n', str(count)])
+
+    async def clone_instance(self, source_index, count):
+        return await self._run_command_async(['clone', '-v', str(source_index), '-n', str(count)])
+
+    async def delete_instance(self, indices):
+        return await self._run_command_async(['delete', '-v', ",".join(map(str, indices))])
+
+    async def rename_instance(self, index, new_name):
+        return await self._run_command_async(['rename', '-v', str(index), '-n', new_name])
+
+    async def import_instance(self, path, count):
+        return await self._run_command_async(['import', '-p', path, '-n', str(count)])
+
+    async def export_instance(self, indices, directory, name, compress):
+        args = ['export', '-v', ",".join(map(str, indices)), '-d', directory, '-n', name]
+        if compress: args.append('--zip')
+        return await self._run_command_async(args)
+
+    async def sort_windows(self):
+        return await self._run_command_async(['sort'])
+
+    async def set_imei(self, indices, imei):
+        return await self._run_command_async(['simulation', '-v', ",".join(map(str, indices)), '-sk', 'imei', '-sv', imei])
+
+    async def set_mac(self, indices, mac):
+        return await self._run_command_async(['simulation', '-v', ",".join(map(str, indices)), '-sk', 'mac_address', '-sv', mac])
+
+    async def run_adb_command(self, indices, command_str):
+        return await self._run_command_async(['adb', '-v', ",".join(map(str, indices)), '-c', command_str])
+
+    async def batch_control_instance(self, indices, action, chunk_size=None):
+        """Control instances in packed chunks; chunks run concurrently under the semaphore"""
+        chunks = self.manager._chunks(indices, ['control', '-v', action], chunk_size)
+        if len(chunks) <= 1:
+            return await self.control_instance(list(indices), action)
+        results = await asyncio.gather(*(self.control_instance(chunk, action) for chunk in chunks))
+        for n, (ok, msg) in enumerate(results, start=1):
+            if not ok:
+                return False, f"Batch failed at chunk {n}: {msg}"
+        return True, f"Successfully processed {len(indices)} instances in {len(results)} chunks"
+
+    async def bulk_create_instances(self, count, chunk_size=50):
+        """Create instances chunk by chunk; creation stays sequential to keep indices ordered"""
+        if count <= chunk_size:
+            return await self.create_instance(count)
+        created = 0
+        for remaining in range(count, 0, -chunk_size):
+            batch_count = min(chunk_size, remaining)
+            ok, msg = await self.create_instance(batch_count)
+            if not ok:
+                return False, f"Bulk creation failed after {created} instances: {msg}"
+            created += batch_count
+        return True, f"Successfully created {created} instances"
+
+    async def optimize_command_execution(self, commands, max_concurrent=None):
+        """Run many CLI calls on the event loop; max_concurrent can only tighten the manager limit"""
+        limit = asyncio.Semaphore(max_concurrent or self.max_concurrent)
+        async def execute_command(cmd_args):
+            async with limit:
+                return await self._run_command_async(cmd_args)
+        results = await asyncio.gather(*(execute_command(cmd) for cmd in commands))
+        success_count = sum(1 for ok, _ in results if ok)
+        return success_count == len(commands), f"{success_count}/{len(commands)} commands succeeded"
+
+class AsyncLoopThread(QThread):
+    """Runs an asyncio event loop inside a QThread so Qt code can drive AsyncMumuManager"""
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.loop = None
+        self._ready = threading.Event()
+
+    def run(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self._ready.set()
+        try:
+            self.loop.run_forever()
+        finally:
+            self.loop.run_until_complete(self.loop.shutdown_asyncgens())
+            self.loop.close()
+
+    def submit(self, coro):
+        """Schedule a coroutine on the loop; returns a concurrent.futures.Future"""
+        if not self.isRunning():
+            self.start()
+        self._ready.wait()
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def stop(self):
+        if self.loop and self.loop.is_running():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+        self.wait()
+
+# =========================
+# ADB fan-out
+# =========================
+class AdbResult:
+    """What one VM returned for a fan-out ADB command"""
+    __slots__ = ('index', 'exit_code', 'stdout', 'stderr', 'error', 'started', 'elapsed')
+
+    def __init__(self, index, exit_code, stdout, stderr, error, started, elapsed):
+        self.index = index
+        self.exit_code = exit_code  # None when the call could not start, timed out or was cancelled
+        self.stdout = stdout
+        self.stderr = stderr
+        self.error = error
+        self.started = started  # time.time() when the CLI call began
+        self.elapsed = elapsed
+
+    @property
+    def ok(self):
+        return self.error is None and self.exit_code == 0
+
+    @property
+    def text(self):
+        """Output used for grouping: stdout on success, otherwise stderr or the error message"""
+        if self.ok:
+            return self.stdout.strip()
+        return self.error or self.stderr.strip() or self.stdout.strip() or f"exit {self.exit_code}"
+
+    def to_dict(self):
+        return {'index': self.index, 'ok': self.ok, 'exit_code': self.exit_code, 'stdout': self.stdout,
+                'stderr': self.stderr, 'error': self.error, 'started': self.started,
+                'elapsed': round(self.elapsed, 4)}
+
+    def __repr__(self):
+        return f"AdbResult(VM {self.index} exit={self.exit_code} {self.elapsed:.2f}s {self.text[:40]!r})"
+
+class AdbOutputGroups:
+    """Counts identical outputs across a fan-out, keeping a few sample VM indices per output"""
+    def __init__(self, sample=10):
+        self.sample = sample
+        self._groups = {}  # (ok, text) -> [count, sample indices]
+
+    def add(self, result):
+        group = self._groups.get((result.ok, result.text))
+        if group is None:
+            group = self._groups[(result.ok, result.text)] = [0, []]
+        group[0] += 1
+        if len(group[1]) < self.sample:
+            group[1].append(result.index)
+
+    def __len__(self):
+        return len(self._groups)
+
+    def groups(self):
+        """[(ok, text, count, sample indices)], most common output first"""
+        return sorted(((ok, text, count, sample) for (ok, text), (count, sample) in self._groups.items()),
+                      key=lambda g: -g[2])
+
+    def summary(self, limit=5, width=80):
+        groups = self.groups()
+        lines = []
+        for ok, text, count, sample in groups[:limit]:
+            text = text.replace("\n", " ⏎ ")
+            if len(text) > width:
+                text = text[:width - 1] + "…"
+            lines.append(f"{'✅' if ok else '❌'} {count:,} VM trả về '{text}' "
+                         f"(vd: {', '.join(map(str, sample[:5]))})")
+        if len(groups) > limit:
+            rest = sum(count for _, _, count, _ in groups[limit:])
+            lines.append(f"… và {len(groups) - limit:,} kết quả khác ({rest:,} VM)")
+        return lines
+
+class AdbJsonlSink:
+    """Appends each AdbResult to a file as one JSON line"""
+    def __init__(self, path):
+        self.path = path
+        self.written = 0
+        self._file = open(path, 'a', encoding='utf-8', buffering=1 << 16)
+
+    def write(self, result):
+        self._file.write(json.dumps(result.to_dict(), ensure_ascii=False) + "\n")
+        self.written += 1
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+class AdbFanout:
+    """
+    Runs one ADB command on many VMs with one CLI call per VM through the manager's
+    command pool, so every VM's stdout and exit status come back separately. At most
+    max_concurrent calls are in flight; results stream to on_result and the sinks as
+    they finish and are grouped by identical output. A cancelled run() leaves the VMs
+    it did not finish for the next run() (pause/resume).
+    """
+    def __init__(self, manager, indices, command, max_concurrent=None, timeout=None, sample=10,
+                 keep_results=True, sinks=()):
+        self.manager = manager
+        self.command = command
+        self.max_concurrent = max_concurrent
+        self.timeout = timeout
+        self.sinks = list(sinks)
+        self._left = dict.fromkeys(indices)  # Insertion-ordered set of VMs still to run
+        self.total = len(self._left)
+        self.results = {} if keep_results else None
+        self.groups = AdbOutputGroups(sample)
+        self.stats = {'ok': 0, 'failed': 0, 'elapsed': 0.0}
+
+    @property
+    def done(self):
+        return not self._left
+
+    def _args(self, index):
+        return ['adb', '-v', str(index), '-c', self.command]
+
+    def _run_one(self, index, token):
+        args = self._args(index)
+        started, t0 = time.time(), time.monotonic()
+        exit_code, stdout, stderr, error = self.manager.executor.capture(args, token, self.timeout)
+        if error and not isinstance(error, CancelledMessage):
+            error = error.replace(' '.join(args), self.command)  # Same failure on every VM groups together
+        result = AdbResult(index, exit_code, stdout, stderr, error, started, time.monotonic() - t0)
+        return result.ok, result
+
+    def iter_results(self, token=None):
+        """Yield an AdbResult as each VM finishes; VMs aborted by `token` are not yielded"""
+        run_one = lambda index: self._run_one(index, token)
+        for result in self.manager.executor.map_calls(run_one, list(self._left), False, self.max_concurrent, token):
+            if not isinstance(result.error, CancelledMessage):
+                self._left.pop(result.index, None)
+                yield result
+
+    def run(self, token=None, on_result=None):
+        """Run the VMs left, feeding each result to the groups, sinks and on_result(result)"""
+        started = time.monotonic()
+        try:
+            for result in self.iter_results(token):
+                self.stats['ok' if result.ok else 'failed'] += 1
+                self.groups.add(result)
+                if self.results is not None:
+                    self.results[result.index] = result
+                for sink in self.sinks:
+                    sink.write(result)
+                if on_result:
+                    on_result(result)
+        finally:
+            self.stats['elapsed'] += time.monotonic() - started
+        return self.groups
+
+    def summary(self):
+        return (f"{self.stats['ok']:,}/{self.total:,} VM chạy '{self.command}' OK, "
+                f"{self.stats['failed']:,} lỗi, {len(self.groups):,} kết quả khác nhau, {self.stats['elapsed']:.1f}s")
+
+# =========================
+# Operation journal
+# =========================
+class JournalState:
+    """What an operation journal says about one run: its parameters and finished items"""
+    def __init__(self, path):
+        self.path = path
+        self.run_id = None
+        self.kind = None
+        self.params = None
+        self.total = 0
+        self.started = None
+        self.done = set()      # items whose step completed successfully
+        self.planned = set()   # items handed to the CLI, completed or not
+        self.status = None     # None while unfinished, else the `end` status
+
+    @property
+    def finished(self):
+        return self.status is not None
+
+    @property
+    def remaining(self):
+        return max(0, self.total - len(self.done))
+
+class OperationJournal:
+    """
+    Append-only JSONL journal of a long worker run, so it can be resumed after a crash.
+    Records: begin (kind, params, total), plan (items about to run), done (items that
+    completed), resume, end (status). Every record is written through to the OS at
+    once; fsync is batched (every `sync_every` records or `sync_interval` seconds and on
+    close), which keeps the cost low while surviving a host reboot minus the last batch.
+    """
+    KEEP_FINISHED = 20  # Finished journals kept in the directory; older ones are pruned
+
+    def __init__(self, path, sync_every=64, sync_interval=1.0):
+        self.path = path
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self._lock = threading.Lock()
+        self._file = open(path, 'a', encoding='utf-8')
+        if self._file.tell() and not self._ends_with_newline(path):
+            self._file.write("\n")  # Seal a line torn by a crash so new records stay parseable
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self.stats = {'records': 0, 'fsyncs': 0}
+
+    @staticmethod
+    def _ends_with_newline(path):
+        with open(path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+
+    @staticmethod
+    def default_dir():
+        return os.path.join(os.path.expanduser("~"), ".mumu_manager_pro", "journal")
+
+    @classmethod
+    def create(cls, directory, kind, params, total, **kwargs):
+        """Start a journal for a new run in directory and write its begin record"""
+        os.makedirs(directory, exist_ok=True)
+        cls.prune(directory)
+        run_id = time.strftime("%Y%m%d-%H%M%S") + f"-{os.getpid()}-{random.randint(0, 0xffff):04x}"
+        journal = cls(os.path.join(directory, f"run-{run_id}.jsonl"), **kwargs)
+        journal._append({'t': 'begin', 'run': run_id, 'kind': kind, 'params': params, 'total': total,
+                         'ts': time.time()}, sync=True)
+        return journal
+
+    @classmethod
+    def reopen(cls, state, **kwargs):
+        """Continue an unfinished journal; writes a resume record"""
+        journal = cls(state.path, **kwargs)
+        journal._append({'t': 'resume', 'ts': time.time(), 'done': len(state.done)}, sync=True)
+        return journal
+
+    def _append(self, record, sync=False):
+        line = json.dumps(record, ensure_ascii=False, separators=(',', ':')) + "\n"
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(line)
+            self._file.flush()
+            self.stats['records'] += 1
+            self._unsynced += 1
+            if sync or self._unsynced >= self.sync_every or time.monotonic() - self._last_sync >= self.sync_interval:
+                self._sync_locked()
+
+    def _sync_locked(self):
+        if self._unsynced:
+            os.fsync(self._file.fileno())
+            self.stats['fsyncs'] += 1
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def plan(self, items):
+        self._append({'t': 'plan', 'items': list(items)})
+
+    def done(self, items):
+        self._append({'t': 'done', 'items': list(items)})
+
+    def sync(self):
+        with self._lock:
+            if self._file is not None:
+                self._sync_locked()
+
+    def close(self, status=None):
+        """Write the end record (when status is given), fsync and close"""
+        if status is not None:
+            self._append({'t': 'end', 'status': status, 'ts': time.time()})
+        with self._lock:
+            if self._file is None:
+                return
+            self._sync_locked()
+            self._file.close()
+            self._file = None
+
+    @staticmethod
+    def load(path):
+        """Replay a journal into a JournalState; a torn last line from a crash is ignored"""
+        state = JournalState(path)
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                kind = record.get('t')
+                if kind == 'begin':
+                    state.run_id, state.kind = record.get('run'), record.get('kind')
+                    state.params, state.total, state.started = record.get('params'), record.get('total', 0), record.get('ts')
+                elif kind == 'plan':
+                    state.planned.update(record['items'])
+                elif kind == 'done':
+                    state.done.update(record['items'])
+                elif kind == 'end':
+                    state.status = record.get('status')
+                elif kind == 'resume':
+                    state.status = None
+        return state
+
+    @classmethod
+    def _journals(cls, directory):
+        try:
+            names = sorted(n for n in os.listdir(directory) if n.startswith("run-") and n.endswith(".jsonl"))
+        except OSError:
+            return []
+        return [os.path.join(directory, n) for n in names]
+
+    @staticmethod
+    def _ended(path, tail=8192):
+        """True if the last intact record of the journal is `end`; reads only the file tail"""
+        try:
+            with open(path, 'rb') as f:
+                f.seek(0, os.SEEK_END)
+                f.seek(max(0, f.tell() - tail))
+                lines = f.read().decode('utf-8', errors='replace').splitlines()
+        except OSError:
+            return False
+        for line in reversed(lines):
+            try:
+                return json.loads(line).get('t') == 'end'
+            except ValueError:
+                continue
+        return False
+
+    @classmethod
+    def unfinished(cls, directory):
+        """States of runs without an end record, newest first"""
+        states = []
+        for path in reversed(cls._journals(directory)):
+            if cls._ended(path):
+                continue
+            try:
+                state = cls.load(path)
+            except OSError:
+                continue
+            if state.kind and not state.finished:
+                states.append(state)
+        return states
+
+    @classmethod
+    def prune(cls, directory, keep=None):
+        """Delete the oldest finished journals beyond `keep`"""
+        keep = cls.KEEP_FINISHED if keep is None else keep
+        finished = [path for path in cls._journals(directory) if cls._ended(path)]
+        for path in finished[:max(0, len(finished) - keep)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+# =========================
+# Operation log
+# =========================
+LOG_LEVELS = ("INFO", "WARNING", "ERROR")
+
+def log_level(text):
+    """Level of a log line (index into LOG_LEVELS), from the markers workers put in messages"""
+    if "❌" in text or "LỖI" in text or text.startswith("Lỗi"):
+        return 2
+    if "⚠️" in text or "🛑" in text:
+        return 1
+    return 0
+
+class LogFileWriter:
+    """Appends log entries to a file from a daemon thread, so logging never waits on disk"""
+    BATCH = 1024  # Entries written per flush at most
+
+    def __init__(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.written = 0
+        self._file = open(path, 'a', encoding='utf-8')
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._loop, name="mumu-log-writer", daemon=True)
+        self._thread.start()
+
+    @staticmethod
+    def default_path(directory=None):
+        directory = directory or os.path.join(os.path.expanduser("~"), ".mumu_manager_pro", "logs")
+        return os.path.join(directory, time.strftime("mumu-%Y%m%d.log"))
+
+    def write(self, entries):
+        """Queue (timestamp, level, text) entries; returns at once"""
+        self._queue.put(entries)
+
+    def _loop(self):
+        while True:
+            batches = [self._queue.get()]
+            while len(batches) < self.BATCH:
+                try:
+                    batches.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            lines = []
+            for entries in batches:
+                if entries is None:
+                    break
+                for stamp, level, text in entries:
+                    lines.append(f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(stamp))} "
+                                 f"{LOG_LEVELS[level]:<7} {text}\n")
+            try:
+                self._file.writelines(lines)
+                self._file.flush()
+                self.written += len(lines)
+            except OSError:
+                pass  # A full or vanished disk must not take the UI log down with it
+            if None in batches:
+                self._file.close()
+                return
+
+    def close(self, timeout=2.0):
+        """Write everything queued so far and close the file"""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout)
+
+class LogBuffer:
+    """
+    Thread-safe landing zone for log lines. Workers append through a DirectConnection
+    instead of queueing one signal per line, and the UI drains it on a timer. Pending
+    lines are bounded: if the UI falls behind, the oldest are dropped and counted.
+    """
+    def __init__(self, capacity=20000, writer=None):
+        self._lock = threading.Lock()
+        self._pending = deque(maxlen=capacity)
+        self.writer = writer
+        self.dropped = 0
+
+    def append(self, message):
+        stamp = time.time()
+        entries = [(stamp, log_level(line), line) for line in (str(message).splitlines() or [""])]
+        with self._lock:
+            overflow = len(self._pending) + len(entries) - self._pending.maxlen
+            if overflow > 0:
+                self.dropped += overflow
+            self._pending.extend(entries)
+        if self.writer is not None:
+            self.writer.write(entries)
+
+    def drain(self):
+        """Remove and return every pending (timestamp, level, text) entry"""
+        with self._lock:
+            entries = list(self._pending)
+            self._pending.clear()
+        return entries
+
+class LogModel(QAbstractListModel):
+    """
+    Ring buffer of the latest `capacity` log lines for a QListView. Lines arrive in
+    batches from LogBuffer.drain(); the oldest fall off the front. A minimum level
+    hides lower-level lines without discarding them.
+    """
+    LEVEL_COLORS = (None, QColor("#d97706"), QColor("#dc2626"))
+
+    def __init__(self, capacity=50000, parent=None):
+        super().__init__(parent)
+        self.capacity = capacity
+        self.min_level = 0
+        self._seq = 0
+        self._all, self._all_head = [], 0    # (seq, level, display text); live entries start at _all_head
+        self._rows, self._head = [], 0       # Entries passing min_level; row r is _rows[_head + r]
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows) - self._head
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole:
+            return self._rows[self._head + index.row()][2]
+        if role == Qt.ItemDataRole.ForegroundRole:
+            return self.LEVEL_COLORS[self._rows[self._head + index.row()][1]]
         return None
-    
-    def clear_cache(self):
-        """Clear instance cache to free memory"""
-        self._instance_cache.clear()
-        self._cache_access_order.clear()
 
-    def control_instance(self, indices, action):
-        return self._run_command(['control', '-v', ",".join(map(str, indices)), action])
+    def lines(self):
+        """Visible lines, oldest first"""
+        return [entry[2] for entry in self._rows[self._head:]]
 
-    def create_instance(self, count):
-        return self._run_command(['create', '-n', str(count)])
+    def append(self, entries):
+        """Add drained (timestamp, level, text) entries, dropping the oldest beyond capacity"""
+        if not entries:
+            return
+        seq = self._seq
+        records = [(seq + n, level, f"{time.strftime('%H:%M:%S', time.localtime(stamp))}  {text}")
+                   for n, (stamp, level, text) in enumerate(entries)]
+        self._seq += len(records)
+        self._all.extend(records)
+        excess = len(self._all) - self._all_head - self.capacity
+        if excess > 0:
+            self._all_head += excess
+        oldest = self._all[self._all_head][0]
+        drop = 0
+        while self._head + drop < len(self._rows) and self._rows[self._head + drop][0] < oldest:
+            drop += 1
+        if drop:
+            self.beginRemoveRows(QModelIndex(), 0, drop - 1)
+            self._head += drop
+            self.endRemoveRows()
+        shown = [r for r in records if r[0] >= oldest and r[1] >= self.min_level]
+        if shown:
+            first = self.rowCount()
+            self.beginInsertRows(QModelIndex(), first, first + len(shown) - 1)
+            self._rows.extend(shown)
+            self.endInsertRows()
+        # Compact the backing lists now and then; row numbers are unaffected
+        if self._all_head > self.capacity:
+            del self._all[:self._all_head]
+            self._all_head = 0
+        if self._head > self.capacity:
+            del self._rows[:self._head]
+            self._head = 0
 
-    def clone_instance(self, source_index, count):
-        return self._run_command(['clone', '-v', str(source_index), '-n', str(count)])
+    def set_min_level(self, level):
+        """Show only lines at `level` or above (index into LOG_LEVELS)"""
+        self.beginResetModel()
+        self.min_level = level
+        self._rows = [r for r in self._all[self._all_head:] if r[1] >= level]
+        self._head = 0
+        self.endResetModel()
 
-    def delete_instance(self, indices):
-        return self._run_command(['delete', '-v', ",".join(map(str, indices))])
+    def clear(self):
+        self.beginResetModel()
+        self._all, self._all_head, self._rows, self._head = [], 0, [], 0
+        self.endResetModel()
 
-    def rename_instance(self, index, new_name):
-        return self._run_command(['rename', '-v', str(index), '-n', new_name])
+# =========================
+# Progress tracking
+# =========================
+def format_duration(seconds):
+    """'1:02:03' / '2:03' style duration, '?' when unknown"""
+    if seconds is None:
+        return "?"
+    minutes, secs = divmod(int(round(seconds)), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{secs:02d}" if hours else f"{minutes}:{secs:02d}"
 
-    def import_instance(self, path, count):
-        return self._run_command(['import', '-p', path, '-n', str(count)])
+class ProgressSnapshot:
+    """Point-in-time progress of a worker run, sent to the UI"""
+    __slots__ = ('processed', 'total', 'ok', 'failed', 'rate', 'eta', 'elapsed')
 
-    def export_instance(self, indices, directory, name, compress):
-        args = ['export', '-v', ",".join(map(str, indices)), '-d', directory, '-n', name]
-        if compress: args.append('--zip')
-        return self._run_command(args)
+    def __init__(self, processed, total, ok, failed, rate, eta, elapsed):
+        self.processed = processed
+        self.total = total
+        self.ok = ok
+        self.failed = failed
+        self.rate = rate        # Smoothed items per second, None until measurable
+        self.eta = eta          # Seconds left, None until measurable
+        self.elapsed = elapsed
 
-    def sort_windows(self):
-        return self._run_command(['sort'])
+    @property
+    def percent(self):
+        return 100 if not self.total else min(100, self.processed * 100 // self.total)
 
-    # IMEI/MAC
-    @staticmethod
-    def generate_imei():
-        rand_part = [random.randint(0, 9) for _ in range(14)]
-        total = 0
-        for i, d in enumerate(rand_part):
-            if i % 2 == 0: total += d
-            else:
-                x = d * 2; total += (x % 10) + (x // 10)
-        checksum = (10 - (total % 10)) % 10
-        return "".join(map(str, rand_part + [checksum]))
+    def text(self):
+        rate = f"{self.rate * 60:,.1f} VM/phút" if self.rate is not None else "— VM/phút"
+        return (f"{self.processed:,}/{self.total:,} VM • {rate} • còn {format_duration(self.eta)} • "
+                f"✅ {self.ok:,} ❌ {self.failed:,}")
 
-    def set_imei(self, indices, imei):
-        return self._run_command(['simulation', '-v', ",".join(map(str, indices)), '-sk', 'imei', '-sv', imei])
+    def __repr__(self):
+        return f"ProgressSnapshot({self.text()})"
 
-    def set_mac(self, indices, mac):
-        return self._run_command(['simulation', '-v', ",".join(map(str, indices)), '-sk', 'mac_address', '-sv', mac])
+class ProgressTracker:
+    """
+    Counts settled items of a run and derives throughput (EWMA over sample_interval
+    windows) and ETA. add() is cheap enough to call per VM; snapshot() hands out at most
+    max_rate snapshots per second (force=True always returns one), so the UI repaints a
+    few times a second however fast items settle.
+    """
+    def __init__(self, total, max_rate=4.0, alpha=0.3, sample_interval=1.0, clock=time.monotonic):
+        self.total = max(0, int(total))
+        self.ok = 0
+        self.failed = 0
+        self.max_rate = max_rate
+        self.alpha = alpha
+        self.sample_interval = sample_interval
+        self._clock = clock
+        self.started = clock()
+        self._sample_at, self._sample_done = self.started, 0
+        self.rate = None
+        self._last_snapshot = None
 
-    def run_adb_command(self, indices, command_str):
-        return self._run_command(['adb', '-v', ",".join(map(str, indices)), '-c', command_str])
+    @property
+    def processed(self):
+        return self.ok + self.failed
 
-    # Optimization methods for 10k+ instances
-    def batch_control_instance(self, indices, action, chunk_size=100):
-        """
-        Optimized batch control for large number of instances
-        Processes instances in chunks to avoid command line length limits
-        """
-        if len(indices) <= chunk_size:
-            return self.control_instance(indices, action)
-        
-        results = []
-        for i in range(0, len(indices), chunk_size):
-            chunk = indices[i:i + chunk_size]
-            ok, msg = self.control_instance(chunk, action)
-            results.append((ok, msg))
-            if not ok:
-                return False, f"Batch failed at chunk {i//chunk_size + 1}: {msg}"
-        
-        return True, f"Successfully processed {len(indices)} instances in {len(results)} chunks"
-    
-    def bulk_create_instances(self, count, chunk_size=50):
-        """
-        Optimized bulk instance creation for large numbers
-        Creates instances in chunks to manage system resources
-        """
-        if count <= chunk_size:
-            return self.create_instance(count)
-        
-        created = 0
-        for remaining in range(count, 0, -chunk_size):
-            batch_count = min(chunk_size, remaining)
-            ok, msg = self.create_instance(batch_count)
-            if ok:
-                created += batch_count
-            else:
-                return False, f"Bulk creation failed after {created} instances: {msg}"
-        
-        return True, f"Successfully created {created} instances"
-    
-    def optimize_command_execution(self, commands, max_concurrent=10):
-        """
-        Execute multiple commands with limited concurrency to avoid system overload
-        Useful for 10k+ instance operations
-        """
-        import threading
-        import queue
-        
-        results = queue.Queue()
-        semaphore = threading.Semaphore(max_concurrent)
-        
-        def execute_command(cmd_args):
-            with semaphore:
-                try:
-                    result = self._run_command(cmd_args)
-                    results.put(('success', result))
-                except Exception as e:
-                    results.put(('error', str(e)))
-        
-        threads = []
-        for cmd_args in commands:
-            thread = threading.Thread(target=execute_command, args=(cmd_args,))
-            thread.start()
-            threads.append(thread)
-        
-        # Wait for all threads to complete
-        for thread in threads:
-            thread.join()
-        
-        # Collect results
-        all_results = []
-        while not results.empty():
-            all_results.append(results.get())
-        
-        success_count = sum(1 for status, _ in all_results if status == 'success')
-        return success_count == len(commands), f"{success_count}/{len(commands)} commands succeeded"
+    def add(self, ok=0, failed=0):
+        self.ok += ok
+        self.failed += failed
+        self._sample(self._clock())
+
+    def _sample(self, now):
+        elapsed = now - self._sample_at
+        if elapsed >= self.sample_interval:
+            current = (self.processed - self._sample_done) / elapsed
+            self.rate = current if self.rate is None else self.alpha * current + (1 - self.alpha) * self.rate
+            self._sample_at, self._sample_done = now, self.processed
+
+    def eta(self, now=None):
+        remaining = self.total - self.processed
+        if remaining <= 0:
+            return 0.0
+        rate = self.rate
+        if rate is None:  # Before the first full window, use the average so far
+            elapsed = (self._clock() if now is None else now) - self.started
+            rate = self.processed / elapsed if self.processed and elapsed > 0 else None
+        return remaining / rate if rate else None
+
+    def snapshot(self, force=False):
+        """A ProgressSnapshot, or None if one was handed out less than 1/max_rate seconds ago"""
+        now = self._clock()
+        if not force and self._last_snapshot is not None and now - self._last_snapshot < 1.0 / self.max_rate:
+            return None
+        self._last_snapshot = now
+        self._sample(now)
+        rate = self.rate
+        if rate is None and self.processed and now > self.started:
+            rate = self.processed / (now - self.started)
+        return ProgressSnapshot(self.processed, self.total, self.ok, self.failed, rate, self.eta(now),
+                                now - self.started)
 
 # =========================
 # Threads
 # =========================
 class Worker(QThread):
     progress = pyqtSignal(int)
+    progress_stats = pyqtSignal(object)  # ProgressSnapshot, a few per second at most
     finished = pyqtSignal(str)
     log = pyqtSignal(str)
+    JOURNAL_KIND = None  # Journaled workers name themselves here so MainWindow can resume them
     def __init__(self, manager, params):
         super().__init__(); self.manager = manager; self.params = params
         self._is_running = True; self._is_paused = False
+        # stop/pause/resume notify this condition, so waits wake at once instead of polling
+        self._state = threading.Condition()
+        # Cancelled on stop/pause so in-flight CLI calls are killed instead of waited out
+        self._token = CancelToken()
+        # Adaptive launching (params[5]); tests may inject a sampler
+        self.load_sampler = None
+        self._load_warned = False
+        self.rate_controller = None
+        self.launch_pipeline = None
+        # Crash-safe progress: completed items go to the journal; skip holds items an earlier run finished
+        self.journal = None
+        self.skip = set()
+        self.tracker = ProgressTracker(0)
+        self._last_percent = None
     def stop(self):
-        self.log.emit("⚠️ Đang gửi yêu cầu dừng..."); self._is_running = False
+        self.log.emit("⚠️ Đang gửi yêu cầu dừng...")
+        with self._state:
+            self._is_running = False; self._state.notify_all()
+        self._token.cancel('stop')
     def pause(self):
-        if not self._is_paused: self._is_paused = True; self.log.emit("⏸️ Tạm dừng...")
+        with self._state:
+            if self._is_paused: return
+            self._is_paused = True; self._state.notify_all()
+        self._token.cancel('pause'); self.log.emit("⏸️ Tạm dừng...")
     def resume(self):
-        if self._is_paused: self._is_paused = False; self.log.emit("▶️ Tiếp tục...")
+        with self._state:
+            if not self._is_paused: return
+            self._token = CancelToken(); self._is_paused = False; self._state.notify_all()
+        self.log.emit("▶️ Tiếp tục...")
     def _maybe_pause(self):
-        while self._is_running and self._is_paused: self.msleep(140)
+        """Block while paused; returns False once the worker is stopped"""
+        with self._state:
+            self._state.wait_for(lambda: not (self._is_running and self._is_paused))
+            return self._is_running
+    def _sleep(self, seconds):
+        """
+        Interruptible delay: returns early on stop, and a pause suspends the countdown
+        until resume. Returns False if the worker was stopped.
+        """
+        remaining = max(0.0, seconds)
+        with self._state:
+            while self._is_running:
+                if self._is_paused:
+                    self._state.wait_for(lambda: not (self._is_running and self._is_paused))
+                    continue
+                if remaining <= 0:
+                    break
+                started = time.monotonic()
+                self._state.wait(remaining)
+                remaining -= time.monotonic() - started
+            return self._is_running
+    def _call(self, fn, *args, **kwargs):
+        """Run a manager call under the current token; calls aborted by pause are re-issued after resume"""
+        while True:
+            result = fn(*args, token=self._token, **kwargs)
+            if not is_cancelled(result) or not self._is_running:
+                return result
+            self._maybe_pause()
+            if not self._is_running:
+                return result
+    @staticmethod
+    def params_from_journal(params):
+        """Rebuild worker params from their JSON form in a journal begin record"""
+        return tuple(params)
+    def _journal_plan(self, items):
+        if self.journal is not None: self.journal.plan(items)
+    def _journal_done(self, items):
+        if self.journal is not None and items: self.journal.done(items)
+    def _pending(self, items):
+        """Items not completed by an earlier run of the same journal"""
+        return [i for i in items if i not in self.skip]
+    def _start_progress(self, total):
+        """Begin counting this run's items (those not skipped from an earlier run)"""
+        self.tracker = ProgressTracker(total)
+        self._last_percent = None
+    def _advance(self, ok=0, failed=0):
+        """Count settled items; the tracker rate-limits the progress signals"""
+        self.tracker.add(ok, failed)
+        self._report()
+    def _report(self, force=False):
+        snapshot = self.tracker.snapshot(force)
+        if snapshot is None: return
+        self.progress_stats.emit(snapshot)
+        if snapshot.percent != self._last_percent:
+            self._last_percent = snapshot.percent
+            self.progress.emit(snapshot.percent)
+    def _finish(self):
+        """Close the journal and report how the run ended"""
+        self._report(force=True)
+        if self.journal is not None:
+            self.journal.close('completed' if self._is_running else 'stopped')
+        self.finished.emit("✅ HOÀN TẤT" if self._is_running else "🛑 ĐÃ DỪNG")
+    def _option(self, position):
+        """Optional trailing params entry (dict) or None"""
+        return self.params[position] if len(self.params) > position and self.params[position] else None
+    def _adaptive_ceilings(self):
+        """
+        Ceilings dict for adaptive launching (params[5]), or None when fixed delays are used.
+        Without a host load source every sample reads as idle and the controller would climb
+        straight to its ceilings, so the fixed delays are kept instead.
+        """
+        ceilings = self._option(5)
+        if not ceilings:
+            return None
+        if self.load_sampler is None:
+            self.load_sampler = HostLoadSampler()
+        if not getattr(self.load_sampler, 'available', True):
+            if not self._load_warned:
+                self._load_warned = True
+                self.log.emit("⚠️ Không đọc được tải máy (cần /proc hoặc psutil): "
+                              "dùng độ trễ cố định thay vì tự động điều chỉnh")
+            return None
+        return ceilings
+    def _launch_pipelined(self, indices, options):
+        """
+        Launch through a LaunchPipeline (params[6]); progress counts VMs that are actually
+        ready. Adaptive ceilings, when also set, lower the number of VMs booting under load.
+        """
+        ceilings = self._adaptive_ceilings()
+        controller = None
+        if ceilings:
+            controller = self.rate_controller = AdaptiveRateController.for_instances(len(indices), **ceilings)
+        pipeline = self.launch_pipeline = LaunchPipeline(
+            self.manager, indices, controller=controller, sampler=self.load_sampler, **options)
+        self.log.emit(f"🚦 Khởi động theo trạng thái sẵn sàng: tối đa {pipeline.max_booting} VM boot cùng lúc, "
+                      f"kiểm tra bằng '{pipeline.check}'")
+        def on_result(idx, ok, msg):
+            if ok: self._journal_done([idx])
+            self.log.emit(f"{'✅' if ok else '❌'} VM {idx}: {msg}")
+            self._advance(int(ok), int(not ok))
+        while not pipeline.done and self._maybe_pause():
+            pipeline.run(self._token, on_result)
+        self.log.emit(pipeline.outcome.summary())
+    def _launch_adaptive(self, indices, ceilings, launch):
+        """
+        Launch indices in steps sized by an AdaptiveRateController fed with host load
+        samples; launch(chunk) starts one step. Replaces the fixed instance/batch delays.
+        """
+        indices = list(indices); processed = 0
+        controller = self.rate_controller = AdaptiveRateController.for_instances(max(1, len(indices)), **ceilings)
+        sampler = self.load_sampler
+        self.log.emit(f"📈 Tự động điều chỉnh theo tải máy: tối đa {controller.max_window} VM/bước, "
+                      f"{controller.max_rate:g} VM/giây")
+        window = None
+        while processed < len(indices) and self._maybe_pause():
+            limit = controller.update(sampler.sample())
+            if limit != window:
+                self.log.emit(f"⚖️ Tải máy {controller.last_sample.load:.0%} → {limit} VM/bước")
+                window = limit
+            chunk = indices[processed:processed + limit]
+            launch(chunk)
+            processed += len(chunk)
+            if processed < len(indices):
+                self._sleep(controller.pause_for(len(chunk)))
 
 class AutoWorker(Worker):
+    JOURNAL_KIND = 'auto'
+    def _launch_each(self, chunk):
+        for idx in chunk:
+            if not self._is_running: break
+            self._journal_plan([idx])
+            ok, _ = self._call(self.manager.control_instance, [idx], 'launch')
+            if ok: self._journal_done([idx])
+            self.log.emit(f"Khởi động VM {idx}: {'Thành công' if ok else 'Thất bại'}")
+            self._advance(int(ok), int(not ok))
     def run(self):
-        start, end, batch_size, inst_delay, batch_delay = self.params
-        total_instances = max(1, end - start + 1); processed = 0
+        start, end, batch_size, inst_delay, batch_delay = self.params[:5]
+        todo = self._pending(range(start, end + 1))
+        self._start_progress(len(todo))
         self.log.emit("--- 🤖 BẮT ĐẦU CHẾ ĐỘ TỰ ĐỘNG 🤖 ---")
+        readiness, ceilings = self._option(6), self._adaptive_ceilings()
+        if readiness:
+            self._launch_pipelined(todo, readiness)
+            self._finish()
+            return
+        if ceilings:
+            self._launch_adaptive(todo, ceilings, self._launch_each)
+            self._finish()
+            return
         for i in range(start, end + 1, batch_size):
             if not self._is_running: break
             self._maybe_pause()
             b0, b1 = i, min(i + batch_size - 1, end)
+            batch = self._pending(range(b0, b1 + 1))
+            if not batch: continue
             self.log.emit(f"\n--- Batch: {b0} - {b1} ---")
-            for idx in range(b0, b1 + 1):
+            for idx in batch:
                 if not self._is_running: break
                 self._maybe_pause()
-                ok, _ = self.manager.control_instance([idx], 'launch')
-                self.log.emit(f"Khởi động VM {idx}: {'Thành công' if ok else 'Thất bại'}")
-                processed += 1; self.progress.emit(int((processed/total_instances)*100))
-                if idx < b1 and self._is_running: self.msleep(int(inst_delay*1000))
-            if b1 < end and self._is_running:
-                self._maybe_pause(); self.msleep(int(batch_delay*1000))
-        self.finished.emit("✅ HOÀN TẤT" if self._is_running else "🛑 ĐÃ DỪNG")
+                self._launch_each([idx])
+                if idx < batch[-1]: self._sleep(inst_delay)
+            if b1 < end: self._sleep(batch_delay)
+        self._finish()
 
 class BatchSimWorker(Worker):
+    """
+    Applies IMEI/MAC tasks (index, imei, mac) through MumuManager.apply_simulation:
+    VMs sharing a value are written by one packed call, distinct values run
+    concurrently in the command pool, and logs/progress are emitted in batches.
+    """
+    JOURNAL_KIND = 'batch_sim'
+    SIM_KEYS = (('imei', 'IMEI'), ('mac_address', 'MAC'))
+    LOG_INTERVAL = 0.25  # Seconds between batched log/progress emissions
+    @staticmethod
+    def params_from_journal(params):
+        return [tuple(task) for task in params]
+    @staticmethod
+    def _describe(indices):
+        if len(indices) <= 5:
+            return "VM " + ",".join(map(str, indices))
+        return f"{len(indices)} VM ({indices[0]}…{indices[-1]})"
     def run(self):
-        tasks = self.params
-        total = max(1, len(tasks))
+        tasks = [task for task in self.params if task[0] not in self.skip]
+        labels = dict(self.SIM_KEYS)
+        pending = [(idx, key, value) for idx, imei, mac in tasks
+                   for key, value in (('imei', imei), ('mac_address', mac)) if value]
+        writes_left = {}
+        for idx, _, _ in pending:
+            writes_left[idx] = writes_left.get(idx, 0) + 1
+        self._start_progress(len(writes_left))
+        values = {(idx, key): value for idx, key, value in pending}
         self.log.emit("--- 🛡️ BẮT ĐẦU THAY ĐỔI THUỘC TÍNH MÁY (IMEI/MAC) ---")
-        for i, (idx, imei, mac) in enumerate(tasks, start=1):
-            if not self._is_running: break
-            if imei:
-                ok, msg = self.manager.set_imei([idx], imei)
-                self.log.emit(f"VM {idx} • IMEI → {imei}: {'OK' if ok else 'LỖI'}"); 
-                if not ok: self.log.emit(msg)
-            if mac:
-                ok, msg = self.manager.set_mac([idx], mac)
-                self.log.emit(f"VM {idx} • MAC  → {mac}: {'OK' if ok else 'LỖI'}"); 
-                if not ok: self.log.emit(msg)
-            self.progress.emit(int((i/total)*100)); self.msleep(120)
-        self.finished.emit("✅ HOÀN TẤT" if self._is_running else "🛑 ĐÃ DỪNG")
+        self.log.emit(f"{len(tasks)} VM, {len(pending)} giá trị, {len({(k, v) for _, k, v in pending})} giá trị khác nhau")
+        self._journal_plan(list(writes_left))
+        failed = set()
+        lines, finished_vms = [], []
+        last_flush = [time.monotonic()]
+        def flush(force=False):
+            if not force and time.monotonic() - last_flush[0] < self.LOG_INTERVAL:
+                return
+            last_flush[0] = time.monotonic()
+            if lines:
+                self.log.emit("\n".join(lines)); lines.clear()
+            self._journal_done(finished_vms); finished_vms.clear()
+        def on_result(keys, ok, msg):
+            if isinstance(msg, CancelledMessage):
+                return  # Re-issued after resume
+            key = keys[0][1]
+            lines.append(f"{self._describe([idx for idx, _ in keys])} • {labels[key]} → {values[keys[0]]}: "
+                         f"{'OK' if ok else 'LỖI'}")
+            if not ok:
+                lines.append(msg)
+            for idx, _ in keys:
+                if not ok:
+                    failed.add(idx)
+                writes_left[idx] -= 1
+                if writes_left[idx] == 0:
+                    if idx not in failed: finished_vms.append(idx)
+                    self._advance(int(idx not in failed), int(idx in failed))
+            flush()
+        while pending and self._maybe_pause():
+            outcome = self.manager.apply_simulation(pending, token=self._token, on_result=on_result)
+            pending = [a for a in pending
+                       if isinstance(outcome.results.get((a[0], a[1]), (False, CancelledMessage()))[1], CancelledMessage)]
+            flush(force=True)
+            self.log.emit(outcome.summary())
+        flush(force=True)
+        self._finish()
 
 # Optimized Worker for 10k instances with parallel processing
 class OptimizedAutoWorker(Worker):
     """Optimized worker for handling 10,000+ instances efficiently"""
+    JOURNAL_KIND = 'optimized_auto'
+    def _launch_bulk(self, chunk):
+        """
+        Launch one adaptive step in parallel. VMs whose calls a pause cancelled (or never
+        started) are re-issued after resume; only settled VMs count towards progress.
+        """
+        self._journal_plan(chunk)
+        pending, failed = list(chunk), []
+        while pending and self._maybe_pause():
+            outcome = self.manager.parallel_batch_control(pending, 'launch', token=self._token)
+            settled = {idx: result for idx, result in outcome.results.items() if not is_cancelled(result)}
+            launched = [idx for idx, (ok, _) in settled.items() if ok]
+            failed.extend(idx for idx, (ok, _) in settled.items() if not ok)
+            self._journal_done(launched)
+            self._advance(len(launched), len(settled) - len(launched))
+            pending = [idx for idx in pending if idx not in settled]
+        if pending:
+            return  # Stopped; the rest stays unsettled
+        if failed:
+            self.log.emit(f"❌ Bulk launch {chunk[0]}-{chunk[-1]}: failed {','.join(map(str, sorted(failed)[:20]))}"
+                          f"{'...' if len(failed) > 20 else ''}")
+        else:
+            self.log.emit(f"✅ Bulk launched VMs {chunk[0]}-{chunk[-1]}")
     def run(self):
-        start, end, batch_size, inst_delay, batch_delay = self.params
+        start, end, batch_size, inst_delay, batch_delay = self.params[:5]
         total_instances = max(1, end - start + 1)
-        processed = 0
+        todo = self._pending(range(start, end + 1))
+        self._start_progress(len(todo))
+        readiness, ceilings = self._option(6), self._adaptive_ceilings()
+        if readiness or ceilings:
+            self.log.emit(f"--- 🚀 OPTIMIZED AUTO MODE FOR {total_instances} INSTANCES ---")
+            if readiness:
+                self._launch_pipelined(todo, readiness)
+            else:
+                self._launch_adaptive(todo, ceilings, self._launch_bulk)
+            self._finish()
+            return
         
         # Use larger batch sizes for 10k+ instances
         if total_instances > 1000:
@@ -937,52 +3987,202 @@ class OptimizedAutoWorker(Worker):
             self._maybe_pause()
             
             b0, b1 = i, min(i + batch_size - 1, end)
-            batch_indices = list(range(b0, b1 + 1))
+            batch_indices = self._pending(range(b0, b1 + 1))
+            if not batch_indices: continue
             
             self.log.emit(f"\n--- Processing Batch: {b0}-{b1} ({len(batch_indices)} VMs) ---")
             
             # Batch launch for better performance
             if len(batch_indices) > 10:
-                # Use bulk command for large batches
-                ok, msg = self.manager.control_instance(batch_indices, 'launch')
+                # Use bulk command for large batches, packed to the command line limit
+                self._journal_plan(batch_indices)
+                ok, msg = self._call(self.manager.batch_control_instance, batch_indices, 'launch')
                 if ok:
+                    self._journal_done(batch_indices)
+                    self._advance(len(batch_indices))
                     self.log.emit(f"✅ Bulk launched VMs {b0}-{b1}")
                 else:
                     self.log.emit(f"❌ Bulk launch failed: {msg}")
                     # Fallback to individual launches
                     for idx in batch_indices:
                         if not self._is_running: break
-                        ok, _ = self.manager.control_instance([idx], 'launch')
+                        ok, _ = self._call(self.manager.control_instance, [idx], 'launch')
+                        if ok: self._journal_done([idx])
                         self.log.emit(f"VM {idx}: {'✅' if ok else '❌'}")
-                        if idx < b1 and self._is_running: 
-                            self.msleep(int(inst_delay*200))  # Reduced sleep for bulk
-                processed += len(batch_indices)
+                        self._advance(int(ok), int(not ok))
+                        if idx < b1:
+                            self._sleep(inst_delay * 0.2)  # Reduced sleep for bulk
             else:
                 # Individual processing for smaller batches
                 for idx in batch_indices:
                     if not self._is_running: break
                     self._maybe_pause()
-                    ok, _ = self.manager.control_instance([idx], 'launch')
+                    self._journal_plan([idx])
+                    ok, _ = self._call(self.manager.control_instance, [idx], 'launch')
+                    if ok: self._journal_done([idx])
                     self.log.emit(f"VM {idx}: {'✅ Thành công' if ok else '❌ Thất bại'}")
-                    processed += 1
-                    if idx < b1 and self._is_running: 
-                        self.msleep(int(inst_delay*1000))
-            
-            # Update progress
-            self.progress.emit(int((processed/total_instances)*100))
+                    self._advance(int(ok), int(not ok))
+                    if idx < b1:
+                        self._sleep(inst_delay)
             
             # Batch delay with optimization for large operations
-            if b1 < end and self._is_running:
-                self._maybe_pause()
+            if b1 < end:
                 sleep_time = batch_delay
                 if total_instances > 5000:
                     sleep_time = min(sleep_time, 2.0)  # Reduced delay for very large operations
-                self.msleep(int(sleep_time*1000))
+                self._sleep(sleep_time)
         
-        self.finished.emit("✅ HOÀN TẤT" if self._is_running else "🛑 ĐÃ DỪNG")
+        self._finish()
+
+class AdbFanoutWorker(Worker):
+    """
+    Runs one ADB command on many VMs through AdbFanout. params: (indices, command, options)
+    where options may hold max_concurrent, timeout and jsonl_path. Per-VM results go to
+    the JSONL file and to the log in batches; the log ends with grouped outputs.
+    """
+    JOURNAL_KIND = 'adb_fanout'
+    LOG_INTERVAL = 0.25  # Seconds between batched log/progress emissions
+    def run(self):
+        indices, command = list(self.params[0]), self.params[1]
+        options = dict(self._option(2) or {})
+        jsonl_path = options.pop('jsonl_path', None)
+        todo = self._pending(indices)
+        self.log.emit("--- 📡 BẮT ĐẦU CHẠY LỆNH ADB TRÊN NHIỀU VM ---")
+        self.log.emit(f"Lệnh: {command} • {len(todo):,} VM")
+        sinks = []
+        if jsonl_path:
+            try:
+                sinks.append(AdbJsonlSink(jsonl_path))
+                self.log.emit(f"💾 Ghi kết quả từng VM vào {jsonl_path}")
+            except OSError as e:
+                self.log.emit(f"⚠️ Không mở được file kết quả {jsonl_path}: {e}")
+        fanout = self.fanout = AdbFanout(self.manager, todo, command, keep_results=False, sinks=sinks, **options)
+        self._start_progress(fanout.total)
+        self._journal_plan(todo)
+        lines, succeeded = [], []
+        last_flush = [time.monotonic()]
+        def flush(force=False):
+            if not force and time.monotonic() - last_flush[0] < self.LOG_INTERVAL:
+                return
+            last_flush[0] = time.monotonic()
+            if lines:
+                self.log.emit("\n".join(lines)); lines.clear()
+            self._journal_done(succeeded); succeeded.clear()
+        def on_result(result):
+            if result.ok:
+                succeeded.append(result.index)
+            text = result.text.replace("\n", " ⏎ ")
+            lines.append(f"{'✅' if result.ok else '❌'} VM {result.index}: {text[:120]}")
+            self._advance(int(result.ok), int(not result.ok))
+            flush()
+        try:
+            while not fanout.done and self._maybe_pause():
+                fanout.run(self._token, on_result)
+                flush(force=True)
+        finally:
+            for sink in sinks:
+                sink.close()
+        flush(force=True)
+        for line in fanout.groups.summary():
+            self.log.emit(line)
+        self.log.emit(fanout.summary())
+        self._finish()
+
+# =========================
+# Background refresh
+# =========================
+class RefreshWorker(QThread):
+    """
+    Polls MumuManager.poll_changes() off the UI thread. Polls never overlap: ticks missed
+    while a slow poll runs are skipped, and the next poll waits at least SLOW_FACTOR times
+    the last poll's duration (doubling after errors, up to max_interval). Deltas the UI
+    has not taken yet are merged, and `changed` fires once per batch; the slot calls take().
+    """
+    changed = pyqtSignal()
+    failed = pyqtSignal(str)
+    SLOW_FACTOR = 2.0
+
+    def __init__(self, manager, interval=5.0, max_interval=60.0, parent=None):
+        super().__init__(parent)
+        self.manager = manager
+        self.interval = max(0.05, float(interval))
+        self.max_interval = max(self.interval, float(max_interval))
+        self._state = threading.Condition()
+        self._running = True
+        self._requested = False
+        self._pending = None  # Merged InstanceDelta waiting for take()
+        self.stats = {'polls': 0, 'skipped': 0, 'errors': 0, 'last_duration': 0.0, 'delay': self.interval}
+
+    def request(self):
+        """Poll as soon as possible; requests made while a poll runs collapse into one follow-up"""
+        with self._state:
+            self._requested = True
+            self._state.notify_all()
+
+    def stop(self):
+        with self._state:
+            self._running = False
+            self._state.notify_all()
+
+    def set_manager(self, manager):
+        """Poll a new manager from now on; results still in flight from the old one are dropped"""
+        with self._state:
+            self.manager = manager
+            self._pending = None
+            self._requested = True
+            self._state.notify_all()
+
+    def take(self):
+        """Return and clear the merged delta (None if nothing changed since the last take)"""
+        with self._state:
+            delta, self._pending = self._pending, None
+            return delta
+
+    def _wait(self, due):
+        """Wait until due, a request or stop; returns False once stopped"""
+        with self._state:
+            while self._running and not self._requested:
+                remaining = due - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._state.wait(remaining)
+            self._requested = False
+            return self._running
+
+    def run(self):
+        due, errors = time.monotonic(), 0
+        while self._wait(due):
+            manager = self.manager
+            started = time.monotonic()
+            result = manager.poll_changes()
+            duration = time.monotonic() - started
+            self.stats['polls'] += 1
+            self.stats['last_duration'] = duration
+            # Ticks that fell inside this poll are skipped rather than run back to back
+            self.stats['skipped'] += int(duration // self.interval)
+            if isinstance(result, str):
+                errors += 1
+                self.stats['errors'] += 1
+                delay = min(self.max_interval, self.interval * 2 ** errors)
+            else:
+                errors = 0
+                delay = min(self.max_interval, max(self.interval, duration * self.SLOW_FACTOR))
+            self.stats['delay'] = delay
+            due = started + delay
+            with self._state:
+                if manager is not self.manager or not self._running:
+                    continue
+                notify = False
+                if not isinstance(result, str) and result:
+                    notify = self._pending is None
+                    self._pending = result if notify else self._pending.merge(result)
+            if isinstance(result, str):
+                self.failed.emit(result)
+            elif notify:
+                self.changed.emit()
 
 # =========================
-# Dialogs (Settings + Automation + Batch Edit) - Đã cải tiến giao diện
+# Dialogs (Settings + Automation + Batch Edit + ADB) - Đã cải tiến giao diện
 # =========================
 class AutomationDialog(QDialog):
     def __init__(self, parent=None):
@@ -1031,6 +4231,35 @@ class AutomationDialog(QDialog):
         self.batch_delay.setDecimals(2)
         self.batch_delay.setToolTip("Thời gian chờ giữa các đợt khởi động (giây)")
         
+        self.adaptive = QCheckBox("Tự động điều chỉnh tốc độ theo tải máy (CPU/RAM/ổ đĩa)")
+        self.adaptive.setToolTip("Bỏ qua thời gian chờ cố định; tăng/giảm số VM khởi động mỗi bước theo tải máy")
+        self.max_window = QSpinBox()
+        self.max_window.setRange(1, 500)
+        self.max_window.setToolTip("Số VM khởi động tối đa trong một bước khi tự điều chỉnh")
+        self.max_rate = QDoubleSpinBox()
+        self.max_rate.setRange(0.1, 100)
+        self.max_rate.setDecimals(1)
+        self.max_rate.setToolTip("Số VM khởi động tối đa mỗi giây khi tự điều chỉnh")
+        ceilings = PerformanceConfig.get_config(1000)
+        self.max_window.setValue(ceilings['max_launch_window'])
+        self.max_rate.setValue(ceilings['max_launch_rate'])
+        self.adaptive.toggled.connect(self._toggle_adaptive)
+
+        self.wait_ready = QCheckBox("Chờ VM khởi động xong rồi mới mở VM tiếp theo")
+        self.wait_ready.setToolTip("Tiến độ tính theo số VM đã sẵn sàng, không phải số lệnh launch đã gửi")
+        self.max_booting = QSpinBox()
+        self.max_booting.setRange(1, 200)
+        self.max_booting.setValue(PerformanceConfig.get_config(1000)['max_concurrent'])
+        self.max_booting.setToolTip("Số VM được phép đang boot cùng lúc")
+        self.ready_check = QComboBox()
+        self.ready_check.addItem("Trạng thái Android (info)", "info")
+        self.ready_check.addItem("ADB sys.boot_completed", "adb")
+        self.boot_timeout = QSpinBox()
+        self.boot_timeout.setRange(10, 1800)
+        self.boot_timeout.setValue(180)
+        self.boot_timeout.setSuffix(" s")
+        self.wait_ready.toggled.connect(self._toggle_wait_ready)
+
         self.start_index.setValue(1)
         self.end_index.setValue(100)  # Larger default range
         self.batch_size.setValue(50)  # Larger default batch size
@@ -1043,6 +4272,15 @@ class AutomationDialog(QDialog):
         lay.addRow("Kích thước đợt:", self.batch_size)
         lay.addRow("Thời gian chờ giữa VM (giây):", self.instance_delay)
         lay.addRow("Thời gian chờ giữa đợt (giây):", self.batch_delay)
+        lay.addRow(self.adaptive)
+        lay.addRow("Tối đa VM mỗi bước:", self.max_window)
+        lay.addRow("Tối đa VM mỗi giây:", self.max_rate)
+        lay.addRow(self.wait_ready)
+        lay.addRow("Tối đa VM đang boot:", self.max_booting)
+        lay.addRow("Kiểm tra sẵn sàng bằng:", self.ready_check)
+        lay.addRow("Thời gian boot tối đa:", self.boot_timeout)
+        self._toggle_adaptive(False)
+        self._toggle_wait_ready(False)
         
         main_layout.addWidget(form_card)
         
@@ -1071,9 +4309,26 @@ class AutomationDialog(QDialog):
         
         main_layout.addLayout(btn_layout)
 
+    def _toggle_adaptive(self, on):
+        fixed = not (on or self.wait_ready.isChecked())
+        for w in (self.batch_size, self.instance_delay, self.batch_delay):
+            w.setEnabled(fixed)
+        for w in (self.max_window, self.max_rate):
+            w.setEnabled(on)
+
+    def _toggle_wait_ready(self, on):
+        for w in (self.max_booting, self.ready_check, self.boot_timeout):
+            w.setEnabled(on)
+        self._toggle_adaptive(self.adaptive.isChecked())
+
     def get_values(self):
+        ceilings = ({'max_window': self.max_window.value(), 'max_rate': self.max_rate.value()}
+                    if self.adaptive.isChecked() else None)
+        readiness = ({'max_booting': self.max_booting.value(), 'check': self.ready_check.currentData(),
+                      'boot_timeout': float(self.boot_timeout.value())}
+                     if self.wait_ready.isChecked() else None)
         return (self.start_index.value(), self.end_index.value(), self.batch_size.value(),
-                self.instance_delay.value(), self.batch_delay.value())
+                self.instance_delay.value(), self.batch_delay.value(), ceilings, readiness)
 
 class SettingsDialog(QDialog):
     def __init__(self, parent, current_path):
@@ -1239,12 +4494,204 @@ class SettingsDialog(QDialog):
     def get_path(self):
         return self.path_entry.text().strip()
 
+class AdbCommandDialog(QDialog):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Chạy lệnh ADB hàng loạt")
+        self.setMinimumWidth(500)
+
+        main_layout = QVBoxLayout(self)
+
+        title_label = QLabel("📡 Chạy lệnh ADB trên nhiều VM")
+        title_label.setStyleSheet("font-size: 14pt; font-weight: bold; margin-bottom: 10px;")
+        main_layout.addWidget(title_label)
+
+        form_card = QFrame()
+        form_card.setProperty("class", "neo-card")
+        apply_shadow(form_card)
+        lay = QFormLayout(form_card)
+        lay.setSpacing(12)
+
+        self.start_index = QSpinBox()
+        self.start_index.setRange(0, 99999)
+        self.end_index = QSpinBox()
+        self.end_index.setRange(0, 99999)
+        self.end_index.setValue(100)
+        self.command = QLineEdit()
+        self.command.setPlaceholderText("vd: shell getprop ro.product.model")
+        self.max_concurrent = QSpinBox()
+        self.max_concurrent.setRange(1, 200)
+        self.max_concurrent.setValue(PerformanceConfig.get_config(10000)['max_concurrent'])
+        self.max_concurrent.setToolTip("Số lệnh ADB chạy song song tối đa")
+        self.timeout = QSpinBox()
+        self.timeout.setRange(1, 3600)
+        self.timeout.setValue(CommandExecutor.DEFAULT_TIMEOUTS['adb'])
+        self.timeout.setSuffix(" s")
+        self.timeout.setToolTip("Lệnh trên một VM chạy quá thời gian này sẽ bị dừng")
+
+        self.save_jsonl = QCheckBox("Lưu kết quả từng VM (JSONL)")
+        self.jsonl_path = QLineEdit(os.path.join(os.path.expanduser("~"), "mumu_adb_results.jsonl"))
+        browse = QPushButton("Duyệt...")
+        browse.setMaximumWidth(100)
+        browse.clicked.connect(self.browse)
+        path_row = QHBoxLayout()
+        path_row.addWidget(self.jsonl_path)
+        path_row.addWidget(browse)
+        self.save_jsonl.toggled.connect(self.jsonl_path.setEnabled)
+        self.save_jsonl.toggled.connect(browse.setEnabled)
+        self.jsonl_path.setEnabled(False)
+        browse.setEnabled(False)
+
+        lay.addRow("Chỉ số bắt đầu:", self.start_index)
+        lay.addRow("Chỉ số kết thúc:", self.end_index)
+        lay.addRow("Lệnh ADB:", self.command)
+        lay.addRow("Chạy song song tối đa:", self.max_concurrent)
+        lay.addRow("Thời gian tối đa mỗi VM:", self.timeout)
+        lay.addRow(self.save_jsonl)
+        lay.addRow("File kết quả:", path_row)
+        main_layout.addWidget(form_card)
+
+        btn_layout = QHBoxLayout()
+        self.ok_btn = QPushButton("Chạy")
+        self.ok_btn.setProperty("class", "primary")
+        self.ok_btn.setMinimumWidth(100)
+        self.ok_btn.clicked.connect(self._accept_if_valid)
+        self.cancel_btn = QPushButton("Hủy bỏ")
+        self.cancel_btn.setMinimumWidth(100)
+        self.cancel_btn.clicked.connect(self.reject)
+        btn_layout.addStretch(1)
+        btn_layout.addWidget(self.cancel_btn)
+        btn_layout.addWidget(self.ok_btn)
+        main_layout.addLayout(btn_layout)
+
+    def browse(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Lưu kết quả", self.jsonl_path.text(), "JSON Lines (*.jsonl)")
+        if path: self.jsonl_path.setText(path)
+
+    def _accept_if_valid(self):
+        if not self.command.text().strip():
+            QMessageBox.warning(self, "Thiếu lệnh", "Nhập lệnh ADB cần chạy."); return
+        if self.end_index.value() < self.start_index.value():
+            QMessageBox.warning(self, "Sai khoảng VM", "Chỉ số kết thúc phải lớn hơn hoặc bằng chỉ số bắt đầu."); return
+        self.accept()
+
+    def get_values(self):
+        options = {'max_concurrent': self.max_concurrent.value(), 'timeout': float(self.timeout.value())}
+        if self.save_jsonl.isChecked() and self.jsonl_path.text().strip():
+            options['jsonl_path'] = self.jsonl_path.text().strip()
+        return (list(range(self.start_index.value(), self.end_index.value() + 1)),
+                self.command.text().strip(), options)
+
+class SimPreviewModel(QAbstractTableModel):
+    """
+    Rows of BatchEditDialog's preview. IMEI/MAC values are generated in blocks only when
+    the view asks for them and are kept until that field's mode changes, so applying
+    uses exactly the values that were shown.
+    Modes: None (field off), ('random', None), ('fixed', value), ('prefix', 'AA:BB:*')
+    or ('invalid', None).
+    """
+    BLOCK = 256
+    HEADERS = ("VM", "IMEI", "MAC")
+    FIELDS = ('imei', 'mac')
+
+    def __init__(self, indices, generator, parent=None):
+        super().__init__(parent)
+        self.indices = list(indices)
+        self.generator = generator
+        self._modes = {'imei': None, 'mac': None}
+        self._blocks = {'imei': {}, 'mac': {}}  # block number -> values for those rows
+        self._fits = {'imei': False, 'mac': False}  # prefix mode has room for every row
+        self.stats = {'generated': 0}
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.indices)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.HEADERS[section]
+        return None
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole or not index.isValid():
+            return None
+        row, column = index.row(), index.column()
+        if column == 0:
+            return f"VM {self.indices[row]}"
+        field = self.FIELDS[column - 1]
+        if self._modes[field] is None:
+            return "—"
+        return self.value(field, row) or "❌"
+
+    def mode(self, field):
+        return self._modes[field]
+
+    def set_mode(self, field, mode):
+        """Switch a field's mode; its generated values are dropped only if the mode changed"""
+        if self._modes[field] == mode:
+            return
+        previous = self._modes[field]
+        if previous is not None and previous[0] in ('random', 'prefix'):
+            # Shown-but-unapplied values go back to the generator, or they would count as taken
+            self.generator.release(field, [v for values in self._blocks[field].values() for v in values])
+        self._modes[field] = mode
+        self._blocks[field].clear()
+        # Capacity is checked once for all rows: later blocks draw from the same prefix space
+        self._fits[field] = (mode is not None and mode[0] == 'prefix'
+                             and self.generator.free_macs(mode[1]) >= len(self.indices))
+        if self.indices:
+            column = self.FIELDS.index(field) + 1
+            self.dataChanged.emit(self.index(0, column), self.index(len(self.indices) - 1, column))
+
+    def _make(self, field, n):
+        kind, value = self._modes[field] or ('invalid', None)
+        if kind == 'fixed':
+            return [value] * n
+        if kind == 'random':
+            return self.generator.imeis(n) if field == 'imei' else self.generator.macs(n)
+        if kind == 'prefix' and self._fits[field]:
+            return self.generator.macs(n, value)
+        return [None] * n
+
+    def _block_size(self, block):
+        return min(self.BLOCK, len(self.indices) - block * self.BLOCK)
+
+    def value(self, field, row):
+        block = row // self.BLOCK
+        values = self._blocks[field].get(block)
+        if values is None:
+            values = self._blocks[field][block] = self._make(field, self._block_size(block))
+            self.stats['generated'] += len(values)
+        return values[row % self.BLOCK]
+
+    def values(self, field):
+        """Every value of a field in row order; missing blocks are generated in one bulk call"""
+        if self._modes[field] is None:
+            return [None] * len(self.indices)
+        blocks = self._blocks[field]
+        block_count = (len(self.indices) + self.BLOCK - 1) // self.BLOCK
+        missing = [b for b in range(block_count) if b not in blocks]
+        fresh = self._make(field, sum(self._block_size(b) for b in missing))
+        self.stats['generated'] += len(fresh)
+        offset = 0
+        for b in missing:
+            size = self._block_size(b)
+            blocks[b] = fresh[offset:offset + size]
+            offset += size
+        return [v for b in range(block_count) for v in blocks[b]]
+
 class BatchEditDialog(QDialog):
-    def __init__(self, indices, parent=None):
+    PREVIEW_DEBOUNCE_MS = 150
+
+    def __init__(self, indices, parent=None, manager=None, seed=None):
         super().__init__(parent)
         self.setWindowTitle("Chỉnh sửa IMEI / MAC hàng loạt")
         self.setMinimumWidth(580)
         self.indices = sorted(indices)
+        # Bulk IMEI/MAC source; avoids values the manager already knows to be in use
+        self.generator = manager.identity_generator(seed) if manager is not None else IdentityGenerator(seed)
         
         main_layout = QVBoxLayout(self)
         
@@ -1322,9 +4769,16 @@ class BatchEditDialog(QDialog):
         preview_label.setStyleSheet("font-weight: 600; font-size: 11pt;")
         preview_layout.addWidget(preview_label)
         
-        self.preview = QTextEdit()
-        self.preview.setReadOnly(True)
+        # Virtualized preview: rows are generated only for what the view displays
+        self.preview_model = SimPreviewModel(self.indices, self.generator, self)
+        self.preview = QTableView()
+        self.preview.setModel(self.preview_model)
         self.preview.setMinimumHeight(160)
+        self.preview.verticalHeader().setVisible(False)
+        self.preview.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        self.preview.verticalHeader().setDefaultSectionSize(22)
+        self.preview.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.preview.setEditTriggers(QTableView.EditTrigger.NoEditTriggers)
         preview_layout.addWidget(self.preview)
         
         main_layout.addWidget(preview_card)
@@ -1346,9 +4800,13 @@ class BatchEditDialog(QDialog):
         btn_layout.addWidget(self.apply_btn)
         main_layout.addLayout(btn_layout)
         
-        # Connect signals
+        # Connect signals; typing restarts a short timer instead of regenerating per keystroke
+        self._preview_timer = QTimer(self)
+        self._preview_timer.setSingleShot(True)
+        self._preview_timer.setInterval(self.PREVIEW_DEBOUNCE_MS)
+        self._preview_timer.timeout.connect(self.update_preview)
         for w in (self.imei_enable, self.imei_mode, self.mac_enable, self.mac_mode):
-            (w.textChanged if isinstance(w,QLineEdit) else w.stateChanged).connect(self.update_preview)
+            (w.textChanged if isinstance(w,QLineEdit) else w.stateChanged).connect(self._preview_timer.start)
         
         self.update_preview()
 
@@ -1360,39 +4818,32 @@ class BatchEditDialog(QDialog):
     def _valid_mac_prefix(prefix: str) -> bool:
         return bool(re.fullmatch(r"(?i)([0-9A-F]{2}:){1,5}\*", prefix.strip()))
     
-    def _rand_mac(self):
-        return ":".join(f"{random.randint(0,255):02x}" for _ in range(6))
-    
-    def _rand_mac_with_prefix(self, prefix: str):
-        prefix = prefix.strip()[:-1]
-        fixed = prefix.split(":") if prefix else []
-        rest = 6 - len(fixed)
-        tail = [f"{random.randint(0,255):02x}" for _ in range(rest)]
-        return ":".join([*fixed, *tail])
-    
+    def _imei_mode(self):
+        if not self.imei_enable.isChecked(): return None
+        imei_mode = self.imei_mode.text().strip()
+        if imei_mode.lower()=="random": return ('random', None)
+        if re.fullmatch(r"\d{15}", imei_mode): return ('fixed', imei_mode)
+        return ('invalid', None)
+
+    def _mac_mode(self):
+        if not self.mac_enable.isChecked(): return None
+        mac_mode = self.mac_mode.text().strip()
+        if mac_mode.lower()=="random": return ('random', None)
+        if self._valid_mac(mac_mode): return ('fixed', mac_mode.lower())
+        if self._valid_mac_prefix(mac_mode): return ('prefix', mac_mode)
+        return ('invalid', None)
+
     def _gen_tasks(self):
-        tasks = []; imei_enabled = self.imei_enable.isChecked(); mac_enabled = self.mac_enable.isChecked()
-        imei_mode = self.imei_mode.text().strip(); mac_mode = self.mac_mode.text().strip()
-        for idx in self.indices:
-            imei = None; mac = None
-            if imei_enabled:
-                if imei_mode.lower()=="random": imei = MumuManager.generate_imei()
-                elif re.fullmatch(r"\d{15}", imei_mode): imei = imei_mode
-            if mac_enabled:
-                if mac_mode.lower()=="random": mac = self._rand_mac()
-                elif self._valid_mac(mac_mode): mac = mac_mode.lower()
-                elif self._valid_mac_prefix(mac_mode): mac = self._rand_mac_with_prefix(mac_mode).lower()
-            tasks.append((idx, imei, mac))
-        return tasks
+        """Tasks with the same values the preview showed; rows never displayed are generated now"""
+        self.update_preview()
+        model = self.preview_model
+        return list(zip(self.indices, model.values('imei'), model.values('mac')))
     
     def update_preview(self):
-        lines=[]
-        for idx, imei, mac in self._gen_tasks():
-            txt=f"VM {idx}: "
-            if self.imei_enable.isChecked(): txt+=f"IMEI={imei or '❌'}  "
-            if self.mac_enable.isChecked():  txt+=f"MAC={mac or '❌'}"
-            lines.append(txt)
-        self.preview.setPlainText("\n".join(lines))
+        """Apply the current modes to the preview model; unchanged fields keep their values"""
+        self._preview_timer.stop()
+        self.preview_model.set_mode('imei', self._imei_mode())
+        self.preview_model.set_mode('mac', self._mac_mode())
     
     def get_tasks(self):
         tasks = self._gen_tasks()
@@ -1446,19 +4897,294 @@ class StatCard(QFrame):
         title_label = QLabel(title)
         title_label.setStyleSheet("font-weight: 600; color: rgba(var(--text-color), 0.7)")
         
-        value_label = QLabel(value)
-        value_label.setStyleSheet("font-size: 24px; font-weight: 700; margin-top: 4px")
+        self.value_label = QLabel(value)
+        self.value_label.setStyleSheet("font-size: 24px; font-weight: 700; margin-top: 4px")
         
         subtitle_label = QLabel(subtitle)
         subtitle_label.setStyleSheet("color: rgba(var(--text-color), 0.5); font-size: 9pt")
         
         lay.addWidget(title_label)
-        lay.addWidget(value_label)
+        lay.addWidget(self.value_label)
         lay.addWidget(subtitle_label)
         lay.addStretch(1)
         
         apply_shadow(self)
 
+    def set_value(self, value):
+        """Update the number only when it changed to avoid needless relayouts"""
+        text = f"{value:,}" if isinstance(value, int) else str(value)
+        if self.value_label.text() != text:
+            self.value_label.setText(text)
+
+# =========================
+# Instance table (model/view over InstanceStore)
+# =========================
+class InstanceTableModel(QAbstractTableModel):
+    """
+    Read-only table over an InstanceStore. Cells are read straight from the store's
+    columns when the view paints them, so no per-row objects exist for 10k+ VMs.
+    Refresh deltas become a few batched dataChanged ranges instead of one per VM.
+    """
+    COLUMNS = (("index", "ID"), ("name", "Tên"), ("status", "Trạng thái"),
+               ("pid", "PID"), ("adb_port", "Cổng ADB"), ("disk_size", "Dung lượng"))
+    STATUS_COLUMN = 2
+    SORT_ROLE = Qt.ItemDataRole.UserRole
+    MERGE_GAP = 32    # Changed rows closer than this share one dataChanged range
+    MAX_RANGES = 64   # Beyond this many ranges a single spanning range is emitted
+
+    def __init__(self, store, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self.stats = {'data_changed': 0, 'resets': 0}
+        self._numeric = tuple(c for c, (key, _) in enumerate(self.COLUMNS) if key not in ("name", "status"))
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.store)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.COLUMNS[section][1]
+        return None
+
+    def sort_key(self, column):
+        """Per-row sort key of a column, indexable by store row"""
+        store = self.store
+        return (store.index, store.names, store.status, store.pid, store.adb_port, store.disk_size)[column]
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        return self.cell(index.row(), index.column(), role)
+
+    def cell(self, row, column, role=Qt.ItemDataRole.DisplayRole):
+        """data() by row/column, so proxies can skip building source QModelIndex objects"""
+        if role == Qt.ItemDataRole.DisplayRole:
+            store = self.store
+            if column == 0:
+                return str(store.index[row])
+            if column == 1:
+                return store.names[row]
+            if column == 2:
+                return store.STATUS_NAMES[store.status[row]]
+            if column == 5:
+                size = store.disk_size[row]
+                return f"{size / 2**30:.1f} GB" if size else "—"
+            value = (store.pid, store.adb_port)[column - 3][row]
+            return "—" if value == store.MISSING else str(value)
+        if role == Qt.ItemDataRole.TextAlignmentRole and column in self._numeric:
+            return Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter
+        if role == self.SORT_ROLE:
+            return self.sort_key(column)[row]
+        return None
+
+    def set_store(self, store):
+        self.beginResetModel()
+        self.store = store
+        self.endResetModel()
+        self.stats['resets'] += 1
+
+    def load(self, snapshot):
+        """Replace every row with a full {index: info} snapshot"""
+        self.beginResetModel()
+        self.store.load(snapshot)
+        self.endResetModel()
+        self.stats['resets'] += 1
+
+    @classmethod
+    def row_ranges(cls, rows):
+        """Merge ascending rows into (first, last) ranges, bridging gaps up to MERGE_GAP"""
+        ranges = []
+        for row in rows:
+            if ranges and row - ranges[-1][1] <= cls.MERGE_GAP:
+                ranges[-1][1] = row
+            else:
+                ranges.append([row, row])
+        if len(ranges) > cls.MAX_RANGES:
+            return [(ranges[0][0], ranges[-1][1])]
+        return [tuple(r) for r in ranges]
+
+    def apply_delta(self, delta):
+        """
+        Apply an InstanceDelta to the store. Added/removed VMs reset the model (the store
+        re-sorts its columns); in-place changes emit one dataChanged per merged row range.
+        """
+        if not delta:
+            return False, []
+        if delta.added or delta.removed:
+            self.beginResetModel()
+            result = self.store.apply_delta(delta)
+            self.endResetModel()
+            self.stats['resets'] += 1
+            return result
+        structural, rows = self.store.apply_delta(delta)
+        last_column = len(self.COLUMNS) - 1
+        for first, last in self.row_ranges(rows):
+            self.dataChanged.emit(self.index(first, 0), self.index(last, last_column))
+            self.stats['data_changed'] += 1
+        return structural, rows
+
+class InstanceProxyModel(QAbstractProxyModel):
+    """
+    Sort/filter view of InstanceTableModel that never copies row data: it keeps only a
+    permutation of source rows. Sorting reads the store's columns directly, and the
+    filter is a set of VM indices (from InstanceSearchIndex bitmaps).
+    """
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._source = None
+        self._order = []            # Proxy row -> source row
+        self._position = array('q')  # Source row -> proxy row, -1 when filtered out
+        self._visible = None        # VM indices passing the filter; None shows all
+        self._sort_column, self._sort_order = 0, Qt.SortOrder.AscendingOrder
+        self._resort_pending = False  # A re-sort is queued for the end of the current delta
+
+    def setSourceModel(self, model):
+        old = self.sourceModel()
+        if old is not None:
+            old.dataChanged.disconnect(self._source_data_changed)
+            old.modelReset.disconnect(self._source_reset)
+        self.beginResetModel()
+        super().setSourceModel(model)
+        self._source = model
+        model.dataChanged.connect(self._source_data_changed)
+        model.modelReset.connect(self._source_reset)
+        self._rebuild()
+        self.endResetModel()
+
+    # ---- mapping ----
+    def index(self, row, column, parent=QModelIndex()):
+        if parent.isValid() or not (0 <= row < len(self._order)) or not (0 <= column < self.columnCount()):
+            return QModelIndex()
+        return self.createIndex(row, column)
+
+    def parent(self, index=QModelIndex()):
+        return QModelIndex()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._order)
+
+    def columnCount(self, parent=QModelIndex()):
+        source = self.sourceModel()
+        return 0 if parent.isValid() or source is None else source.columnCount()
+
+    def mapToSource(self, index):
+        if not index.isValid():
+            return QModelIndex()
+        return self.sourceModel().index(self._order[index.row()], index.column())
+
+    def mapFromSource(self, index):
+        if not index.isValid() or index.row() >= len(self._position):
+            return QModelIndex()
+        row = self._position[index.row()]
+        return QModelIndex() if row < 0 else self.createIndex(row, index.column())
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        return self._source.cell(self._order[index.row()], index.column(), role)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal:
+            return self.sourceModel().headerData(section, orientation, role)
+        return None
+
+    # ---- ordering ----
+    def source_rows(self):
+        """Source rows in view order"""
+        return self._order
+
+    def _rebuild(self):
+        self._resort_pending = False
+        source = self.sourceModel()
+        store = source.store
+        if self._visible is None:
+            rows = range(len(store))
+        else:
+            rows = sorted(r for r in map(store.row_of, self._visible) if r is not None)
+        descending = self._sort_order == Qt.SortOrder.DescendingOrder
+        if self._sort_column == 0:  # The store is already ordered by VM index
+            order = list(rows)
+            if descending:
+                order.reverse()
+        else:
+            order = sorted(rows, key=source.sort_key(self._sort_column).__getitem__, reverse=descending)
+        position = array('q', [-1]) * len(store)
+        for proxy_row, source_row in enumerate(order):
+            position[source_row] = proxy_row
+        self._order, self._position = order, position
+
+    def _relayout(self):
+        """Re-sort/re-filter while keeping selections and the current index on their VMs"""
+        self.layoutAboutToBeChanged.emit()
+        persistent = self.persistentIndexList()
+        sources = [self.mapToSource(i) for i in persistent]
+        sources = [(s.row(), s.column()) if s.isValid() else None for s in sources]
+        self._rebuild()
+        self.changePersistentIndexList(
+            persistent, [self.mapFromSource(self.sourceModel().index(*s)) if s else QModelIndex() for s in sources])
+        self.layoutChanged.emit()
+
+    def _resort(self):
+        if self._resort_pending:
+            self._relayout()
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        self._sort_column, self._sort_order = max(0, column), order
+        self._relayout()
+
+    def set_filter(self, vm_indices):
+        """Show only VMs whose index is in vm_indices (None shows every VM)"""
+        self._visible = None if vm_indices is None else list(vm_indices)
+        self._relayout()
+
+    # ---- source changes ----
+    def _source_reset(self):
+        self.beginResetModel()
+        self._rebuild()
+        self.endResetModel()
+
+    def _source_data_changed(self, top_left, bottom_right, roles=()):
+        if self._sort_column != 0 and not self._resort_pending:
+            # Values in the sort column may have moved rows. A delta arrives as up to
+            # MAX_RANGES dataChanged signals, so re-sort once after all of them
+            self._resort_pending = True
+            QTimer.singleShot(0, self._resort)
+        rows = [p for p in self._position[top_left.row():bottom_right.row() + 1] if p >= 0]
+        if rows:
+            self.dataChanged.emit(self.index(min(rows), top_left.column()),
+                                  self.index(max(rows), bottom_right.column()), roles)
+
+class InstanceTableView(QTableView):
+    """QTableView set up for 10k+ rows: fixed row height, no word wrap, pill-painted status"""
+    ROW_HEIGHT = 34
+
+    def __init__(self, model, parent=None):
+        super().__init__(parent)
+        self.proxy = InstanceProxyModel(self)
+        self.proxy.setSourceModel(model)
+        self.setModel(self.proxy)
+        header = self.verticalHeader()
+        header.setVisible(False)
+        header.setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        header.setDefaultSectionSize(self.ROW_HEIGHT)
+        self.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Interactive)
+        self.horizontalHeader().setStretchLastSection(True)
+        self.setItemDelegateForColumn(InstanceTableModel.STATUS_COLUMN, StatusPillDelegate(self))
+        self.setWordWrap(False)
+        self.setShowGrid(False)
+        self.setAlternatingRowColors(True)
+        self.setSelectionBehavior(QTableView.SelectionBehavior.SelectRows)
+        self.setEditTriggers(QTableView.EditTrigger.NoEditTriggers)
+        self.setVerticalScrollMode(QTableView.ScrollMode.ScrollPerPixel)
+        self.setSortingEnabled(True)
+        self.sortByColumn(0, Qt.SortOrder.AscendingOrder)
+
+    def selected_vms(self):
+        """VM indices of the selected rows"""
+        store = self.proxy.sourceModel().store
+        return [store.index[self.proxy.mapToSource(i).row()] for i in self.selectionModel().selectedRows()]
+
 # =========================
 # Main Window
 # =========================
@@ -1470,15 +5196,34 @@ class MainWindow(QMainWindow):
         self.settings = QSettings("MumuTeam","MumuManagerPRO")
         self.mumu_path = self.settings.value("manager_path",
             r"C:\Program Files\Netease\MuMuPlayerGlobal-12.0\shell\MuMuManager.exe")
-        self.instance_cache = {}
+        self.instance_store = InstanceStore()
+        self.instance_model = InstanceTableModel(self.instance_store)
+        self.search_index = InstanceSearchIndex()
+        self.visible_instances = None  # Bitmap of VMs passing the search box; None shows all
+        self.manager = MumuManager(self.mumu_path)
         self.worker = None
+        self.journal_dir = self.settings.value("journal_dir", OperationJournal.default_dir())
+        # Worker log lines land in a thread-safe buffer; a timer moves them into the list view in batches
+        try:
+            self.log_writer = LogFileWriter(LogFileWriter.default_path(self.settings.value("log_dir", None)))
+        except OSError:
+            self.log_writer = None
+        self.log_buffer = LogBuffer(writer=self.log_writer)
+        self.log_model = LogModel()
         
         # Apply theme
         apply_neo_style(QApplication.instance(), self.settings.value("theme", "light"))
         
         self._build_ui()
+        # Instance list is polled in the background; the UI only applies the merged deltas
+        self.refresher = RefreshWorker(self.manager, float(self.settings.value("refresh_interval", 5.0)), parent=self)
+        self.refresher.changed.connect(self._on_refresh_changed)
+        self.refresher.failed.connect(self._on_refresh_failed)
         self._wire()
+        self.refresher.start()
         self.refresh_instances()
+        # Offer to continue a run that was cut short by a crash, once the window is up
+        QTimer.singleShot(0, self._offer_resume)
 
     # ---- UI composition (Sidebar + Topbar + Content tabs) ----
     def _sidebar_btn(self, text, icon=""):
@@ -1616,9 +5361,16 @@ class MainWindow(QMainWindow):
         progress_layout = QVBoxLayout(self.progress_frame)
         self.progress_label = QLabel("Đang xử lý...")
         self.progress_bar = QProgressBar()
-        self.log_output = QTextEdit()
-        self.log_output.setMaximumHeight(150)
-        self.log_output.setReadOnly(True)
+        self.log_view = QListView()
+        self.log_view.setModel(self.log_model)
+        self.log_view.setUniformItemSizes(True)
+        self.log_view.setMaximumHeight(150)
+        self.log_view.setEditTriggers(QListView.EditTrigger.NoEditTriggers)
+        self.log_level_filter = QComboBox()
+        self.log_level_filter.addItems(["Tất cả", "Cảnh báo", "Lỗi"])  # Indices match LOG_LEVELS
+        self.log_timer = QTimer(self)
+        self.log_timer.setInterval(self.LOG_FLUSH_MS)
+        self.log_timer.timeout.connect(self._flush_log)
         
         # Control buttons for operations
         control_layout = QHBoxLayout()
@@ -1630,18 +5382,20 @@ class MainWindow(QMainWindow):
         control_layout.addWidget(self.resume_btn)
         control_layout.addWidget(self.stop_btn)
         control_layout.addStretch(1)
+        control_layout.addWidget(QLabel("Mức log:"))
+        control_layout.addWidget(self.log_level_filter)
         
         progress_layout.addWidget(self.progress_label)
         progress_layout.addWidget(self.progress_bar)
-        progress_layout.addWidget(self.log_output)
+        progress_layout.addWidget(self.log_view)
         progress_layout.addLayout(control_layout)
         
         content_layout.addWidget(self.progress_frame)
         
-        # Placeholder for instance table (would need virtual scrolling for 10k)
-        self.instances_label = QLabel("Bảng VM sẽ được tối ưu hóa cho 10,000+ instances với virtual scrolling")
-        self.instances_label.setStyleSheet("text-align: center; padding: 50px; color: gray;")
-        content_layout.addWidget(self.instances_label)
+        # Instance table: model/view over the columnar store, only visible rows are painted
+        self.instance_table = InstanceTableView(self.instance_model)
+        self.instance_proxy = self.instance_table.proxy
+        content_layout.addWidget(self.instance_table, 1)
         
         mv.addWidget(self.content_area)
         
@@ -1663,6 +5417,7 @@ class MainWindow(QMainWindow):
         self.refresh_btn.clicked.connect(self.refresh_instances)
         self.auto_btn.clicked.connect(self.show_automation_dialog)
         self.btn_settings.clicked.connect(self.show_settings)
+        self.btn_tools.clicked.connect(self.show_adb_dialog)
         
         # Search optimization for large datasets
         self.search_input.textChanged.connect(self.filter_instances)
@@ -1672,20 +5427,36 @@ class MainWindow(QMainWindow):
         self.pause_btn.clicked.connect(self.pause_operation)
         self.resume_btn.clicked.connect(self.resume_operation)
         self.stop_btn.clicked.connect(self.stop_operation)
+        self.log_level_filter.currentIndexChanged.connect(self.log_model.set_min_level)
+        self.log_timer.start()
 
     def refresh_instances(self):
-        """Optimized instance refresh for large datasets"""
-        if hasattr(self, 'manager'):
-            # Use performance config based on estimated instance count
-            config = PerformanceConfig.get_config(1000)  # Default estimate
-            
-            # Clear cache periodically for memory management
-            if hasattr(self.manager, 'clear_cache'):
-                self.manager.clear_cache()
-            
-            self.status_bar.showMessage("Đang tải thông tin instances...")
-            # In real implementation, would use background thread
-            self.status_bar.showMessage("Sẵn sàng")
+        """Ask the background refresher to poll now; the result arrives through _on_refresh_changed"""
+        self.status_bar.showMessage("Đang tải thông tin instances...")
+        self.refresher.request()
+
+    def _on_refresh_changed(self):
+        """Apply everything that changed since the last delivery (deltas merged while the UI was busy)"""
+        delta = self.refresher.take()
+        if delta:
+            self._apply_instance_delta(delta)
+            self.status_bar.showMessage(f"Sẵn sàng - {delta.summary()}")
+
+    def _on_refresh_failed(self, message):
+        self.status_bar.showMessage(message.splitlines()[0] if message else "Lỗi")
+
+    def _apply_instance_delta(self, delta):
+        """Push added/removed/changed instances into the UI state and stat cards"""
+        if not delta:
+            return
+        self.instance_model.apply_delta(delta)
+        self.search_index.apply_delta(delta)
+        if self.search_input.text().strip() or self.status_filter.currentIndex():
+            self.filter_instances()
+        counts = self.instance_store.status_counts()
+        self.total_card.set_value(len(self.instance_store))
+        self.running_card.set_value(counts["Running"])
+        self.offline_card.set_value(counts["Stopped"])
 
     def show_automation_dialog(self):
         """Show automation dialog with 10k-optimized defaults"""
@@ -1699,27 +5470,85 @@ class MainWindow(QMainWindow):
             
             # Use optimized worker for large operations
             if instance_count > 1000:
-                self.worker = OptimizedAutoWorker(self.manager, params)
-                self.log_output.append(f"🚀 Using optimized processing for {instance_count} instances")
+                worker = OptimizedAutoWorker(self.manager, params)
+                self.log_buffer.append(f"🚀 Using optimized processing for {instance_count} instances")
             else:
-                self.worker = AutoWorker(self.manager, params)
-            
-            self._connect_worker_signals()
-            self.worker.start()
-            self.progress_frame.setVisible(True)
+                worker = AutoWorker(self.manager, params)
+            self._start_worker(worker, instance_count)
+
+    def show_adb_dialog(self):
+        """Run one ADB command on a range of VMs with per-VM results and grouped outputs"""
+        dialog = AdbCommandDialog(self)
+        if dialog.exec() == QDialog.DialogCode.Accepted:
+            params = dialog.get_values()
+            self._start_worker(AdbFanoutWorker(self.manager, params), len(params[0]))
+
+    def _start_worker(self, worker, total, state=None):
+        """Attach an operation journal (new, or the resumed run's) and start worker"""
+        try:
+            if state is None:
+                worker.journal = OperationJournal.create(self.journal_dir, worker.JOURNAL_KIND, worker.params, total)
+            else:
+                worker.journal = OperationJournal.reopen(state)
+                worker.skip = set(state.done)
+        except (OSError, TypeError, ValueError) as e:
+            worker.journal = None
+            self.log_buffer.append(f"⚠️ Không ghi được nhật ký thao tác, sẽ không thể tiếp tục nếu bị gián đoạn: {e}")
+        self.worker = worker
+        self._connect_worker_signals()
+        self.worker.start()
+        self.progress_frame.setVisible(True)
+
+    def _offer_resume(self):
+        """Offer to continue the newest worker run that has no end record (crash or reboot)"""
+        if self.worker and self.worker.isRunning():
+            return
+        kinds = {cls.JOURNAL_KIND: cls for cls in (AutoWorker, OptimizedAutoWorker, BatchSimWorker, AdbFanoutWorker)}
+        for state in OperationJournal.unfinished(self.journal_dir):
+            worker_cls = kinds.get(state.kind)
+            if worker_cls is None:
+                continue
+            started = time.strftime("%d/%m/%Y %H:%M", time.localtime(state.started)) if state.started else "?"
+            answer = QMessageBox.question(
+                self, "Tiếp tục thao tác dang dở",
+                f"Phiên chạy '{state.kind}' bắt đầu lúc {started} chưa hoàn tất "
+                f"({len(state.done)}/{state.total} đã xong).\nTiếp tục từ chỗ đã dừng?")
+            if answer == QMessageBox.StandardButton.Yes:
+                worker = worker_cls(self.manager, worker_cls.params_from_journal(state.params))
+                self.log_buffer.append(f"↩️ Tiếp tục phiên chạy: bỏ qua {len(state.done)} mục đã hoàn tất")
+                self._start_worker(worker, state.total, state)
+            else:
+                OperationJournal(state.path).close('abandoned')
+            return
 
     def show_settings(self):
         """Show settings dialog"""
         dialog = SettingsDialog(self, self.mumu_path)
         if dialog.exec() == QDialog.DialogCode.Accepted:
             self.mumu_path = dialog.get_path()
-            self.manager = MumuManager(self.mumu_path)
+            old_manager, self.manager = self.manager, MumuManager(self.mumu_path)
+            self.instance_store = InstanceStore()
+            self.instance_model.set_store(self.instance_store)
+            self.search_index = InstanceSearchIndex()
+            self.refresher.set_manager(self.manager)
+            old_manager.shutdown()
+            self.status_bar.showMessage("Đang tải thông tin instances...")
+
+    # Status filter combo order: "Tất cả", "Đang chạy", "Đã tắt"
+    STATUS_FILTERS = (None, "Running", "Stopped")
 
     def filter_instances(self):
-        """Optimized filtering for large datasets"""
-        # In real implementation, would use efficient search algorithms
-        # for 10k+ instances (indexing, caching, etc.)
-        pass
+        """Indexed filtering: ID/range, name and status terms resolved against InstanceSearchIndex"""
+        query = self.search_input.text()
+        status = self.STATUS_FILTERS[max(0, self.status_filter.currentIndex())]
+        if not query.strip() and status is None:
+            self.visible_instances = None
+            self.instance_proxy.set_filter(None)
+            self.status_bar.showMessage(f"Sẵn sàng - {len(self.instance_store):,} VM")
+            return
+        self.visible_instances = self.search_index.search(query, status)
+        self.instance_proxy.set_filter(self.search_index.ids(self.visible_instances))
+        self.status_bar.showMessage(f"Tìm thấy {self.visible_instances.bit_count():,} / {len(self.instance_store):,} VM")
 
     def pause_operation(self):
         """Pause current operation"""
@@ -1739,13 +5568,43 @@ class MainWindow(QMainWindow):
     def _connect_worker_signals(self):
         """Connect worker signals for progress reporting"""
         if self.worker:
+            self.progress_bar.setValue(0)
+            self.progress_label.setText("Đang xử lý...")
             self.worker.progress.connect(self.progress_bar.setValue)
-            self.worker.log.connect(self.log_output.append)
+            self.worker.progress_stats.connect(self._on_worker_stats)
+            # Called in the worker thread: no queued signal per line, the timer batches them
+            self.worker.log.connect(self.log_buffer.append, Qt.ConnectionType.DirectConnection)
             self.worker.finished.connect(self._on_worker_finished)
 
+    def closeEvent(self, event):
+        """Stop background polling; killing the manager's CLI calls ends a poll in flight"""
+        self.refresher.stop()
+        self.manager.shutdown()
+        self.refresher.wait(2000)
+        if self.log_writer is not None:
+            self.log_writer.close()
+        super().closeEvent(event)
+
+    LOG_FLUSH_MS = 100  # Log view refresh period
+
+    def _flush_log(self):
+        """Move buffered log lines into the view, following the tail only if it was already there"""
+        entries = self.log_buffer.drain()
+        if not entries:
+            return
+        scrollbar = self.log_view.verticalScrollBar()
+        at_bottom = scrollbar.value() >= scrollbar.maximum() - 2
+        self.log_model.append(entries)
+        if at_bottom:
+            self.log_view.scrollToBottom()
+
+    def _on_worker_stats(self, snapshot):
+        """Processed/total, VM/phút, ETA and ok/failed counts; arrives a few times per second at most"""
+        self.progress_label.setText(snapshot.text())
+
     def _on_worker_finished(self, message):
         """Handle worker completion"""
-        self.log_output.append(message)
+        self.log_buffer.append(message)
         self.progress_frame.setVisible(False)
         self.status_bar.showMessage("Hoàn thành")
 
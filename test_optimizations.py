@@ -4,9 +4,11 @@ Test script for MumU Manager 10k optimization
 Tests performance configurations and optimized methods
 """
 
+import os
 import sys
 import time
 import json
+import tempfile
 
 # Standalone PerformanceConfig for testing
 class PerformanceConfig:
@@ -132,6 +134,163 @@ def test_memory_simulation():
     
     print("✅ Memory management simulation passed!")
 
+def test_instance_cache():
+    """InstanceCache evicts in LRU order, expires by TTL and is invalidated by mutating commands"""
+    print("\n🗃️ Testing Instance Cache...")
+    from mumu_manager_optimized import InstanceCache, MumuManager
+
+    cache = InstanceCache(max_entries=1000)
+    cache.update({str(i): {"index": i, "status": "running"} for i in range(1200)})
+    assert len(cache) == 1000 and "0" not in cache and cache.stats()['evictions'] == 200
+    assert cache.get("200") is not None  # 200 becomes most recently used
+    cache.update({"new": {}})
+    assert "200" in cache and "201" not in cache
+
+    small = InstanceCache(max_entries=100, max_bytes=2000)
+    small.update({str(i): {"name": "x" * 100} for i in range(50)})
+    assert small.stats()['bytes'] <= 2000 and len(small) < 50
+
+    ttl_cache = InstanceCache(ttl=0.05)
+    ttl_cache.put("1", {"index": 1})
+    time.sleep(0.06)
+    assert ttl_cache.get("1") is None
+    stats = ttl_cache.stats()
+    assert stats['expirations'] == 1 and stats['misses'] == 1
+
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = MumuManager(_write_fake_manager(tmp))
+        manager.get_all_info()
+        manager.control_instance([2, 3], 'launch')
+        assert manager.get_cached_instance_info(2) is None
+        assert manager.get_cached_instance_info(4) is not None
+        assert manager.cache_stats()['invalidations'] == 2
+        manager.shutdown()
+
+    # Unchanged VMs stay readable after their TTL: reads fall back to the polled snapshot
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = MumuManager(_write_fake_manager(tmp))
+        manager.cache = InstanceCache(max_entries=5, ttl=0.05)
+        assert len(manager.poll_changes().added) == 20
+        time.sleep(0.06)
+        assert not manager.poll_changes()  # Nothing changed, so nothing was re-cached
+        assert all(manager.get_cached_instance_info(i)["name"] == f"MuMu-{i}" for i in range(20))
+        manager.control_instance([2], 'launch')
+        assert manager.get_cached_instance_info(2) is None and manager.get_cached_instance_info(3)
+        manager.poll_changes()
+        assert manager.get_cached_instance_info(2) is not None
+        manager.shutdown()
+
+    # Constant-time LRU: refreshing 10k entries must not degrade quadratically
+    big = InstanceCache(max_entries=1000)
+    start = time.perf_counter()
+    for _ in range(5):
+        big.update({str(i): {"index": i} for i in range(10000)})
+    elapsed = time.perf_counter() - start
+    print(f"  5 refreshes of 10k instances: {elapsed * 1000:.1f} ms")
+    assert elapsed < 1.0
+    print("✅ Instance cache tests passed!")
+
+def test_snapshot_diff():
+    """SnapshotDiffer reports only added/removed/changed instances and keeps status counts"""
+    print("\n🔀 Testing Snapshot Diff Refresh...")
+    from mumu_manager_optimized import SnapshotDiffer
+
+    differ = SnapshotDiffer()
+    first = {str(i): {"index": str(i), "is_process_started": i < 3, "pid": i} for i in range(10)}
+    delta = differ.diff(first)
+    assert len(delta.added) == 10 and not delta.changed and not delta.removed
+    assert differ.status_counts == {"Running": 3, "Stopped": 7}
+
+    second = {k: dict(v) for k, v in first.items() if k != "9"}
+    second["5"].update(is_process_started=True, pid=555)
+    second["10"] = {"index": "10", "is_process_started": False}
+    delta = differ.diff(second)
+    assert set(delta.added) == {"10"} and set(delta.removed) == {"9"}
+    assert delta.changed["5"][1] == {"is_process_started": (False, True), "pid": (5, 555)}
+    assert list(delta.changed) == ["5"]
+    assert differ.status_counts == {"Running": 4, "Stopped": 6}
+    assert not differ.diff(second)
+    print("✅ Snapshot diff tests passed!")
+
+def test_instance_store():
+    """Columnar InstanceStore answers counts/ranges/filters and is far smaller than dicts of dicts"""
+    print("\n📦 Testing Columnar Instance Store...")
+    import tracemalloc
+    from mumu_manager_optimized import InstanceStore, SnapshotDiffer
+
+    def make_info(i):
+        return {"index": str(i), "name": f"MuMu-{i % 50}", "is_process_started": i % 3 == 0,
+                "pid": 4000 + i if i % 3 == 0 else None, "adb_host_ip": "127.0.0.1",
+                "adb_port": 16384 + 32 * i, "disk_size_bytes": 2 ** 31 + i}
+
+    tracemalloc.start()
+    snapshot = {str(i): make_info(i) for i in range(10000)}
+    dict_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    store = InstanceStore()
+    store.load(snapshot)
+    print(f"  dicts of dicts: {dict_bytes / 10000:.0f} B/VM, store: {store.memory_bytes() / 10000:.0f} B/VM")
+    assert store.memory_bytes() * 5 < dict_bytes
+
+    assert store.status_counts() == {"Running": 3334, "Stopped": 6666}
+    assert list(store.rows_in_range(100, 250)) == list(range(100, 251))
+    assert store.filter_rows("Running", 100, 110) == [102, 105, 108]
+    assert store.get(105)["pid"] == 4105 and store.get(104)["pid"] is None
+
+    differ = SnapshotDiffer()
+    differ.diff(snapshot)
+    updated = dict(snapshot)
+    updated["104"] = dict(snapshot["104"], is_process_started=True, pid=9)
+    assert store.apply_delta(differ.diff(updated)) == (False, [104])
+    assert store.get(104)["status"] == "Running"
+    updated = dict(updated)
+    del updated["0"]
+    updated["20000"] = make_info(20000)
+    structural, _ = store.apply_delta(differ.diff(updated))
+    assert structural and len(store) == 10000 and store.row_of(20000) == 9999 and store.row_of(0) is None
+
+    start = time.perf_counter()
+    for _ in range(100):
+        store.status_counts()
+    print(f"  count running VMs: {(time.perf_counter() - start) * 10:.3f} ms")
+    print("✅ Instance store tests passed!")
+
+def test_search_index():
+    """InstanceSearchIndex answers ID range, name and status queries within a frame at 10k VMs"""
+    print("\n🔎 Testing Instance Search Index...")
+    from mumu_manager_optimized import InstanceSearchIndex, SnapshotDiffer
+
+    snapshot = {str(i): {"index": str(i), "name": f"{'Farm' if i % 2 else 'Shop'}-{i}",
+                         "is_process_started": i % 4 == 0} for i in range(10000)}
+    differ = SnapshotDiffer()
+    index = InstanceSearchIndex()
+    index.apply_delta(differ.diff(snapshot))
+
+    assert index.search_ids("100-250") == list(range(100, 251))
+    assert index.search_ids("100 - 250 running") == [i for i in range(100, 251) if i % 4 == 0]
+    assert index.search_ids("farm-99", status="Stopped") == [99] + list(range(991, 1000, 2)) + list(range(9901, 10000, 2))
+    assert index.search_ids("đang chạy 8-16") == [8, 12, 16]
+    # Digits match an ID prefix or a name substring ("Shop-1777")
+    assert index.search_ids("777") == [i for i in range(10000) if "777" in str(i)]
+    assert index.search_ids("nope") == []
+
+    updated = dict(snapshot)
+    updated["3"] = {"index": "3", "name": "Renamed", "is_process_started": True}
+    del updated["4"]
+    index.apply_delta(differ.diff(updated))
+    assert index.search_ids("renamed running") == [3]
+    assert 4 not in index.search_ids("0-10")
+
+    queries = ["1", "12", "123", "farm", "shop-12", "500-9000", "running farm", "tắt 10-20"]
+    start = time.perf_counter()
+    for q in queries:
+        index.search(q)
+    per_query = (time.perf_counter() - start) / len(queries) * 1000
+    print(f"  average query: {per_query:.2f} ms")
+    assert per_query < 16, "Search must answer within one frame"
+    print("✅ Search index tests passed!")
+
 def benchmark_batch_processing():
     """Benchmark different batch sizes"""
     print("\n⚡ Benchmarking Batch Processing...")
@@ -162,6 +321,1268 @@ def benchmark_batch_processing():
     
     print("✅ Batch processing benchmark completed!")
 
+# Stand-in for MuMuManager.exe so command execution can be measured on Linux
+FAKE_MANAGER_SOURCE = """#!/usr/bin/env python3
+import json, os, sys, time
+DELAY = @DELAY@
+COUNT = @COUNT@
+FAIL = set(@FAIL@)
+BOOT = @BOOT@  # Seconds from launch to Android ready; None keeps even indices running
+HERE = os.path.dirname(os.path.abspath(__file__))
+args = sys.argv[1:]
+time.sleep(DELAY)
+verb = args[0] if args else ''
+sel = args[args.index('-v') + 1] if '-v' in args else ''
+indices = list(range(COUNT)) if sel == 'all' else [int(x) for x in sel.split(',') if x]
+def launched_at(i):
+    try:
+        return os.path.getmtime(os.path.join(HERE, 'boot-%d' % i))
+    except OSError:
+        return None
+def booted(i):
+    if BOOT is None:
+        return i % 2 == 0
+    t = launched_at(i)
+    return t is not None and time.time() - t >= BOOT
+if verb != 'info' and FAIL.intersection(indices):
+    sys.stderr.write('failed: %s' % sorted(FAIL.intersection(indices)))
+    sys.exit(1)
+if verb == 'control' and args[-1] == 'launch' and BOOT is not None:
+    for i in indices:
+        open(os.path.join(HERE, 'boot-%d' % i), 'w').close()
+if verb == 'info':
+    print(json.dumps([{'index': str(i), 'name': 'MuMu-%d' % i, 'is_process_started': booted(i) or launched_at(i) is not None,
+                       'is_android_started': booted(i), 'pid': 1000 + i if booted(i) else None}
+                      for i in indices]))
+elif verb == 'adb':
+    if 'boot_completed' in args[-1]:
+        print('1' if booted(indices[0]) else '')
+    elif 'ro.product.model' in args[-1]:
+        print('MuMu Lite' if indices[0] % 4 == 0 else 'MuMu Pro')
+    else:
+        print('ok')
+"""
+
+def _multi_cpu():
+    """Timing asserts that rely on stand-in CLI processes overlapping need more than one CPU"""
+    cpus = os.sched_getaffinity(0) if hasattr(os, "sched_getaffinity") else range(os.cpu_count() or 1)
+    return len(cpus) > 1
+
+def _write_fake_manager(directory, delay=0.0, count=20, fail=(), boot=None):
+    """Write an executable stand-in CLI into directory and return its path"""
+    path = os.path.join(directory, "MuMuManager.exe")
+    source = (FAKE_MANAGER_SOURCE.replace("@DELAY@", repr(delay)).replace("@BOOT@", repr(boot))
+              .replace("@COUNT@", repr(count)).replace("@FAIL@", repr(list(fail))))
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(source)
+    os.chmod(path, 0o755)
+    return path
+
+def test_command_executor():
+    """Pooled executor runs stand-in CLI calls concurrently and reports failures"""
+    print("\n🧵 Testing Pooled Command Executor...")
+    import threading
+    from mumu_manager_optimized import CommandExecutor, MumuManager
+
+    with tempfile.TemporaryDirectory() as tmp:
+        exe = _write_fake_manager(tmp, delay=0.2, fail=[7])
+        executor = CommandExecutor(exe, max_workers=8)
+        start = time.perf_counter()
+        futures = [executor.submit(['control', '-v', str(i), 'launch']) for i in range(8)]
+        results = [f.result() for f in futures]
+        elapsed = time.perf_counter() - start
+        executor.shutdown(wait=True)
+
+        assert [ok for ok, _ in results] == [i != 7 for i in range(8)]
+        assert "failed: [7]" in results[7][1]
+        assert elapsed < 0.2 * 8 / 2, f"Calls were not run concurrently ({elapsed:.2f}s)"
+        assert executor.stats == {'submitted': 8, 'completed': 7, 'failed': 1}
+
+        # Arbitrary callables share the pool's slots and windowing
+        executor = CommandExecutor(exe, max_workers=4)
+        lock, running, peak = threading.Lock(), [0], [0]
+        def call(x):
+            with lock:
+                running[0] += 1; peak[0] = max(peak[0], running[0])
+            time.sleep(0.02)
+            with lock:
+                running[0] -= 1
+            return x % 3 != 0, x * 10
+        assert list(executor.map_calls(call, range(20), window=3)) == [x * 10 for x in range(20)]
+        assert peak[0] <= 3 and executor.stats == {'submitted': 20, 'completed': 13, 'failed': 7}
+        executor.shutdown(wait=True)
+
+        manager =MumuManager(os.path.join(tmp, "missing.exe"))
+        ok, msg = manager.control_instance([1], 'launch')
+        assert not ok and "missing.exe" in msg
+        manager.shutdown()
+    print("✅ Command executor tests passed!")
+
+def test_async_manager():
+    """AsyncMumuManager runs CLI calls on one event loop under its semaphore"""
+    print("\n🔁 Testing AsyncMumuManager...")
+    import asyncio
+    from mumu_manager_optimized import AsyncMumuManager, MumuManager
+
+    async def scenario(exe):
+        manager = AsyncMumuManager(exe, max_concurrent=10)
+        info = await manager.get_all_info()
+        assert len(info) == 20 and info["4"]["name"] == "MuMu-4"
+        start = time.perf_counter()
+        ok, msg = await manager.optimize_command_execution(
+            [['control', '-v', str(i), 'launch'] for i in range(10, 20)])
+        elapsed = time.perf_counter() - start
+        assert ok and msg == "10/10 commands succeeded"
+        assert elapsed < 0.2 * 10 / 2, f"Commands were not overlapped ({elapsed:.2f}s)"
+        ok, msg = await manager.batch_control_instance(list(range(10)), 'shutdown', chunk_size=3)
+        assert not ok and "chunk 3" in msg
+        assert not isinstance(manager, MumuManager) and isinstance(manager.manager, MumuManager)
+        manager.shutdown()
+
+        # Wrapping an existing manager shares its cache; the sync API stays on that manager
+        sync = MumuManager(exe)
+        wrapper = AsyncMumuManager(manager=sync, max_concurrent=4)
+        await wrapper.control_instance([1], 'launch')
+        assert len(await wrapper.get_all_info()) == 20 and sync.get_cached_instance_info(4)["name"] == "MuMu-4"
+        wrapper.shutdown()
+        assert sync.control_instance([2], 'launch')[0], "The wrapper does not shut down a manager it was given"
+        sync.shutdown()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(scenario(_write_fake_manager(tmp, delay=0.2, fail=[8])))
+    print("✅ AsyncMumuManager tests passed!")
+
+def test_control_coalescing():
+    """Concurrent launch requests are merged into one CLI call; failures stay per caller"""
+    print("\n🧲 Testing Control Request Coalescing...")
+    import threading
+    from mumu_manager_optimized import CancelToken, MumuManager, is_cancelled
+
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = MumuManager(_write_fake_manager(tmp, delay=0.05, fail=[13]), coalesce_window=0.02)
+        results = {}
+        def launch(i):
+            results[i] = manager.control_instance([i], 'launch')
+        threads = [threading.Thread(target=launch, args=(i,)) for i in range(20)]
+        for t in threads: t.start()
+        for t in threads: t.join()
+
+        assert all(results[i][0] for i in range(20) if i != 13)
+        assert not results[13][0] and "failed: [13]" in results[13][1]
+        assert results[5][1] == "Lệnh 'control -v 5 launch' thực thi thành công."
+        stats = manager.coalescer.stats
+        print(f"  {stats['requests']} requests -> {stats['invocations']} CLI calls")
+        # One merged call, then bisected retries isolate the failing caller
+        assert stats['invocations'] < stats['requests']
+        manager.shutdown()
+
+    # A merged child is killed only once every caller riding on it has cancelled
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = MumuManager(_write_fake_manager(tmp, delay=5.0), coalesce_window=0.02)
+        live = manager.executor.watchdog.live
+        def settles(predicate, timeout=2.0):
+            deadline = time.monotonic() + timeout
+            while not predicate() and time.monotonic() < deadline:
+                time.sleep(0.01)
+            return predicate()
+        tokens = [CancelToken(), CancelToken()]
+        futures = [manager.coalescer.submit([i], 'launch', token) for i, token in enumerate(tokens)]
+        assert settles(lambda: len(live()) == 1)
+        tokens[0].cancel("pause")
+        assert is_cancelled(futures[0].result(timeout=1)) and not futures[1].done()
+        time.sleep(0.1)
+        assert len(live()) == 1, "The other caller still needs the shared call"
+        tokens[1].cancel("pause")
+        assert is_cancelled(futures[1].result(timeout=1)) and settles(lambda: live() == [])
+
+        token = CancelToken()
+        future = manager.coalescer.submit([3], 'shutdown', token)
+        assert settles(lambda: len(live()) == 1)
+        token.cancel("stop")
+        assert is_cancelled(future.result(timeout=1)) and settles(lambda: live() == [])
+        ok, msg = manager.batch_control_instance(list(range(6)), 'launch', chunk_size=2, token=token)
+        assert is_cancelled((ok, msg)), "The chunked path keeps the CancelledMessage"
+        manager.shutdown()
+        # Errors on the flush thread still settle the callers instead of hanging them
+        future = manager.coalescer.submit([4], 'launch')
+        ok, msg = future.result(timeout=2)
+        assert not ok and msg
+        assert 'restart' not in manager.COALESCED_ACTIONS, "restart is not idempotent, so never bisected"
+    print("✅ Control coalescing tests passed!")
+
+def test_argv_packer():
+    """ArgvPacker fills each -v list up to the command-line limit and reports saved calls"""
+    print("\n📐 Testing Command-Line Packer...")
+    from mumu_manager_optimized import ArgvPacker, MumuManager
+
+    exe = r"C:\Program Files\Netease\MuMuPlayerGlobal-12.0\shell\MuMuManager.exe"
+    packer = ArgvPacker(exe, limit=32767 - 2048)
+    indices = list(range(10000, 20000))
+    fixed = ['control', '-v', 'launch']
+    chunks = packer.pack(indices, fixed)
+    assert [i for chunk in chunks for i in chunk] == indices
+    for chunk in chunks:
+        command_line = " ".join([f'"{exe}"', 'control', '-v', ",".join(map(str, chunk)), 'launch'])
+        assert len(command_line) <= packer.limit
+    print(f"  10k five-digit indices: {len(chunks)} calls (fixed chunks of 100: 100 calls)")
+    assert len(chunks) < 10 and packer.stats['saved'] == 100 - len(chunks)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = MumuManager(_write_fake_manager(tmp, fail=[4321]))
+        ok, msg = manager.batch_control_instance(list(range(3000)), 'shutdown')
+        assert ok, msg
+        ok, msg = manager.batch_run_adb_command(list(range(5000)), "getprop")
+        assert not ok and "chunk 1" in msg
+        manager.shutdown()
+    print("✅ Command-line packer tests passed!")
+
+def test_parallel_batch_control():
+    """Parallel batch control isolates a broken VM by bisection and reports per-index outcomes"""
+    print("\n🪓 Testing Parallel Batch Control...")
+    from mumu_manager_optimized import MumuManager
+
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = MumuManager(_write_fake_manager(tmp, delay=0.1, fail=[137]))
+        start = time.perf_counter()
+        outcome = manager.parallel_batch_control(list(range(200)), 'launch', chunk_size=25,
+                                                 max_concurrent=8, max_retries=1, backoff=0.01)
+        elapsed = time.perf_counter() - start
+        assert outcome.failed == [137] and len(outcome.results) == 200
+        assert outcome.results[136][0] and "failed: [137]" in outcome.results[137][1]
+        print(f"  {outcome.summary()}")
+        # 8 chunks in one wave, then ~log2(25) bisection rounds and one retry
+        assert elapsed < outcome.invocations * 0.1, f"Chunks did not run concurrently ({elapsed:.2f}s)"
+
+        ok, msg = manager.batch_control_instance(list(range(10)), 'shutdown', parallel=True)
+        assert ok and msg.startswith("10/10")
+
+        # Packed chunks are split so max_concurrent has something to run in parallel
+        assert len(manager._chunks(range(1000, 11000), ['control', '-v', 'launch'], None)) < 8
+        outcome = manager.parallel_batch_control(range(1000, 11000), 'shutdown', max_concurrent=8)
+        assert outcome.ok and outcome.invocations == 8 and len(outcome.results) == 10000
+        assert MumuManager._spread([[1, 2, 3]], 8) == [[1], [2], [3]]
+
+        # restart is not idempotent: a failed chunk is reported, never re-sent to its healthy VMs
+        outcome = manager.parallel_batch_control(list(range(200)), 'restart', chunk_size=25, max_concurrent=8)
+        assert outcome.invocations == 8 and outcome.failed == list(range(125, 150))
+        manager.shutdown()
+    print("✅ Parallel batch control tests passed!")
+
+def test_command_pool_streaming():
+    """iter_command_results streams bounded results with metadata; ordered mode keeps input order"""
+    print("\n🌊 Testing Streaming Command Pool...")
+    import threading
+    from mumu_manager_optimized import MumuManager
+
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = MumuManager(_write_fake_manager(tmp, delay=0.05, fail=[3]))
+        commands = [(['control', '-v', str(i), 'launch'], {"vm": i}) for i in range(40)]
+        baseline_threads = threading.active_count()
+        peak_threads = 0
+        streamed = []
+        for result in manager.iter_command_results(iter(commands), max_concurrent=5):
+            peak_threads = max(peak_threads, threading.active_count())
+            streamed.append(result)
+        assert sorted(r.meta["vm"] for r in streamed) == list(range(40))
+        assert [r.meta["vm"] for r in streamed if not r.ok] == [3]
+        assert all(r.elapsed >= 0.05 and r.started > 0 for r in streamed)
+        assert peak_threads - baseline_threads <= manager.executor.max_workers
+
+        ordered = manager.run_commands([c for c, _ in commands[:12]])
+        assert [r.position for r in ordered] == list(range(12))
+        # Plain tuple commands are commands, not (args, meta) pairs
+        plain = manager.run_commands([('info', '-v', '1'), ('control', '-v', '2', 'launch'),
+                                      (('control', '-v', '4', 'launch'), "vm4")], return_output=True)
+        assert [r.ok for r in plain] == [True, True, True] and '"MuMu-1"' in plain[0].output
+        assert [r.meta for r in plain] == [None, None, "vm4"] and plain[1].args[-1] == 'launch'
+        ok, msg = manager.optimize_command_execution([c for c, _ in commands], max_concurrent=8)
+        assert not ok and msg == "39/40 commands succeeded"
+        manager.shutdown()
+    print("✅ Streaming command pool tests passed!")
+
+def test_command_timeouts():
+    """Hung CLI calls are killed by the watchdog; cancelling a token aborts them at once"""
+    print("\n⏱️ Testing Command Timeouts and Cancellation...")
+    import threading
+    from mumu_manager_optimized import AutoWorker, CancelledMessage, CancelToken, CommandExecutor, MumuManager
+
+    with tempfile.TemporaryDirectory() as tmp:
+        exe = _write_fake_manager(tmp, delay=5.0)
+        executor = CommandExecutor(exe, timeouts={'control': 0.3})
+        start = time.perf_counter()
+        ok, msg = executor.run(['control', '-v', '1', 'launch'])
+        elapsed = time.perf_counter() - start
+        assert not ok and "quá thời gian 0.3s" in msg
+        assert elapsed < 1.5, f"Watchdog did not kill the child ({elapsed:.2f}s)"
+
+        token = CancelToken()
+        threading.Timer(0.2, token.cancel).start()
+        start = time.perf_counter()
+        ok, msg = executor.run(['info', '-v', 'all'], return_output=True, token=token)
+        elapsed = time.perf_counter() - start
+        assert not ok and isinstance(msg, CancelledMessage)
+        assert elapsed < 1.0, f"Cancellation did not kill the child ({elapsed:.2f}s)"
+        ok, msg = executor.run(['info', '-v', 'all'], token=token)
+        assert isinstance(msg, CancelledMessage) and executor.watchdog.live() == []
+        executor.shutdown(wait=True)
+
+        # Stopping a worker kills the call it is blocked on
+        manager = MumuManager(exe)
+        worker = AutoWorker(manager, (0, 99, 10, 0.0, 0.0))
+        worker.start()
+        time.sleep(0.3)
+        start = time.perf_counter()
+        worker.stop()
+        assert worker.wait(2000), "Worker did not stop"
+        stop_latency = time.perf_counter() - start
+        print(f"  Stop latency with a 5s CLI call in flight: {stop_latency * 1000:.0f} ms")
+        assert stop_latency < 1.0
+        manager.shutdown()
+    print("✅ Command timeout tests passed!")
+
+def test_worker_control_latency():
+    """Pause, resume and stop wake a worker at once, even in the middle of a long delay"""
+    print("\n🎛️ Testing Event-Driven Worker Control...")
+    from PyQt6.QtCore import Qt
+    from mumu_manager_optimized import AutoWorker, MumuManager
+
+    def wait_until(condition, timeout=5.0):
+        deadline = time.perf_counter() + timeout
+        while not condition():
+            assert time.perf_counter() < deadline, "Timed out waiting for the worker"
+            time.sleep(0.002)
+        return time.perf_counter()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = MumuManager(_write_fake_manager(tmp))
+
+        # Stop lands while the worker sits in a 10s inter-instance delay
+        progress = []
+        worker = AutoWorker(manager, (0, 9, 10, 10.0, 10.0))
+        worker.progress.connect(progress.append, Qt.ConnectionType.DirectConnection)
+        worker.start()
+        wait_until(lambda: progress)
+        start = time.perf_counter()
+        worker.stop()
+        assert worker.wait(2000)
+        stop_latency = time.perf_counter() - start
+
+        # Pause holds the worker without launches; resume restarts it at once
+        # (progress signals are rate-limited, so launches are counted from the per-VM log lines)
+        launched = []
+        worker = AutoWorker(manager, (0, 999, 1000, 0.05, 0.0))
+        worker.log.connect(lambda line: line.startswith("Khởi động VM") and launched.append(line),
+                           Qt.ConnectionType.DirectConnection)
+        worker.start()
+        wait_until(lambda: len(launched) >= 2)
+        worker.pause()
+        time.sleep(0.1)
+        frozen = len(launched)
+        time.sleep(0.3)
+        assert len(launched) == frozen, "Worker kept running while paused"
+        start = time.perf_counter()
+        worker.resume()
+        resume_latency = wait_until(lambda: len(launched) > frozen) - start
+        worker.stop()
+        assert worker.wait(2000)
+
+        # Paused workers block on a condition instead of waking every 140 ms
+        idle = [AutoWorker(manager, (0, 0, 1, 0.0, 0.0)) for _ in range(50)]
+        for w in idle:
+            w.pause(); w.start()
+        cpu_start = time.process_time()
+        time.sleep(0.5)
+        idle_cpu = time.process_time() - cpu_start
+        for w in idle:
+            w.stop()
+        assert all(w.wait(2000) for w in idle)
+        manager.shutdown()
+
+    print(f"  Stop during delay: {stop_latency * 1000:.1f} ms, resume to next VM: {resume_latency * 1000:.1f} ms")
+    print(f"  CPU used by 50 paused workers over 0.5s: {idle_cpu * 1000:.1f} ms")
+    assert stop_latency < 0.1
+    # Includes one fake CLI call (interpreter start-up) after waking
+    assert resume_latency < 0.5
+    assert idle_cpu < 0.05
+    print("✅ Worker control tests passed!")
+
+def test_adaptive_rate_control():
+    """Host load is read from /proc files and drives an AIMD launch window under its ceilings"""
+    print("\n📈 Testing Adaptive Launch Rate Control...")
+    from PyQt6.QtCore import Qt
+    from mumu_manager_optimized import (AdaptiveRateController, AutoWorker, HostLoadSample,
+                                        HostLoadSampler, MumuManager, OptimizedAutoWorker)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        proc = os.path.join(tmp, "proc")
+        os.makedirs(os.path.join(proc, "pressure"))
+        def write(name, text):
+            with open(os.path.join(proc, name), "w") as f:
+                f.write(text)
+        write("stat", "cpu  100 0 100 800 0 0 0 0 0 0\n")
+        write("meminfo", "MemTotal: 1000 kB\nMemFree: 100 kB\nMemAvailable: 400 kB\n")
+        write("pressure/io", "some avg10=35.00 avg60=0.00 avg300=0.00 total=0\n"
+                             "full avg10=10.00 avg60=0.00 avg300=0.00 total=0\n")
+        sampler = HostLoadSampler(proc)
+        # 300 of the next 400 jiffies busy -> 75% CPU
+        write("stat", "cpu  350 0 150 900 0 0 0 0 0 0\n")
+        sample = sampler.sample()
+        assert sample.source == "proc"
+        assert abs(sample.cpu - 0.75) < 1e-9 and abs(sample.memory - 0.6) < 1e-9 and abs(sample.io - 0.35) < 1e-9
+        assert sample.load == sample.cpu
+        neutral = HostLoadSampler(os.path.join(tmp, "missing")).sample()
+        assert neutral.source in ("psutil", "none")
+
+    # Additive increase below target, multiplicative decrease above high, clamped to ceilings
+    controller = AdaptiveRateController(max_window=6, max_rate=2.0, interval=0.5)
+    windows = [controller.update(HostLoadSample(cpu=load)) for load in
+               (0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.9, 0.75, 0.9, 0.9, 0.9, 0.2)]
+    assert windows == [2, 3, 4, 5, 6, 6, 6, 3, 3, 1, 1, 1, 2], windows
+    assert controller.pause_for(1) == 0.5 and controller.pause_for(6) == 3.0
+    assert AdaptiveRateController.for_instances(10000).max_window == 32
+    assert AdaptiveRateController.for_instances(50, max_window=3).max_window == 3
+
+    class ScriptedSampler:
+        def __init__(self, loads):
+            self.loads = list(loads)
+        def sample(self):
+            return HostLoadSample(cpu=self.loads.pop(0) if len(self.loads) > 1 else self.loads[0])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = MumuManager(_write_fake_manager(tmp, count=40))
+        worker = AutoWorker(manager, (0, 29, 5, 9.0, 9.0, {'max_window': 4, 'max_rate': 1000.0, 'interval': 0.0}))
+        worker.load_sampler = ScriptedSampler([0.1, 0.1, 0.1, 0.1, 0.95, 0.1])
+        logs = []
+        worker.log.connect(logs.append, Qt.ConnectionType.DirectConnection)
+        start = time.perf_counter()
+        worker.start()
+        assert worker.wait(10000)
+        elapsed = time.perf_counter() - start
+        launched = [line for line in logs if line.startswith("Khởi động VM")]
+        assert len(launched) == 30 and all("Thành công" in line for line in launched)
+        assert worker.rate_controller.stats['decreases'] == 1
+        # Fixed 9s delays are bypassed in adaptive mode
+        assert elapsed < 9.0
+
+        # With no load source at all, adaptive mode warns and keeps the fixed delays
+        worker = AutoWorker(manager, (0, 5, 3, 0.0, 0.0, {'max_window': 4, 'max_rate': 1000.0}))
+        worker.load_sampler = HostLoadSampler(proc_root=os.path.join(tmp, "no-proc"))
+        if worker.load_sampler.source == 'none':  # psutil would still provide load
+            logs = []
+            worker.log.connect(logs.append, Qt.ConnectionType.DirectConnection)
+            worker.start()
+            assert worker.wait(10000)
+            assert worker.rate_controller is None and any("độ trễ cố định" in line for line in logs)
+            assert sum(line.startswith("Khởi động VM") for line in logs) == 6
+        manager.shutdown()
+
+    # A pause kills the in-flight bulk step; its VMs are re-issued on resume, not counted as failed
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = MumuManager(_write_fake_manager(tmp, delay=0.5, count=10, boot=0.0))
+        worker = OptimizedAutoWorker(manager, (0, 5, 3, 0.0, 0.0, {'max_window': 2, 'max_rate': 1000.0, 'interval': 0.0}))
+        worker.load_sampler = ScriptedSampler([0.1])
+        logs = []
+        worker.log.connect(logs.append, Qt.ConnectionType.DirectConnection)
+        worker.start()
+        time.sleep(0.2)
+        worker.pause()
+        time.sleep(0.3)
+        assert not any(os.path.exists(os.path.join(tmp, f"boot-{i}")) for i in range(6))
+        worker.resume()
+        assert worker.wait(15000)
+        assert worker.tracker.ok == 6 and worker.tracker.failed == 0, (worker.tracker.ok, worker.tracker.failed)
+        assert all(os.path.exists(os.path.join(tmp, f"boot-{i}")) for i in range(6))
+        assert not any(line.startswith("❌") for line in logs), logs
+        manager.shutdown()
+    print(f"  Windows under scripted load: {windows}")
+    print("✅ Adaptive rate control tests passed!")
+
+def test_launch_pipeline():
+    """LaunchPipeline bounds VMs booting at once and reports progress by real readiness"""
+    print("\n🚦 Testing Readiness-Aware Launch Pipeline...")
+    from PyQt6.QtCore import Qt
+    from mumu_manager_optimized import AutoWorker, LaunchPipeline, MumuManager
+
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = MumuManager(_write_fake_manager(tmp, count=40, fail=[5], boot=0.3))
+        pipeline = LaunchPipeline(manager, range(12), max_booting=4, poll_interval=0.05, boot_timeout=5.0)
+        peak = [0]
+        original_fill = pipeline._fill
+        def fill(token, on_result):
+            original_fill(token, on_result)
+            peak[0] = max(peak[0], len(pipeline.booting))
+        pipeline._fill = fill
+        start = time.perf_counter()
+        outcome = pipeline.run()
+        elapsed = time.perf_counter() - start
+        assert outcome.failed == [5] and len(outcome.results) == 12
+        assert peak[0] == 4, f"Expected 4 VMs booting at once, saw {peak[0]}"
+        assert all(t >= 0.3 for t in pipeline.boot_times.values())
+        # 11 bootable VMs, 4 at a time, 0.3s each -> about three waves
+        assert elapsed < 2.0, f"Pipeline did not overlap boots ({elapsed:.2f}s)"
+        print(f"  {outcome.summary()}, {pipeline.stats['polls']} polls")
+
+        # adb boot_completed check, and a VM that never becomes ready times out
+        pipeline = LaunchPipeline(manager, [20, 21], max_booting=2, check='adb', poll_interval=0.05, boot_timeout=5.0)
+        assert pipeline.run().ok
+        slow_dir = os.path.join(tmp, "slow")
+        os.makedirs(slow_dir)
+        slow = MumuManager(_write_fake_manager(slow_dir, boot=60.0))
+        outcome = LaunchPipeline(slow, [1], poll_interval=0.05, boot_timeout=0.2).run()
+        assert outcome.failed == [1] and "không sẵn sàng" in outcome.results[1][1]
+        slow.shutdown()
+
+        # Worker progress only moves when VMs are ready, not when launch returns
+        progress = []
+        worker = AutoWorker(manager, (30, 35, 10, 0.0, 0.0, None,
+                                      {'max_booting': 3, 'check': 'info', 'poll_interval': 0.05, 'boot_timeout': 5.0}))
+        worker.progress.connect(progress.append, Qt.ConnectionType.DirectConnection)
+        worker.start()
+        time.sleep(0.15)
+        assert progress == [], "Progress reported before any VM was ready"
+        assert worker.wait(5000)
+        assert progress[-1] == 100 and worker.launch_pipeline.outcome.ok
+        manager.shutdown()
+    print("✅ Launch pipeline tests passed!")
+
+def test_operation_journal():
+    """Journal survives a torn tail, batches fsync, and lets a worker resume without redoing work"""
+    print("\n📓 Testing Operation Journal...")
+    from PyQt6.QtCore import Qt
+    from mumu_manager_optimized import AutoWorker, BatchSimWorker, MumuManager, OperationJournal
+
+    with tempfile.TemporaryDirectory() as tmp:
+        journal_dir = os.path.join(tmp, "journal")
+        journal = OperationJournal.create(journal_dir, 'auto', (0, 999, 50, 0.0, 0.0, None), 1000,
+                                          sync_every=100, sync_interval=60.0)
+        start = time.perf_counter()
+        for idx in range(1000):
+            journal.plan([idx])
+            journal.done([idx])
+        elapsed = time.perf_counter() - start
+        journal.sync()
+        print(f"  2000 records in {elapsed * 1000:.1f} ms with {journal.stats['fsyncs']} fsyncs")
+        assert journal.stats['fsyncs'] <= 22
+        # Simulate a crash mid-write: no end record and a torn last line
+        with open(journal.path, "a", encoding="utf-8") as f:
+            f.write('{"t":"done","it')
+        journal.close()
+        state = OperationJournal.unfinished(journal_dir)[0]
+        assert state.kind == 'auto' and state.total == 1000 and state.params[1] == 999
+        assert state.done == set(range(1000)) and state.remaining == 0
+
+        OperationJournal(state.path).close('abandoned')
+        assert OperationJournal.unfinished(journal_dir) == []
+        for _ in range(3):
+            OperationJournal.create(journal_dir, 'auto', [], 0).close('completed')
+        OperationJournal.prune(journal_dir, keep=2)
+        assert len(os.listdir(journal_dir)) == 2
+
+        # A run that stops part-way resumes with only the VMs it had not launched
+        manager = MumuManager(_write_fake_manager(tmp, count=40))
+        launched = []
+        def record(line):
+            if line.startswith("Khởi động VM"):
+                launched.append(int(line.split()[3].rstrip(':')))
+        worker = AutoWorker(manager, (0, 19, 5, 0.0, 0.0))
+        worker.journal = OperationJournal.create(journal_dir, worker.JOURNAL_KIND, worker.params, 20)
+        worker.log.connect(record, Qt.ConnectionType.DirectConnection)
+        def crash(line):
+            # Simulate a crash: the journal is left without an end record
+            if len(launched) >= 8 and worker.journal is not None:
+                worker.journal.close()
+                worker.journal = None
+                worker.stop()
+        worker.log.connect(crash, Qt.ConnectionType.DirectConnection)
+        worker.start()
+        assert worker.wait(5000)
+        first_run = list(launched)
+        state = OperationJournal.unfinished(journal_dir)[0]
+        assert state.done == set(first_run) and 0 < len(first_run) < 20
+
+        launched.clear()
+        worker = AutoWorker(manager, AutoWorker.params_from_journal(state.params))
+        worker.journal, worker.skip = OperationJournal.reopen(state), set(state.done)
+        worker.log.connect(record, Qt.ConnectionType.DirectConnection)
+        worker.start()
+        assert worker.wait(5000)
+        assert sorted(first_run + launched) == list(range(20))
+        assert OperationJournal.unfinished(journal_dir) == []
+
+        tasks = BatchSimWorker.params_from_journal([[1, "490154203237518", None]])
+        assert tasks == [(1, "490154203237518", None)]
+        manager.shutdown()
+    print("✅ Operation journal tests passed!")
+
+def test_simulation_writes():
+    """Shared IMEI/MAC values are packed into one call; distinct values run concurrently with retries"""
+    print("\n🛡️ Testing Concurrent Simulation Writes...")
+    from PyQt6.QtCore import Qt
+    from mumu_manager_optimized import BatchSimWorker, MumuManager
+
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = MumuManager(_write_fake_manager(tmp, delay=0.05, count=100, fail=[7]))
+        assignments = [(i, 'imei', "490154203237518") for i in range(40)]
+        assignments += [(i, 'mac_address', "02:00:00:00:00:%02x" % i) for i in range(40)]
+        start = time.perf_counter()
+        outcome = manager.apply_simulation(assignments, max_retries=1, backoff=0.01)
+        elapsed = time.perf_counter() - start
+        assert outcome.failed == [(7, 'imei'), (7, 'mac_address')] and len(outcome.results) == 80
+        # 1 packed IMEI call + bisection down to VM 7 + 40 MAC calls, far fewer than 80 sequential calls
+        print(f"  {outcome.summary()}")
+        assert outcome.invocations < 60
+        # Each stand-in call is a Python start-up; on one CPU those serialize regardless of the pool
+        if _multi_cpu():
+            assert elapsed < 80 * 0.05 / 2, f"Writes did not overlap ({elapsed:.2f}s)"
+
+        tasks = [(i, "490154203237518", "02:00:00:00:00:%02x" % i) for i in range(40, 80)]
+        worker = BatchSimWorker(manager, tasks)
+        logs, progress = [], []
+        worker.log.connect(logs.append, Qt.ConnectionType.DirectConnection)
+        worker.progress.connect(progress.append, Qt.ConnectionType.DirectConnection)
+        start = time.perf_counter()
+        worker.start()
+        assert worker.wait(10000)
+        elapsed = time.perf_counter() - start
+        text = "\n".join(logs)
+        assert "40 VM (40…79) • IMEI → 490154203237518: OK" in text
+        assert "VM 55 • MAC → 02:00:00:00:00:37: OK" in text
+        assert progress[-1] == 100 and "LỖI" not in text
+        # Old worker: 80 sequential calls plus 40 x 120 ms sleeps
+        if _multi_cpu():
+            assert elapsed < 80 * 0.05 / 2, f"Worker writes did not overlap ({elapsed:.2f}s)"
+        assert len(logs) < 20, f"Logs were not batched ({len(logs)} emits)"
+        manager.shutdown()
+    print("✅ Simulation write tests passed!")
+
+def test_identity_generation():
+    """Bulk IMEI/MAC generation is Luhn-valid, collision-free, seedable and fast"""
+    print("\n🆔 Testing Bulk Identity Generation...")
+    from mumu_manager_optimized import IdentityGenerator, InstanceCache, MumuManager, np
+
+    def luhn_ok(imei):
+        return imei[14] == str(IdentityGenerator.luhn_digit(map(int, imei[:14])))
+
+    for use_numpy in ([True, False] if np is not None else [False]):
+        taken_imei, taken_mac = "490154203237518", "aa:bb:cc:00:00:01"
+        generator = IdentityGenerator(seed=42, taken_imeis=[taken_imei], taken_macs=[taken_mac], use_numpy=use_numpy)
+        start = time.perf_counter()
+        imeis = generator.imeis(100000)
+        macs = generator.macs(100000)
+        elapsed = time.perf_counter() - start
+        print(f"  100k IMEIs + 100k MACs ({'NumPy' if use_numpy else 'pure Python'}): {elapsed * 1000:.0f} ms")
+        assert len(set(imeis)) == 100000 and taken_imei not in imeis
+        assert all(len(v) == 15 and v.isdigit() and luhn_ok(v) for v in imeis)
+        assert len(set(macs)) == 100000
+        # Random MACs are unicast and locally administered
+        assert all(int(v[:2], 16) & 0b11 == 0b10 for v in macs[:1000])
+        # Later batches never repeat earlier ones
+        assert not set(generator.imeis(1000)) & set(imeis)
+
+        prefixed = generator.macs(250, "AA:BB:CC:00:00:*")
+        assert len(set(prefixed)) == 250 and taken_mac not in prefixed
+        assert all(v.startswith("aa:bb:cc:00:00:") for v in prefixed)
+        try:
+            generator.macs(10, "AA:BB:CC:00:00:*")
+            assert False, "Exhausted prefix should raise"
+        except ValueError:
+            pass
+        # Released values are free again; taken ones stay reserved
+        free = generator.free_macs("AA:BB:CC:00:00:*")
+        generator.release('mac', prefixed[:10])
+        assert generator.free_macs("AA:BB:CC:00:00:*") == free + 10
+        assert set(prefixed[:10]) <= set(generator.macs(free + 10, "AA:BB:CC:00:00:*"))
+        generator.release('imei', imeis[:5])
+        assert not set(generator.imeis(1000)) & set(imeis[5:])
+        assert IdentityGenerator(7,use_numpy=use_numpy).imeis(5) == IdentityGenerator(7, use_numpy=use_numpy).imeis(5)
+        assert IdentityGenerator(7, use_numpy=use_numpy).macs(5) == IdentityGenerator(7, use_numpy=use_numpy).macs(5)
+    assert luhn_ok(MumuManager.generate_imei())
+
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = MumuManager(_write_fake_manager(tmp))
+        written = IdentityGenerator(seed=1).imeis(3)
+        manager.apply_simulation([(i, 'imei', written[i]) for i in range(3)])
+        manager.cache.put("9", {"index": "9", "mac_address": "AA:BB:CC:DD:EE:FF"})
+        imeis, macs = manager.known_identities()
+        assert set(written) <= imeis and "aa:bb:cc:dd:ee:ff" in macs
+        # Same seed would reproduce `written`; the manager's generator skips them
+        assert not set(manager.identity_generator(seed=1).imeis(3)) & set(written)
+        # Values of every polled VM count, not only the few the LRU cache holds; ttl=None caches work too
+        fleet = IdentityGenerator(seed=2).imeis(5000)
+        manager._differ.diff({str(i): {"index": str(i), "imei": imei} for i, imei in enumerate(fleet)})
+        manager.cache = InstanceCache(max_entries=10, ttl=None)
+        manager.cache.put("9", {"index": "9", "mac_address": "AA:BB:CC:DD:EE:FF"})
+        imeis, macs = manager.known_identities()
+        assert set(fleet) <= imeis and "aa:bb:cc:dd:ee:ff" in macs
+        assert not set(manager.identity_generator(seed=2).imeis(5000)) & set(fleet)
+        manager.shutdown()
+    print("✅ Identity generation tests passed!")
+
+def test_batch_edit_preview():
+    """BatchEditDialog previews 10k VMs lazily, debounces edits and applies what it showed"""
+    print("\n🧾 Testing Batch Edit Preview...")
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt6.QtWidgets import QApplication
+    from mumu_manager_optimized import BatchEditDialog, IdentityGenerator, SimPreviewModel
+
+    app = QApplication.instance() or QApplication([])
+    start = time.perf_counter()
+    dialog = BatchEditDialog(range(10000), seed=5)
+    dialog.imei_enable.setChecked(True)
+    dialog.mac_enable.setChecked(True)
+    dialog.update_preview()
+    dialog.show()
+    app.processEvents()
+    elapsed = time.perf_counter() - start
+    model = dialog.preview_model
+    print(f"  Open 10k VMs: {elapsed * 1000:.0f} ms, generated {model.stats['generated']} values")
+    assert elapsed < 2.0
+    # Only the blocks behind the visible rows were generated
+    assert model.stats['generated'] <= 2 * SimPreviewModel.BLOCK
+
+    generated = model.stats['generated']
+    for text in ("A", "AA", "AA:", "AA:B", "AA:BB", "AA:BB:", "AA:BB:*"):
+        dialog.mac_mode.setText(text)
+        app.processEvents()
+    assert model.mode('mac') == ('random', None), "Edits apply only after the debounce"
+    time.sleep(dialog.PREVIEW_DEBOUNCE_MS / 1000 + 0.05)
+    app.processEvents()
+    assert model.mode('mac') == ('prefix', "AA:BB:*")
+
+    shown = [(model.data(model.index(r, 1)), model.data(model.index(r, 2))) for r in (0, 1, 9999)]
+    imei_before = model.value('imei', 0)
+    assert imei_before == shown[0][0], "Changing MAC mode keeps generated IMEIs"
+    tasks = dialog.get_tasks()
+    assert len(tasks) == 10000
+    assert [(tasks[r][1], tasks[r][2]) for r in (0, 1, 9999)] == shown
+    assert len({t[1] for t in tasks}) == 10000 and len({t[2] for t in tasks}) == 10000
+    assert all(t[2].startswith("aa:bb:") for t in tasks)
+
+    dialog.mac_mode.setText("AA:BB:CC:DD:EE:*")  # 256 addresses for 10k VMs
+    dialog.update_preview()
+    assert model.data(model.index(0, 2)) == "❌"
+    dialog.close()
+
+    # Capacity is judged for all rows once, not per block after earlier blocks used the prefix
+    big = SimPreviewModel(range(40000), IdentityGenerator(seed=6))
+    big.set_mode('mac', ('prefix', "02:00:00:00:*"))  # 65,536 addresses
+    assert all(big.value("mac", row) for row in range(0, 40000, SimPreviewModel.BLOCK))  # scroll through
+    assert big.value('mac', 30000) and None not in big.values('mac')
+
+    # Values dropped by a mode change go back to the generator instead of staying reserved
+    small = SimPreviewModel(range(200), IdentityGenerator(seed=7))
+    small.set_mode('mac', ('prefix', "AA:BB:CC:DD:EE:*"))  # 256 addresses for 200 VMs
+    assert len(set(small.values('mac'))) == 200
+    small.set_mode('mac', ('random', None))
+    small.values('mac')
+    small.set_mode('mac', ('prefix', "AA:BB:CC:DD:EE:*"))
+    assert None not in small.values('mac')
+    dialog = BatchEditDialog(range(200), seed=8)
+    dialog.mac_enable.setChecked(True)
+    dialog.mac_mode.setText("AA:BB:CC:DD:EE:*")
+    dialog.update_preview()
+    model = dialog.preview_model
+    for _ in range(3):
+        assert None not in model.values('mac')
+        dialog.mac_enable.setChecked(False)
+        dialog.update_preview()
+        dialog.mac_enable.setChecked(True)
+        dialog.update_preview()
+    assert None not in model.values('mac')
+    tasks = dialog.get_tasks()
+    assert tasks is not None and len({t[2] for t in tasks}) == 200
+    dialog.close()
+    print("✅ Batch edit preview tests passed!")
+
+def test_adb_fanout():
+    """ADB fan-out returns per-VM results in parallel, streams them to JSONL and groups identical outputs"""
+    print("\n📡 Testing ADB Fan-out...")
+    from PyQt6.QtCore import Qt
+    from mumu_manager_optimized import AdbFanout, AdbFanoutWorker, AdbJsonlSink, CancelToken, MumuManager
+
+    command = "shell getprop ro.product.model"
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = MumuManager(_write_fake_manager(tmp, delay=0.05, count=100, fail=[7]))
+        sink = AdbJsonlSink(os.path.join(tmp, "results.jsonl"))
+        streamed = []
+        start = time.perf_counter()
+        fanout = manager.fanout_adb_command(range(40), command, on_result=streamed.append, max_concurrent=8,
+                                            sinks=[sink])
+        elapsed = time.perf_counter() - start
+        sink.close()
+        print(f"  {fanout.summary()}")
+        for line in fanout.groups.summary():
+            print(f"    {line}")
+        assert fanout.done and len(streamed) == len(fanout.results) == 40
+        assert fanout.results[4].stdout.strip() == "MuMu Lite" and fanout.results[5].exit_code == 0
+        assert not fanout.results[7].ok and fanout.results[7].exit_code == 1 and "failed" in fanout.results[7].stderr
+        groups = {(ok, text): count for ok, text, count, _ in fanout.groups.groups()}
+        assert groups == {(True, "MuMu Pro"): 29, (True, "MuMu Lite"): 10, (False, "failed: [7]"): 1}
+        assert fanout.groups.summary()[0].startswith("✅ 29 VM trả về 'MuMu Pro'")
+        with open(os.path.join(tmp, "results.jsonl"), encoding="utf-8") as f:
+            records = [json.loads(line) for line in f]
+        assert sorted(r["index"] for r in records) == list(range(40))
+        if _multi_cpu():
+            assert elapsed < 40 * 0.05 / 2, f"Calls did not overlap ({elapsed:.2f}s)"
+
+        # A cancelled run leaves its VMs for the next run
+        token = CancelToken()
+        fanout = AdbFanout(manager, range(40, 80), command, max_concurrent=4)
+        def cancel_after_some(result):
+            if fanout.stats['ok'] >= 10:
+                token.cancel('pause')
+        fanout.run(token, cancel_after_some)
+        assert not fanout.done and 10 <= len(fanout.results) < 40
+        fanout.run()
+        assert fanout.done and sorted(fanout.results) == list(range(40, 80))
+
+        worker = AdbFanoutWorker(manager, (list(range(30)), command,
+                                           {'max_concurrent': 8, 'jsonl_path': os.path.join(tmp, "worker.jsonl")}))
+        progress, logs = [], []
+        worker.progress.connect(progress.append, Qt.ConnectionType.DirectConnection)
+        worker.log.connect(logs.append, Qt.ConnectionType.DirectConnection)
+        worker.start()
+        assert worker.wait(10000)
+        per_vm = [line for batch in logs for line in batch.split("\n") if line.startswith(("✅ VM", "❌ VM"))]
+        assert sorted(int(line.split()[2].rstrip(":")) for line in per_vm) == list(range(30))
+        assert sum(any(line.startswith("✅ VM") for line in batch.split("\n")) for batch in logs) < 30, \
+            "Results are logged in batches"
+        assert progress[-1] == 100 and any("MuMu Pro" in line and "VM trả về" in line for line in logs)
+        with open(os.path.join(tmp, "worker.jsonl"), encoding="utf-8") as f:
+            assert sum(1 for _ in f) == 30
+        manager.shutdown()
+    print("✅ ADB fan-out tests passed!")
+
+def test_instance_table_model():
+    """Instance table model/view scrolls and refreshes 10k VMs within a 60 fps frame budget"""
+    print("\n🗂️ Testing Instance Table Model...")
+    import gc
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt6.QtCore import Qt
+    from PyQt6.QtWidgets import QApplication
+    from mumu_manager_optimized import (InstanceSearchIndex, InstanceStore, InstanceTableModel,
+                                        InstanceTableView, SnapshotDiffer)
+
+    app = QApplication.instance() or QApplication([])
+    snapshot = {str(i): {"index": str(i), "name": f"MuMu-{(i * 7919) % 10000}", "is_process_started": i % 3 == 0,
+                         "pid": 4000 + i if i % 3 == 0 else None, "adb_port": 16384 + 32 * i,
+                         "disk_size_bytes": 2 ** 31 + i} for i in range(10000)}
+    differ, store = SnapshotDiffer(), InstanceStore()
+    model = InstanceTableModel(store)
+    model.load(differ.diff(snapshot).added)
+    view = InstanceTableView(model)
+    view.resize(1100, 700)
+    view.show()
+    app.processEvents()
+    proxy = view.proxy
+    assert proxy.rowCount() == model.rowCount() == 10000
+    assert proxy.data(proxy.index(3, 2)) == "Running" and proxy.data(proxy.index(4, 3)) == "—"
+
+    scrollbar = view.verticalScrollBar()
+    frames = 60
+    start = time.perf_counter()
+    for k in range(frames):
+        scrollbar.setValue(scrollbar.maximum() * k // frames)
+        view.viewport().repaint()
+    scroll_ms = (time.perf_counter() - start) * 1000 / frames
+    print(f"  Scroll repaint: {scroll_ms:.2f} ms/frame")
+    assert scroll_ms < 1000 / 60
+
+    # Scattered in-place changes arrive as a few merged dataChanged ranges
+    updated = dict(snapshot)
+    for i in list(range(0, 300, 3)) + list(range(5000, 5100)):
+        updated[str(i)] = dict(snapshot[str(i)], is_process_started=not snapshot[str(i)]["is_process_started"])
+    changed = []
+    model.dataChanged.connect(lambda tl, br, roles=(): changed.append((tl.row(), br.row())))
+    delta = differ.diff(updated)
+    gc.collect()
+    gc.disable()
+    start = time.perf_counter()
+    structural, rows = model.apply_delta(delta)
+    view.viewport().repaint()
+    refresh_ms = (time.perf_counter() - start) * 1000
+    gc.enable()
+    print(f"  Refresh of {len(rows)} changed VMs: {refresh_ms:.2f} ms, {len(changed)} dataChanged ranges")
+    assert not structural and len(rows) == 200 and changed == [(0, 297), (5000, 5099)]
+    assert refresh_ms < 1000 / 60
+    assert proxy.data(proxy.index(0, 2)) == "Stopped"
+
+    # Sorting reorders a permutation of rows, never copies them
+    start = time.perf_counter()
+    view.sortByColumn(1, Qt.SortOrder.AscendingOrder)
+    sort_ms = (time.perf_counter() - start) * 1000
+    names = [proxy.data(proxy.index(r, 1)) for r in range(5)]
+    print(f"  Sort 10k by name: {sort_ms:.1f} ms")
+    assert names == sorted(store.names)[:5] and sort_ms < 200
+    assert store.names[proxy.source_rows()[0]] == names[0]
+
+    # While sorted, a delta's many dataChanged ranges cost a single re-sort
+    layouts = []
+    proxy.layoutChanged.connect(lambda *args: layouts.append(1))
+    renamed = dict(updated)
+    for i in range(100, 10000, 169):  # 59 VMs, far enough apart to stay separate ranges
+        renamed[str(i)] = dict(updated[str(i)], name=f"A-{i:05d}")
+    delta = differ.diff(renamed)
+    gc.collect()
+    gc.disable()
+    start = time.perf_counter()
+    model.apply_delta(delta)
+    app.processEvents()  # Runs the queued re-sort and the view's repaint
+    sorted_ms = (time.perf_counter() - start) * 1000
+    gc.enable()
+    print(f"  Refresh of 59 renamed VMs while sorted by name: {sorted_ms:.2f} ms, {len(layouts)} re-sort")
+    assert len(InstanceTableModel.row_ranges(sorted(model.store.row_of(i) for i in range(100, 10000, 169)))) == 59
+    assert len(layouts) == 1 and sorted_ms < 1000 / 60
+    assert [proxy.data(proxy.index(r, 1)) for r in range(3)] == ["A-00100", "A-00269", "A-00438"]
+    updated = renamed
+    view.sortByColumn(0, Qt.SortOrder.DescendingOrder)
+    assert proxy.data(proxy.index(0, 0)) == "9999"
+
+    # The search bitmap drives the filter; structural refreshes keep it
+    index = InstanceSearchIndex()
+    index.build(updated)
+    proxy.set_filter(index.search_ids("5000-5010 running"))
+    shown = [int(proxy.data(proxy.index(r, 0))) for r in range(proxy.rowCount())]
+    assert shown == sorted((i for i in range(5000, 5011) if i % 3), reverse=True)
+    del updated["5001"]
+    model.apply_delta(differ.diff(updated))
+    assert [int(proxy.data(proxy.index(r, 0))) for r in range(proxy.rowCount())] == [i for i in shown if i != 5001]
+    view.close()
+    print("✅ Instance table model tests passed!")
+
+def test_refresh_worker():
+    """RefreshWorker polls off the UI thread, never overlaps polls, backs off and merges undelivered deltas"""
+    print("\n🔁 Testing Background Refresh Worker...")
+    from PyQt6.QtCore import Qt
+    from mumu_manager_optimized import InstanceDelta, MumuManager, RefreshWorker
+
+    merged = InstanceDelta(added={"1": {"v": 1}}, changed={"2": ({"v": 2}, {"v": (0, 2)})})
+    merged.merge(InstanceDelta(removed={"1": {"v": 1}, "3": {"v": 3}}, changed={"2": ({"v": 5}, {"v": (2, 5)})}))
+    assert not merged.added and set(merged.removed) == {"3"} and merged.changed["2"] == ({"v": 5}, {"v": (0, 5)})
+
+    def wait_for(predicate, timeout=5.0):
+        deadline = time.monotonic() + timeout
+        while not predicate() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return predicate()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = MumuManager(_write_fake_manager(tmp, delay=0.3, count=50, boot=0.0))
+        refresher = RefreshWorker(manager, interval=0.1)
+        signals = []
+        refresher.changed.connect(lambda: signals.append(time.monotonic()), Qt.ConnectionType.DirectConnection)
+        refresher.start()
+        assert wait_for(lambda: refresher.stats['polls'] >= 1)
+        # The 0.3 s CLI misses 0.1 s ticks: they are skipped and the next poll is pushed back
+        assert refresher.stats['skipped'] >= 2 and refresher.stats['delay'] >= 0.5
+        first = refresher.take()
+        assert len(first.added) == 50 and len(signals) == 1
+
+        # Requests during a poll collapse into one follow-up poll and return at once
+        polls = refresher.stats['polls']
+        start = time.perf_counter()
+        for _ in range(20):
+            refresher.request()
+        request_ms = (time.perf_counter() - start) * 1000
+        time.sleep(1.0)
+        assert refresher.stats['polls'] - polls <= 2, "Burst of requests ran one poll each"
+        print(f"  20 refresh requests: {request_ms:.2f} ms on the caller, {refresher.stats['polls'] - polls} polls")
+        assert request_ms < 50
+
+        # The UI does not take(): later deltas are merged and signalled only once
+        signals.clear()
+        manager.control_instance([3], 'launch')
+        refresher.request()
+        assert wait_for(lambda: len(signals) == 1)
+        manager.control_instance([5], 'launch')
+        polls = refresher.stats['polls']
+        refresher.request()
+        assert wait_for(lambda: refresher.stats['polls'] > polls)
+        delta = refresher.take()
+        assert len(signals) == 1 and set(delta.changed) == {"3", "5"}
+        assert refresher.take() is None
+
+        refresher.stop()
+        manager.shutdown()
+        assert refresher.wait(5000)
+
+        broken = MumuManager(os.path.join(tmp, "missing.exe"))
+        errors = []
+        refresher = RefreshWorker(broken, interval=0.05, max_interval=0.4)
+        refresher.failed.connect(errors.append, Qt.ConnectionType.DirectConnection)
+        refresher.start()
+        assert wait_for(lambda: refresher.stats['errors'] >= 3)
+        assert refresher.stats['delay'] == 0.4 and "missing.exe" in errors[0]
+        refresher.stop()
+        assert refresher.wait(5000)
+    print("✅ Refresh worker tests passed!")
+
+def test_log_buffer():
+    """Log lines cross threads through a bounded buffer, fill a ring-buffer model and reach disk asynchronously"""
+    print("\n📜 Testing Ring-Buffered Operation Log...")
+    import threading
+    from PyQt6.QtCore import QObject, Qt, pyqtSignal
+    from mumu_manager_optimized import LogBuffer, LogFileWriter, LogModel, log_level
+
+    assert [log_level(t) for t in ("VM 1: ✅", "⚠️ chậm", "VM 2: ❌", "Lỗi: timeout")] == [0, 1, 2, 2]
+
+    class Emitter(QObject):
+        log = pyqtSignal(str)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        writer = LogFileWriter(os.path.join(tmp, "logs", "run.log"))
+        buffer = LogBuffer(capacity=100000, writer=writer)
+        emitters = [Emitter() for _ in range(4)]
+        for emitter in emitters:
+            emitter.log.connect(buffer.append, Qt.ConnectionType.DirectConnection)
+        def produce(emitter, n):
+            for i in range(5000):
+                emitter.log.emit(f"VM {n * 5000 + i}: {'❌ Thất bại' if i % 100 == 0 else '✅ Thành công'}")
+        start = time.perf_counter()
+        threads = [threading.Thread(target=produce, args=(e, n)) for n, e in enumerate(emitters)]
+        for t in threads: t.start()
+        for t in threads: t.join()
+        emit_us = (time.perf_counter() - start) * 1e6 / 20000
+        buffer.append("Batch xong\n⚠️ 2 VM chậm")
+        entries = buffer.drain()
+        print(f"  20k lines from 4 threads: {emit_us:.1f} µs/line")
+        assert len(entries) == 20002 and buffer.drain() == [] and buffer.dropped == 0
+        assert entries[-1][1:] == (1, "⚠️ 2 VM chậm")
+
+        model = LogModel(capacity=5000)
+        start = time.perf_counter()
+        for i in range(0, len(entries), 1000):
+            model.append(entries[i:i + 1000])
+        flush_ms = (time.perf_counter() - start) * 1000 / 21
+        print(f"  Flush of 1000 lines into the view model: {flush_ms:.2f} ms")
+        assert model.rowCount() == 5000 and model.lines()[-1].endswith("⚠️ 2 VM chậm")
+        assert flush_ms < 20
+        # The ring is full, so the next two lines push out the two oldest; which of those
+        # are errors depends on how the producer threads interleaved
+        evicted = sum("❌" in line for line in model.lines()[:2])
+        model.set_min_level(2)
+        errors = model.lines()
+        assert errors and all("❌" in line for line in errors)
+        model.append([(time.time(), 0, "VM x: ✅"), (time.time(), 2, "VM y: ❌")])
+        assert model.rowCount() == len(errors) + 1 - evicted and model.lines()[-1].endswith("VM y: ❌")
+        model.append([(time.time(), 0, "filler")] * 5000)  # Pushes every older line out of the ring
+        assert model.rowCount() == 0
+        model.set_min_level(0)
+        assert model.rowCount() == 5000
+
+        small = LogBuffer(capacity=10)
+        for i in range(25):
+            small.append(str(i))
+        assert [text for _, _, text in small.drain()] == [str(i) for i in range(15, 25)] and small.dropped == 15
+
+        writer.close()
+        with open(writer.path, encoding="utf-8") as f:
+            lines = f.readlines()
+        assert len(lines) == 20002 and writer.written == 20002
+        assert sum(" ERROR " in line for line in lines) == 200
+    print("✅ Operation log tests passed!")
+
+def test_progress_tracker():
+    """ProgressTracker smooths throughput, estimates ETA and caps UI updates at a few per second"""
+    print("\n⏱️ Testing Progress Tracker...")
+    from PyQt6.QtCore import Qt
+    from mumu_manager_optimized import AutoWorker, BatchSimWorker, MumuManager, ProgressTracker, format_duration
+
+    now = [0.0]
+    tracker = ProgressTracker(1000, max_rate=4.0, alpha=0.5, sample_interval=1.0, clock=lambda: now[0])
+    snapshots = []
+    for step in range(400):  # 20 VMs/s for 10 s, then 60 VMs/s
+        now[0] += 0.05 if step < 200 else 1 / 60
+        tracker.add(ok=1 if step % 10 else 0, failed=0 if step % 10 else 1)
+        snapshot = tracker.snapshot()
+        if snapshot is not None:
+            snapshots.append(snapshot)
+    elapsed = now[0]
+    print(f"  {len(snapshots)} snapshots for 400 updates over {elapsed:.1f}s; last: {snapshots[-1].text()}")
+    assert len(snapshots) <= elapsed * 4 + 1
+    first_phase = [s for s in snapshots if s.elapsed < 10][-1]
+    assert abs(first_phase.rate - 20) < 0.5 and abs(first_phase.eta - (1000 - first_phase.processed) / 20) < 5
+    final = tracker.snapshot(force=True)
+    assert final.processed == 400 and final.ok == 360 and final.failed == 40 and final.percent == 40
+    assert final.rate > 40, "EWMA follows the faster second phase"
+    assert format_duration(3725) == "1:02:05" and format_duration(65) == "1:05" and format_duration(None) == "?"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = MumuManager(_write_fake_manager(tmp, count=200, fail=[3, 4]))
+        worker = AutoWorker(manager, (0, 59, 60, 0.0, 0.0))
+        stats, progress = [], []
+        worker.progress_stats.connect(stats.append, Qt.ConnectionType.DirectConnection)
+        worker.progress.connect(progress.append, Qt.ConnectionType.DirectConnection)
+        start = time.perf_counter()
+        worker.start()
+        assert worker.wait(20000)
+        elapsed = time.perf_counter() - start
+        print(f"  60 VMs in {elapsed:.1f}s: {len(stats)} stats / {len(progress)} progress signals; {stats[-1].text()}")
+        assert len(stats) <= elapsed * 4 + 2 and len(progress) <= len(stats)
+        assert (stats[-1].processed, stats[-1].ok, stats[-1].failed) == (60, 58, 2) and progress[-1] == 100
+
+        worker = BatchSimWorker(manager, [(i, "490154203237518", "02:00:00:00:01:%02x" % i) for i in range(10)])
+        stats = []
+        worker.progress_stats.connect(stats.append, Qt.ConnectionType.DirectConnection)
+        worker.start()
+        assert worker.wait(20000)
+        assert (stats[-1].total, stats[-1].ok, stats[-1].failed) == (10, 8, 2)
+        manager.shutdown()
+    print("✅ Progress tracker tests passed!")
+
+def test_shadow_renderer():
+    """Card shadows come from one cached blurred 9-slice pixmap and paint faster than QGraphicsDropShadowEffect"""
+    print("\n🌫️ Testing Pre-rendered Shadows...")
+    from PyQt6.QtGui import QColor
+    from PyQt6.QtWidgets import QApplication, QFrame, QGraphicsDropShadowEffect, QGridLayout, QWidget
+    from mumu_manager_optimized import ShadowRenderer, ShadowUnderlay, apply_shadow
+
+    app = QApplication.instance() or QApplication([])
+    app._widget_count = 0
+    ShadowRenderer.clear()
+    blurs = ShadowRenderer.stats['blurs']
+
+    def dashboard(use_effect):
+        page = QWidget()
+        grid = QGridLayout(page)
+        grid.setSpacing(24)
+        cards = []
+        for i in range(24):
+            card = QFrame()  # No parent yet, like StatCard calling apply_shadow in __init__
+            card.setStyleSheet("QFrame { background: #ffffff; border-radius: 16px; }")
+            card.setMinimumSize(160, 120)
+            if use_effect:
+                effect = QGraphicsDropShadowEffect(card)
+                effect.setBlurRadius(16)
+                effect.setOffset(6, 6)
+                effect.setColor(QColor(0, 0, 0, 80))
+                card.setGraphicsEffect(effect)
+            else:
+                apply_shadow(card)
+            grid.addWidget(card, i // 6, i % 6)
+            cards.append(card)
+        page.resize(1300, 700)
+        page.show()
+        app.processEvents()
+        return page, cards
+
+    timings, shades = {}, {}
+    for use_effect in (True, False):
+        page, cards = dashboard(use_effect)
+        page.repaint()
+        start = time.perf_counter()
+        for _ in range(20):
+            page.repaint()
+        timings[use_effect] = (time.perf_counter() - start) * 1000 / 20
+        image, rect = page.grab().toImage(), cards[7].geometry()
+        shades[use_effect] = (image.pixelColor(rect.right() + 4, rect.center().y()).red(),
+                              image.pixelColor(rect.center()).red(),
+                              image.pixelColor(rect.right() + 40, rect.center().y()).red())
+        if not use_effect:
+            underlay = cards[7]._shadow_underlay
+            assert isinstance(underlay, ShadowUnderlay) and underlay.parentWidget() is page
+            cards[7].move(cards[7].x() + 10, cards[7].y())
+            assert underlay.geometry() == cards[7].geometry().translated(6, 6).adjusted(-16, -16, 16, 16)
+            cards[7].hide()
+            assert underlay.isHidden()
+            cards[7].show()
+            assert not underlay.isHidden()
+        page.close()
+        page.deleteLater()
+    print(f"  24 cards repaint: {timings[True]:.2f} ms with QGraphicsDropShadowEffect, "
+          f"{timings[False]:.2f} ms with pre-rendered shadows")
+    print(f"  Shade right of card / inside / far away: effect {shades[True]}, pixmap {shades[False]}")
+    assert timings[False] < timings[True]
+    assert ShadowRenderer.stats['blurs'] - blurs == 1, "24 cards share a single blur"
+    effect_shade, pixmap_shade = shades[True], shades[False]
+    assert pixmap_shade[0] < 230 and abs(pixmap_shade[0] - effect_shade[0]) < 32
+    assert pixmap_shade[1] == effect_shade[1] == 255 and pixmap_shade[2] == effect_shade[2]
+
+    # The cache key covers alpha, theme and DPR; the dark theme keeps its lighter shadow
+    light = ShadowRenderer.pixmap(16, 80, "light", 1.0)
+    assert ShadowRenderer.pixmap(16, 80, "light", 1.0) is light
+    retina = ShadowRenderer.pixmap(16, 80, "light", 2.0)
+    assert retina.devicePixelRatio() == 2.0 and retina.width() == 2 * light.width()
+    assert ShadowRenderer.resolve_alpha(80, "dark") == 60 and ShadowRenderer.resolve_alpha(80, "light") == 80
+    print("✅ Shadow renderer tests passed!")
+
+def test_info_stream_decoder():
+    """Streaming `info` decoder handles array, mapping and JSON-lines output in any chunking"""
+    print("\n📡 Testing Streaming Info Decoder...")
+    from mumu_manager_optimized import InfoStreamDecoder, MumuManager
+
+    records = [{"index": str(i), "name": f"MuMu-{i}", "extra": {"ports": [i, i + 1]}} for i in range(30)]
+    payloads = {
+        "array": json.dumps(records),
+        "mapping": json.dumps({r["index"]: r for r in records}, indent=2),
+        "lines": "\n".join(json.dumps(r) for r in records),
+    }
+    for name, text in payloads.items():
+        for step in (1, 13, len(text)):
+            decoder = InfoStreamDecoder()
+            decoded = []
+            for i in range(0, len(text), step):
+                decoded.extend(decoder.feed(text[i:i + step]))
+            decoded.extend(decoder.close())
+            assert [k for k, _ in decoded] == [r["index"] for r in records], f"{name} / {step}"
+
+    decoder = InfoStreamDecoder()
+    decoder.feed('[{"index": "1"}')
+    try:
+        decoder.close()
+        assert False, "Truncated array should be rejected"
+    except ValueError:
+        pass
+
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = MumuManager(_write_fake_manager(tmp, count=500))
+        first_key, _ = next(iter(manager.iter_all_info(chunk_size=512)))
+        assert first_key == "0"
+        info = manager.get_all_info()
+        assert len(info) == 500 and manager.get_cached_instance_info(499)["name"] == "MuMu-499"
+        manager.shutdown()
+
+    # A CLI that fills the stderr pipe before writing stdout must not deadlock the stream
+    import asyncio, threading
+    from mumu_manager_optimized import AsyncMumuManager
+    with tempfile.TemporaryDirectory() as tmp:
+        exe = os.path.join(tmp, "MuMuManager.exe")
+        with open(exe, "w", encoding="utf-8") as f:
+            f.write("#!/usr/bin/env python3\nimport json, sys\n"
+                    "sys.stderr.write('w' * 1000000); sys.stderr.flush()\n"
+                    "print(json.dumps({str(i): {'index': str(i)} for i in range(5)}))\nsys.exit(3)\n")
+        os.chmod(exe, 0o755)
+        manager = MumuManager(exe)
+        outcome = []
+        reader = threading.Thread(target=lambda: outcome.append(manager.get_all_info()), daemon=True)
+        reader.start()
+        reader.join(10)
+        assert outcome and "Exit code 3" in outcome[0] and "w" * 100 in outcome[0]
+        wrapper = AsyncMumuManager(manager=manager)
+        message = asyncio.run(asyncio.wait_for(wrapper.get_all_info(), 10))
+        assert "Exit code 3" in message and "w" * 100 in message
+        manager.shutdown()
+    print("✅ Streaming info decoder tests passed!")
+
+def benchmark_command_executor():
+    """Measure CLI call throughput, serial vs pooled, against the stand-in CLI"""
+    print("\n⚡ Benchmarking Command Executor...")
+    from mumu_manager_optimized import CommandExecutor
+
+    calls = 40
+    with tempfile.TemporaryDirectory() as tmp:
+        exe = _write_fake_manager(tmp, delay=0.05)
+        for workers in (1, 8, 20):
+            executor = CommandExecutor(exe, max_workers=workers)
+            start = time.perf_counter()
+            futures = [executor.submit(['control', '-v', str(i), 'launch']) for i in range(calls)]
+            for f in futures:
+                f.result()
+            elapsed = time.perf_counter() - start
+            executor.shutdown(wait=True)
+            print(f"  {workers:>2} workers: {calls / elapsed:6.1f} calls/s")
+    print("✅ Command executor benchmark completed!")
+
 def load_performance_configs():
     """Load and validate performance configuration file"""
     print("\n📋 Loading Performance Configuration File...")
@@ -199,10 +1620,38 @@ def main():
     
     # Test memory management
     test_memory_simulation()
+    test_instance_cache()
+    test_snapshot_diff()
+    test_instance_store()
+    test_search_index()
     
     # Benchmark performance
     benchmark_batch_processing()
     
+    # Test pooled command execution
+    test_command_executor()
+    test_async_manager()
+    test_control_coalescing()
+    test_argv_packer()
+    test_parallel_batch_control()
+    test_command_pool_streaming()
+    test_command_timeouts()
+    test_worker_control_latency()
+    test_adaptive_rate_control()
+    test_launch_pipeline()
+    test_operation_journal()
+    test_simulation_writes()
+    test_identity_generation()
+    test_batch_edit_preview()
+    test_adb_fanout()
+    test_instance_table_model()
+    test_refresh_worker()
+    test_log_buffer()
+    test_progress_tracker()
+    test_shadow_renderer()
+    test_info_stream_decoder()
+    benchmark_command_executor()
+    
     # Load configuration file
     configs = load_performance_configs()
     